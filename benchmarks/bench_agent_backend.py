@@ -0,0 +1,123 @@
+"""
+Agent tool backends: HTTP to a local API server versus in-process scoring.
+
+Starts `uvicorn src.main:app` on a free port and builds an
+`InProcessScoringClient` in this process (both with the response cache off).
+It then:
+- checks that both return identical status codes and bodies, for valid
+  applications and for ones the API rejects (422/500), single and batched
+- times sequential single-application calls, as the agent makes them
+
+Usage:
+    python -m benchmarks.bench_agent_backend [--calls 1000]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.common import BASE_DIR, load_applications
+
+# Both sides must really score every call
+ENV = {"RESPONSE_CACHE_SIZE": "0", "LOG_LEVEL": "CRITICAL", "METRICS_ENABLED": "1"}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port):
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'src.main:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=BASE_DIR, env={**os.environ, **ENV}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError('API server did not start')
+
+
+def error_payloads(base):
+    return [
+        {**base, 'person_income': 0},                               # 500: division by zero
+        {**base, 'person_age': 'abc'},                              # 422: type error
+        {k: v for k, v in base.items() if k != 'loan_grade'},       # 422: missing field
+    ]
+
+
+def check_parity(http, local, payloads):
+    mismatches = 0
+    cases = [(p, False) for p in payloads] + [(payloads[i:i + 50], True) for i in range(0, len(payloads), 50)]
+    for payload, batch in cases:
+        a = http.score_many(payload) if batch else http.score(payload)
+        b = local.score_many(payload) if batch else local.score(payload)
+        if a.status_code != b.status_code or a.json() != b.json():
+            mismatches += 1
+            if mismatches <= 3:
+                print(f"  mismatch ({a.status_code} vs {b.status_code}): {a.text[:200]} | {b.text[:200]}")
+    return len(cases), mismatches
+
+
+def time_calls(client, payloads):
+    latencies = []
+    for payload in payloads:
+        start = time.perf_counter()
+        client.score(payload).json()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        'mean_ms': sum(latencies) / len(latencies) * 1000,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=1000)
+    parser.add_argument('--parity-rows', type=int, default=500)
+    args = parser.parse_args()
+
+    os.environ.update(ENV)
+    from src.scoring_client import InProcessScoringClient, ScoringClient
+
+    port = free_port()
+    server = start_server(port)
+    try:
+        http = ScoringClient(f'http://127.0.0.1:{port}')
+        local = InProcessScoringClient()
+
+        payloads = load_applications(args.parity_rows, seed=7).to_dict('records')
+        payloads += error_payloads(payloads[0])
+        cases, mismatches = check_parity(http, local, payloads)
+        print(f"Parity: {cases} cases (incl. 422/500 and batches), {mismatches} mismatches")
+
+        calls = load_applications(args.calls).to_dict('records')
+        for client in (http, local):
+            client.score(calls[0])  # warm up
+        results = {'http': time_calls(http, calls), 'inprocess': time_calls(local, calls)}
+
+        print(f"\n{'backend':<10} {'mean ms':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        for name, r in results.items():
+            print(f"{name:<10} {r['mean_ms']:>8.3f} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f}")
+        saved = results['http']['mean_ms'] - results['inprocess']['mean_ms']
+        print(f"\nIn-process saves {saved:.3f} ms per call "
+              f"({results['http']['mean_ms'] / results['inprocess']['mean_ms']:.1f}x)")
+        http.close()
+    finally:
+        server.terminate()
+        server.wait()
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
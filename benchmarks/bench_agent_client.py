@@ -0,0 +1,136 @@
+"""
+Agent-side latency of scoring several applicants: old vs pooled, async and batched clients.
+
+A local stand-in server plays the scoring API: each request costs a fixed
+service time (plus a little per row for /predict/batch) and can answer 503 to
+every k-th request to exercise retries. Pass --url to measure a real server.
+
+Compared strategies, per multi-applicant query:
+- unpooled:   `requests.post` per applicant, sequential (the old tool)
+- pooled:     `ScoringClient.score` per applicant on a kept-alive session
+- async:      `AsyncScoringClient.score_concurrently` (all in flight)
+- batch:      one `/predict/batch` request (the agent's fan-out)
+
+Usage:
+    python -m benchmarks.bench_agent_client [--service-ms 5] [--fail-every 0]
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from benchmarks.common import load_applications
+from src.scoring_client import AsyncScoringClient, ScoringClient
+
+APPLICANTS = [1, 5, 20]
+CANNED = {"probability": 0.1, "decision": "Approved", "risk_level": "LOW RISK",
+          "risk_factors": [], "metadata": {}}
+
+
+def start_stand_in(service_ms, per_row_ms, fail_every):
+    """Threaded HTTP/1.1 server on a free port; returns (server, base_url)."""
+    counter = {'n': 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out as separate writes; like uvicorn, set
+        # TCP_NODELAY so keep-alive clients don't stall on delayed ACKs
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            with lock:
+                counter['n'] += 1
+                fail = fail_every and counter['n'] % fail_every == 0
+            if fail:
+                self._send(503, {"detail": "overloaded"})
+                return
+            rows = len(body) if self.path == '/predict/batch' else 1
+            time.sleep((service_ms + per_row_ms * rows) / 1000.0)
+            self._send(200, [CANNED] * rows if self.path == '/predict/batch' else CANNED)
+
+        def _send(self, status, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def time_query(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default=None, help='Benchmark a running API instead of the stand-in')
+    parser.add_argument('--service-ms', type=float, default=5.0, help='Stand-in time per request')
+    parser.add_argument('--per-row-ms', type=float, default=0.05, help='Stand-in time per batch row')
+    parser.add_argument('--fail-every', type=int, default=0, help='Stand-in answers 503 to every k-th request')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        server, base_url = start_stand_in(args.service_ms, args.per_row_ms, args.fail_every)
+
+    def retry_unpooled(payload):
+        # The old tool had no retries; count a retryable failure as a second call
+        response = requests.post(f'{base_url}/predict', json=payload)
+        if response.status_code == 503:
+            response = requests.post(f'{base_url}/predict', json=payload)
+        response.raise_for_status()
+
+    client = ScoringClient(base_url, backoff=0.01)
+    loop = asyncio.new_event_loop()
+    async_client = loop.run_until_complete(_make_async(base_url))
+
+    def check(responses):
+        for r in responses:
+            r.raise_for_status()
+
+    print(f"{'applicants':>10} {'unpooled ms':>12} {'pooled ms':>10} {'async ms':>9} {'batch ms':>9} {'speedup':>8}")
+    for n in APPLICANTS:
+        payloads = load_applications(n).to_dict('records')
+        unpooled = time_query(lambda: [retry_unpooled(p) for p in payloads], args.repeat)
+        pooled = time_query(lambda: check([client.score(p) for p in payloads]), args.repeat)
+        concurrent = time_query(
+            lambda: check(loop.run_until_complete(async_client.score_concurrently(payloads))), args.repeat)
+        batch = time_query(lambda: check([client.score_many(payloads)]), args.repeat)
+        print(f"{n:>10} {unpooled:>12.2f} {pooled:>10.2f} {concurrent:>9.2f} {batch:>9.2f} "
+              f"{unpooled / batch:>7.1f}x")
+
+    client.close()
+    loop.run_until_complete(async_client.aclose())
+    loop.close()
+    if server is not None:
+        server.shutdown()
+
+
+async def _make_async(base_url):
+    return AsyncScoringClient(base_url, backoff=0.01, pool_size=32)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Client latency of /predict with the decision audit log off and on, and audit lookups.
+
+Sends /predict requests through the ASGI app at fixed concurrency (response
+cache off, so every request is scored) in alternating rounds without and
+with the audit log, then once behind a tiny queue (to show backpressure:
+requests wait for the writer and no decision is lost). The default
+concurrency of 1 shows the latency added to a request rather than queueing
+delays. The cost of `AuditLog.record` on the request path is also timed on
+its own. Then fills a database with `--rows`
+decisions and times the indexed lookups used for reviews and replays.
+
+Usage:
+    python -m benchmarks.bench_audit [--requests 3000] [--concurrency 1] [--rounds 6] [--rows 200000]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.bench_hot_reload import run_phase
+from benchmarks.common import best_of, load_applications
+from src.features import RAW_COLUMNS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--rounds', type=int, default=6)
+    parser.add_argument('--rows', type=int, default=200000)
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp())
+    os.environ.update({'RESPONSE_CACHE_SIZE': '0', 'LOG_LEVEL': 'WARNING',
+                       'AUDIT_LOG_PATH': str(root / 'audit.db')})
+    import src.main as api
+    from src.audit import AuditLog, load_inputs, query
+
+    payloads = load_applications(args.requests).to_dict('records')
+    asyncio.run(run_phase(api.app, payloads[:200], args.concurrency))  # warm up the route and the writer
+
+    # Alternate off/on rounds (order flipped every round) and compare medians:
+    # single p99 readings vary by about as much as the audit log adds
+    audit = AuditLog(root / 'audit-on.db')
+    p99 = {'off': [], 'audit': []}
+    results = {}
+    for i in range(args.rounds):
+        for name in ('off', 'audit') if i % 2 == 0 else ('audit', 'off'):
+            api.audit = audit if name == 'audit' else None
+            results[name] = asyncio.run(run_phase(api.app, payloads, args.concurrency))
+            p99[name].append(results[name]['p99_ms'])
+    audit.flush()
+    results['audit'].update(audit.stats())
+    # Backpressure: a tiny queue makes requests wait for the writer, nothing is dropped
+    api.audit = AuditLog(root / 'queue4.db', max_queue=4)
+    results['queue=4'] = asyncio.run(run_phase(api.app, payloads, args.concurrency))
+    api.audit.flush()
+    results['queue=4'].update(api.audit.stats())
+
+    print(f"{'audit':<8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'written':>8} {'blocked':>8} {'rejected':>8} "
+          f"{'ms/batch':>9}")
+    for name, r in results.items():
+        audited = 'written' in r
+        print(f"{name:<8} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['max_ms']:>8.2f} "
+              + (f"{r['written']:>8} {r['blocked']:>8} {r['rejected']:>8} {r['write_ms_per_batch']:>9.2f}"
+                 if audited else f"{'-':>8} {'-':>8} {'-':>8} {'-':>9}"))
+    off, on = np.median(p99['off']), np.median(p99['audit'])
+    print(f"p99 over {args.rounds} rounds (median): off {off:.2f} ms, audit {on:.2f} ms, added {on - off:+.2f} ms")
+
+    # What a request itself pays: one `record` call per single-application request
+    audit = AuditLog(root / 'record.db')
+    application = api.LoanApplication(**payloads[0])
+    timings = []
+    for i in range(args.requests):
+        start = time.perf_counter()
+        audit.record('/predict', f'request-{i}', [application], [0.25], 'default')
+        timings.append(time.perf_counter() - start)
+        if i % 8 == 7:
+            time.sleep(0.0005)  # leave the writer some room, as request handling would
+    audit.flush()
+    p50, p99 = np.percentile(timings[100:], [50, 99]) * 1e6
+    print(f"record() per request: p50 {p50:.1f} us, p99 {p99:.1f} us")
+
+    # Writer throughput and lookups over a larger log: batches of 100 applications
+    apps = load_applications(args.rows)
+    columns = {c: apps[c].to_numpy() for c in RAW_COLUMNS}
+    probabilities = np.random.default_rng(0).random(args.rows)
+    audit = AuditLog(root / 'lookup.db')
+    start = time.perf_counter()
+    for i in range(0, args.rows, 100):
+        audit.record('/predict/batch', f'request-{i}', {c: v[i:i + 100] for c, v in columns.items()},
+                     probabilities[i:i + 100], 'default')
+    audit.flush()
+    write_s = time.perf_counter() - start
+
+    recent = query(audit.path, limit=1)[0]
+    since = recent['ts'] - 1
+    by_application = best_of(lambda: query(audit.path, application_id=recent['application_id']), repeat=20)
+    by_request = best_of(lambda: query(audit.path, request_id=recent['request_id']), repeat=20)
+    by_time = best_of(lambda: query(audit.path, since=since, limit=100), repeat=20)
+    replay_load = best_of(lambda: load_inputs(audit.path), repeat=1)
+    size = sum(f.stat().st_size for f in root.glob('lookup.db*'))
+    shutil.rmtree(root)
+
+    print(f"\n{args.rows:,} decisions written in {write_s:.2f} s ({args.rows / write_s:,.0f} rows/s, "
+          f"{size / args.rows:.0f} bytes/row)")
+    print(f"{'lookup by application_id':<28} {by_application * 1000:>8.2f} ms")
+    print(f"{'lookup by request_id':<28} {by_request * 1000:>8.2f} ms")
+    print(f"{'latest 100 by time':<28} {by_time * 1000:>8.2f} ms")
+    print(f"{'load all for replay':<28} {replay_load * 1000:>8.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
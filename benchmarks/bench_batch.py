@@ -0,0 +1,35 @@
+"""
+Throughput of `/predict` scoring, row by row versus one batched call.
+
+Usage:
+    python -m benchmarks.bench_batch
+"""
+import contextlib
+import io
+
+from benchmarks.common import best_of, load_applications
+from src.main import LoanApplication, score_applications
+
+BATCH_SIZES = [1, 100, 10_000]
+# Row-by-row scoring of 10k rows takes a while, so cap the sequential sample
+MAX_SEQUENTIAL = 1_000
+
+
+def main():
+    print(f"{'batch':>8} {'row-by-row rows/s':>20} {'batched rows/s':>16} {'speedup':>8}")
+    for n in BATCH_SIZES:
+        df = load_applications(n)
+        apps = [LoanApplication(**r) for r in df.to_dict('records')]
+
+        sequential = apps[:MAX_SEQUENTIAL]
+        with contextlib.redirect_stdout(io.StringIO()):
+            t_single = best_of(lambda: [score_applications([a]) for a in sequential], repeat=1)
+        t_batch = best_of(lambda: score_applications(apps))
+
+        single_rps = len(sequential) / t_single
+        batch_rps = n / t_batch
+        print(f"{n:>8} {single_rps:>20,.0f} {batch_rps:>16,.0f} {batch_rps / single_rps:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+`/predict` latency with and without the response cache.
+
+Replays a form-editing workload: a few distinct applications, each resubmitted
+several times while one field at a time is changed and changed back. Each
+configuration runs in a fresh interpreter because the cache is configured at
+import time.
+
+Usage:
+    python -m benchmarks.bench_cache [--sessions 200] [--edits 10]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+CONFIGS = [
+    {"RESPONSE_CACHE_SIZE": "0"},
+    {"RESPONSE_CACHE_SIZE": "10000"},
+    {"RESPONSE_CACHE_SIZE": "10000", "RESPONSE_CACHE_SQLITE": "{tmp}"},
+]
+
+
+def workload(n_sessions, n_edits):
+    """Payloads for `n_sessions` users each submitting `n_edits` variants of one application."""
+    import random
+
+    from benchmarks.common import load_applications
+
+    rng = random.Random(0)
+    payloads = []
+    for base in load_applications(n_sessions).to_dict('records'):
+        payloads.append(base)
+        for _ in range(n_edits):
+            # Nudge the amount, then often go back to a previously sent value
+            amount = base['loan_amnt'] + rng.choice([0, 0, 500, -500])
+            payloads.append({**base, 'loan_amnt': max(500, amount)})
+    return payloads
+
+
+def drive(n_sessions, n_edits):
+    from fastapi.testclient import TestClient
+
+    from src.main import app
+
+    payloads = workload(n_sessions, n_edits)
+    client = TestClient(app)
+    latencies = []
+    for payload in payloads:
+        start = time.perf_counter()
+        client.post('/predict', json=payload).raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    stats = client.get('/metrics/cache').json()
+
+    latencies.sort()
+    return {
+        "requests": len(payloads),
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "hit_rate": stats.get("hit_rate"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=200)
+    parser.add_argument('--edits', type=int, default=10)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = drive(args.sessions, args.edits)
+        print(json.dumps(result))
+        return
+
+    print(f"{'config':<40} {'mean ms':>8} {'p50 ms':>8} {'p99 ms':>8} {'hit rate':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for config in CONFIGS:
+            config = {k: v.format(tmp=os.path.join(tmp, 'cache.db')) for k, v in config.items()}
+            out = subprocess.run(
+                [sys.executable, '-W', 'ignore', '-m', 'benchmarks.bench_cache', '--child',
+                 '--sessions', str(args.sessions), '--edits', str(args.edits)],
+                env={**os.environ, **config}, capture_output=True, text=True, check=True,
+            ).stdout.strip().splitlines()[-1]
+            r = json.loads(out)
+            label = ' '.join(f"{k.replace('RESPONSE_CACHE_', '').lower()}={'set' if k.endswith('SQLITE') else v}"
+                             for k, v in config.items())
+            hit_rate = f"{r['hit_rate']:.1%}" if r['hit_rate'] is not None else '-'
+            print(f"{label:<40} {r['mean_ms']:>8.3f} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f} {hit_rate:>9}")
+
+
+if __name__ == '__main__':
+    main()
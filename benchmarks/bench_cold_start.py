@@ -0,0 +1,64 @@
+"""
+Cold-start cost of the API process: import time and resident memory.
+
+Each configuration imports `src.main` in a fresh interpreter:
+- eager:    full pipeline plus a TreeExplainer built at import (previous behaviour)
+- pipeline: full pickled pipeline, shap deferred until an explanation is requested
+- slim:     booster (UBJSON) + preprocessing JSON from models/serving
+
+Usage:
+    python -m benchmarks.bench_cold_start [--runs 5]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.common import BASE_DIR
+
+CHILD = '''
+import json, time
+start = time.perf_counter()
+import src.main
+if {eager}:
+    import shap
+    shap.TreeExplainer(src.main.models.current.model)
+elapsed = time.perf_counter() - start
+rss = 0
+with open('/proc/self/status') as f:
+    for line in f:
+        if line.startswith('VmRSS:'):
+            rss = int(line.split()[1]) / 1024
+print(json.dumps({{"import_s": elapsed, "rss_mb": rss}}))
+'''
+
+CONFIGS = [
+    ("eager", {"SERVING_ARTIFACT": "pipeline"}, True),
+    ("pipeline", {"SERVING_ARTIFACT": "pipeline"}, False),
+    ("slim", {"SERVING_ARTIFACT": "slim"}, False),
+]
+
+
+def measure(env, eager):
+    out = subprocess.run(
+        [sys.executable, '-W', 'ignore', '-c', CHILD.format(eager=eager)],
+        env={**os.environ, **env}, cwd=BASE_DIR, capture_output=True, text=True, check=True,
+    ).stdout.strip().splitlines()[-1]
+    return json.loads(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'mode':<10} {'import s (median)':>18} {'RSS MB':>8}")
+    for name, env, eager in CONFIGS:
+        runs = sorted((measure(env, eager) for _ in range(args.runs)), key=lambda r: r['import_s'])
+        median = runs[len(runs) // 2]
+        print(f"{name:<10} {median['import_s']:>18.3f} {median['rss_mb']:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
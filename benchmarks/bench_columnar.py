@@ -0,0 +1,96 @@
+"""
+JSON vs Arrow IPC for /predict/batch: serialization cost and payload size.
+
+For each batch size, reports:
+- request size and client-side encoding (json.dumps of records vs `write_table`)
+- server-side decoding (pydantic `validate_json` vs `read_columns`)
+- response size
+- end-to-end /predict/batch time through the ASGI app (response cache off)
+  for JSON, Arrow, and Arrow with the risk-factor column
+- the model alone (encode + predict on prepared columns), for scale
+
+Usage:
+    python -m benchmarks.bench_columnar [--sizes 1000 100000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks.common import best_of, load_applications
+
+
+async def post_ms(client, body, headers, repeat, path='/predict/batch'):
+    """Fastest of `repeat` requests in ms, and the response size."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = await client.post(path, content=body, headers=headers)
+        best = min(best, time.perf_counter() - start)
+        response.raise_for_status()
+    return best * 1000, len(response.content)
+
+
+async def run(sizes):
+    import httpx
+
+    from src.columnar import ARROW_STREAM, REQUEST_COLUMNS, read_columns, write_table
+    from src.main import app, batch_adapter, derive_features, models, predict_probabilities
+
+    json_headers = {'Content-Type': 'application/json'}
+    arrow_headers = {'Content-Type': ARROW_STREAM, 'Accept': ARROW_STREAM}
+    rows = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench',
+                                 timeout=None) as client:
+        for n in sizes:
+            df = load_applications(n)
+            records = df.to_dict('records')
+            repeat = 5 if n <= 10000 else 2
+
+            json_body = json.dumps(records).encode()
+            arrow_body = write_table({name: df[name].to_numpy() for name, _ in REQUEST_COLUMNS})
+            encode_json = best_of(lambda: json.dumps(records).encode(), repeat)
+            encode_arrow = best_of(lambda: write_table({name: df[name].to_numpy() for name, _ in REQUEST_COLUMNS}),
+                                   repeat)
+            decode_json = best_of(lambda: batch_adapter.validate_json(json_body), repeat)
+            decode_arrow = best_of(lambda: read_columns(arrow_body), repeat)
+
+            columns, _ = read_columns(arrow_body)
+            features = derive_features(columns)
+            model = best_of(lambda: predict_probabilities(features, n, models.current), repeat)
+
+            await post_ms(client, arrow_body, arrow_headers, 1)  # warm up (pyarrow, buffers)
+            e2e_json, response_json = await post_ms(client, json_body, json_headers, repeat)
+            e2e_arrow, response_arrow = await post_ms(client, arrow_body, arrow_headers, repeat)
+            e2e_factors, response_factors = await post_ms(client, arrow_body, arrow_headers, repeat,
+                                                          path='/predict/batch?risk_factors=true')
+            rows.append((n, len(json_body), len(arrow_body), encode_json, encode_arrow, decode_json, decode_arrow,
+                         response_json, response_arrow, response_factors, e2e_json, e2e_arrow, e2e_factors, model))
+
+    for (n, req_json, req_arrow, enc_json, enc_arrow, dec_json, dec_arrow,
+         resp_json, resp_arrow, resp_factors, e2e_json, e2e_arrow, e2e_factors, model) in rows:
+        print(f"\n{n:,} rows{'':<22} {'JSON':>12} {'Arrow':>12} {'ratio':>7}")
+        print(f"{'request size (KB)':<30} {req_json / 1024:>12.0f} {req_arrow / 1024:>12.0f} "
+              f"{req_json / req_arrow:>6.1f}x")
+        print(f"{'client encode (ms)':<30} {enc_json * 1000:>12.2f} {enc_arrow * 1000:>12.2f} "
+              f"{enc_json / enc_arrow:>6.1f}x")
+        print(f"{'server decode (ms)':<30} {dec_json * 1000:>12.2f} {dec_arrow * 1000:>12.2f} "
+              f"{dec_json / dec_arrow:>6.1f}x")
+        print(f"{'response size (KB)':<30} {resp_json / 1024:>12.0f} {resp_arrow / 1024:>12.0f} "
+              f"{resp_json / resp_arrow:>6.1f}x")
+        print(f"{'/predict/batch (ms)':<30} {e2e_json:>12.1f} {e2e_arrow:>12.1f} {e2e_json / e2e_arrow:>6.1f}x")
+        print(f"{'  Arrow + risk_factors':<30} {'':>12} {e2e_factors:>12.1f}   ({resp_factors / 1024:.0f} KB)")
+        print(f"{'  model alone (ms)':<30} {model * 1000:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000])
+    args = parser.parse_args()
+    os.environ.update({'RESPONSE_CACHE_SIZE': '0', 'LOG_LEVEL': 'WARNING'})
+    asyncio.run(run(args.sizes))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Request latency while the API hot-reloads its model.
+
+Copies the served artifact into two versions in a temporary versions
+directory, then sends /predict requests through the ASGI app at fixed
+concurrency twice: once with a steady model, once while a background thread
+keeps reloading between the two versions (load, warm-up and swap, as
+POST /admin/model/reload does). Reports latency percentiles for both phases,
+failed requests and the model versions seen in responses.
+
+Usage:
+    python -m benchmarks.bench_hot_reload [--requests 3000] [--concurrency 8]
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from benchmarks.common import BASE_DIR, load_applications
+
+VERSIONS = ['v1', 'v2']
+
+
+def make_versions(root):
+    models = BASE_DIR / 'models'
+    for version in VERSIONS:
+        out = Path(root) / version
+        out.mkdir()
+        shutil.copy2(models / 'credit_risk_pipeline.pkl', out / 'credit_risk_pipeline.pkl')
+        shutil.copytree(models / 'serving', out / 'serving')
+        (out / 'metrics.json').write_text(json.dumps({'version': version}))
+
+
+async def run_phase(app, payloads, concurrency):
+    import httpx
+
+    latencies, versions, failures = [], {}, 0
+    next_index = 0
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench') as client:
+        async def worker():
+            nonlocal next_index, failures
+            while next_index < len(payloads):
+                payload = payloads[next_index]
+                next_index += 1
+                start = time.perf_counter()
+                response = await client.post('/predict', json=payload)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    failures += 1
+                    continue
+                version = response.json()['model_version']
+                versions[version] = versions.get(version, 0) + 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    latencies.sort()
+    return {
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99)] * 1000,
+        'max_ms': latencies[-1] * 1000,
+        'failures': failures,
+        'versions': versions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--pause', type=float, default=0.2, help='Seconds between reloads')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    make_versions(root)
+    os.environ.update({'MODEL_VERSIONS_DIR': root, 'MODEL_VERSION': VERSIONS[0],
+                       'RESPONSE_CACHE_SIZE': '0', 'LOG_LEVEL': 'WARNING'})
+    from src.main import app, models
+
+    payloads = load_applications(args.requests).to_dict('records')
+    asyncio.run(run_phase(app, payloads[:200], args.concurrency))  # warm up the route
+
+    steady = asyncio.run(run_phase(app, payloads, args.concurrency))
+
+    stop = threading.Event()
+    reload_times = []
+
+    def keep_reloading():
+        while not stop.is_set():
+            target = VERSIONS[1] if models.current.version == VERSIONS[0] else VERSIONS[0]
+            start = time.perf_counter()
+            models.reload(target)
+            reload_times.append(time.perf_counter() - start)
+            stop.wait(args.pause)
+
+    reloader = threading.Thread(target=keep_reloading, daemon=True)
+    reloader.start()
+    reloading = asyncio.run(run_phase(app, payloads, args.concurrency))
+    stop.set()
+    reloader.join()
+    shutil.rmtree(root)
+
+    print(f"{len(reload_times)} reloads during the second phase, "
+          f"{sum(reload_times) / len(reload_times) * 1000:.0f} ms each (load + warm-up + swap)")
+    print(f"\n{'phase':<10} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'failed':>7}  versions")
+    for name, r in (('steady', steady), ('reloading', reloading)):
+        print(f"{name:<10} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['max_ms']:>8.2f} {r['failures']:>7}  "
+              f"{r['versions']}")
+
+
+if __name__ == '__main__':
+    main()
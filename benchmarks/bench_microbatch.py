@@ -0,0 +1,97 @@
+"""
+Concurrent `/predict` throughput with and without micro-batching.
+
+Drives the app in-process through httpx's ASGI transport. Each configuration
+runs in a fresh interpreter because the batcher is configured at import time.
+
+Usage:
+    python -m benchmarks.bench_microbatch [--requests 2000] [--concurrency 64]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+
+CONFIGS = [
+    {"MICROBATCH_ENABLED": "0"},
+    {"MICROBATCH_ENABLED": "1", "MICROBATCH_MAX_WAIT_MS": "1", "MICROBATCH_MAX_SIZE": "32"},
+    {"MICROBATCH_ENABLED": "1", "MICROBATCH_MAX_WAIT_MS": "2", "MICROBATCH_MAX_SIZE": "64"},
+    {"MICROBATCH_ENABLED": "1", "MICROBATCH_MAX_WAIT_MS": "5", "MICROBATCH_MAX_SIZE": "256"},
+]
+
+
+async def drive(n_requests, concurrency):
+    import httpx
+
+    from benchmarks.common import load_applications
+    from src.main import app
+
+    payloads = load_applications(n_requests).to_dict('records')
+    latencies = []
+    queue = asyncio.Queue()
+    for p in payloads:
+        queue.put_nowait(p)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench') as client:
+        async def worker():
+            while not queue.empty():
+                payload = queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.post('/predict', json=payload)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        stats = (await client.get('/metrics/batching')).json()
+
+    latencies.sort()
+    return {
+        "rps": n_requests / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "mean_batch_size": stats.get("mean_batch_size"),
+        "max_queue_depth": stats.get("max_queue_depth"),
+    }
+
+
+def run_child(n_requests, concurrency):
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = asyncio.run(drive(n_requests, concurrency))
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.requests, args.concurrency)
+        return
+
+    print(f"{'config':<34} {'rps':>8} {'p50 ms':>8} {'p99 ms':>8} {'batch':>6} {'queue':>6}")
+    for config in CONFIGS:
+        env = {**os.environ, **config}
+        out = subprocess.run(
+            [sys.executable, '-W', 'ignore', '-m', 'benchmarks.bench_microbatch', '--child',
+             '--requests', str(args.requests), '--concurrency', str(args.concurrency)],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        r = json.loads(out)
+        label = ' '.join(f"{k.replace('MICROBATCH_', '').lower()}={v}" for k, v in config.items())
+        batch = f"{r['mean_batch_size']:.1f}" if r['mean_batch_size'] is not None else '-'
+        queue = str(r['max_queue_depth']) if r['max_queue_depth'] is not None else '-'
+        print(f"{label:<34} {r['rps']:>8,.0f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {batch:>6} {queue:>6}")
+
+
+if __name__ == '__main__':
+    main()
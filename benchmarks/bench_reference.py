@@ -0,0 +1,103 @@
+"""
+Percentile and segment lookups: memory-mapped reference index vs the training CSV.
+
+Compares, for the served model in models/:
+- open: `load_reference` (memory-mapped .npy files) vs reading and cleaning
+  data/credit_risk_dataset.csv into a DataFrame
+- lookup: one overall plus one grade x intent percentile rank, by binary
+  search over the quantile tables vs a scan of the DataFrame
+- context: percentiles of every reference feature, overall and within the
+  segment, for a batch of applications
+
+and the resident size of each (table bytes vs DataFrame memory).
+
+Usage:
+    python -m benchmarks.bench_reference [--lookups 2000] [--batch 1000]
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.common import DATA_PATH, best_of, load_applications
+from src.features import RAW_COLUMNS, engineer_features
+from src.reference import load_reference
+
+
+def csv_percentile(df, feature, value, grade=None, intent=None):
+    """Share of training rows at or below `value` (percent), optionally within a segment."""
+    column = df[feature]
+    if grade is not None:
+        column = column[(df['loan_grade'] == grade) & (df['loan_intent'] == intent)]
+    return float((column <= value).mean() * 100)
+
+
+def load_csv():
+    from src.train import clean, load_dataset, split
+
+    x = split(clean(load_dataset(DATA_PATH)))[0].copy()
+    for name, values in engineer_features({c: x[c].to_numpy() for c in RAW_COLUMNS}).items():
+        if name not in ('loan_grade', 'loan_grade_letter'):
+            x[name] = values
+    return x
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--batch', type=int, default=1000)
+    args = parser.parse_args()
+
+    open_mmap = best_of(lambda: load_reference('models'), repeat=5)
+    open_csv = best_of(load_csv, repeat=3)
+    reference = load_reference('models')
+    df = load_csv()
+
+    apps = load_applications(max(args.lookups, args.batch))
+    incomes = apps['person_income'].to_numpy()
+    grades = apps['loan_grade'].to_numpy()
+    intents = apps['loan_intent'].to_numpy()
+
+    def lookups_mmap():
+        for i in range(args.lookups):
+            segment = reference.segment_ids([grades[i]], [intents[i]])
+            reference.percentiles('person_income', [incomes[i]])
+            reference.percentiles('person_income', [incomes[i]], segment)
+
+    def lookups_csv():
+        for i in range(args.lookups):
+            csv_percentile(df, 'person_income', incomes[i])
+            csv_percentile(df, 'person_income', incomes[i], grades[i], intents[i])
+
+    lookup_mmap = best_of(lookups_mmap) / args.lookups
+    lookup_csv = best_of(lookups_csv, repeat=1) / args.lookups
+
+    batch = apps.head(args.batch)
+    features = {c: batch[c].to_numpy() for c in RAW_COLUMNS}
+    features.update(engineer_features(features))
+
+    def context_csv():
+        for i in range(args.batch):
+            for name in reference.features:
+                csv_percentile(df, name, features[name][i])
+                csv_percentile(df, name, features[name][i], grades[i], intents[i])
+
+    context_mmap = best_of(lambda: reference.context(features, args.batch))
+    context_csv = best_of(context_csv, repeat=1) if args.batch <= 200 else None
+
+    # Agreement of the two methods: the tables interpolate between 0.5% levels
+    # and rank ties at their middle, the scan counts rows at or below
+    diffs = [abs(reference.percentiles('person_income', [v])[0] - csv_percentile(df, 'person_income', v))
+             for v in incomes[:200]]
+
+    print(f"{'':<28} {'reference (mmap)':>18} {'training CSV':>14}")
+    print(f"{'open':<28} {open_mmap * 1000:>15.2f} ms {open_csv * 1000:>11.1f} ms")
+    print(f"{'lookup (overall + segment)':<28} {lookup_mmap * 1e6:>15.1f} us {lookup_csv * 1e6:>11.1f} us")
+    csv_text = f"{context_csv * 1000:>11.1f} ms" if context_csv is not None else f"{'(skipped)':>14}"
+    print(f"{f'context, {args.batch} rows':<28} {context_mmap * 1000:>15.2f} ms {csv_text}")
+    print(f"{'resident size':<28} {reference.info()['bytes'] / 1024:>15.0f} KB "
+          f"{df.memory_usage(deep=True).sum() / 1024:>11.0f} KB")
+    print(f"percentile difference vs the CSV scan: mean {np.mean(diffs):.2f}, max {np.max(diffs):.2f} points")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Client latency of /predict with shadow scoring off and on.
+
+Copies the served artifact into a temporary versions directory as the shadow
+model, then sends /predict requests through the ASGI app at fixed
+concurrency: without a shadow model, with one, and with one behind a tiny
+queue (to show load shedding instead of queueing). Reports latency
+percentiles, shadowed and shed requests.
+
+Usage:
+    python -m benchmarks.bench_shadow [--requests 3000] [--concurrency 8]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_hot_reload import VERSIONS, make_versions, run_phase
+from benchmarks.common import load_applications
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    make_versions(root)
+    os.environ.update({'MODEL_VERSIONS_DIR': root, 'RESPONSE_CACHE_SIZE': '0', 'LOG_LEVEL': 'WARNING',
+                       'SHADOW_LOG_PATH': str(Path(root) / 'shadow.jsonl')})
+    from src.main import app, load_candidate, shadow
+
+    payloads = load_applications(args.requests).to_dict('records')
+    asyncio.run(run_phase(app, payloads[:200], args.concurrency))  # warm up the route
+    candidate = load_candidate(VERSIONS[1])
+
+    results = {}
+    for name, model, max_queue in (('off', None, 1000), ('shadow', candidate, 1000), ('queue=4', candidate, 4)):
+        shadow.set_model(model)
+        shadow._queue.maxsize = max_queue
+        shadow.submitted = shadow.shed = 0
+        results[name] = asyncio.run(run_phase(app, payloads, args.concurrency))
+        # Let the shadow thread drain before the next phase
+        while shadow._queue.qsize():
+            time.sleep(0.01)
+        results[name].update(submitted=shadow.submitted, shed=shadow.shed, scored=shadow.scored)
+    shadow.set_model(None)
+    shutil.rmtree(root)
+
+    print(f"{'shadow':<8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'shadowed':>9} {'shed':>6}")
+    for name, r in results.items():
+        print(f"{name:<8} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['max_ms']:>8.2f} "
+              f"{r['submitted'] - r['shed']:>9} {r['shed']:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+/whatif grid scoring vs a single /predict and vs one /predict per grid point.
+
+Sends requests through the ASGI app (response cache off) and reports median
+latency of:
+- one /predict request
+- one /whatif request over a --points grid of loan_amnt x loan_int_rate,
+  with and without the maximum-approvable-amount search (per interest rate)
+- the same grid as one /predict round trip per point (a subsample, scaled up)
+
+Usage:
+    python -m benchmarks.bench_whatif [--points 1000] [--repeat 50]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import numpy as np
+
+from benchmarks.common import load_applications
+
+
+async def median_ms(client, path, payload, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = await client.post(path, json=payload)
+        timings.append(time.perf_counter() - start)
+        response.raise_for_status()
+    return statistics.median(timings) * 1000
+
+
+async def run(args):
+    import httpx
+
+    from src.main import app
+
+    application = load_applications(1, seed=7).iloc[0].to_dict()
+    rates = 20
+    amounts = np.linspace(1000, 35000, args.points // rates).round().tolist()
+    grid = {'loan_amnt': amounts, 'loan_int_rate': np.linspace(6, 22, rates).round(2).tolist()}
+    points = len(amounts) * rates
+    singles = [{**application, 'loan_amnt': a, 'loan_int_rate': r}
+               for a in amounts[::max(1, len(amounts) // 10)] for r in grid['loan_int_rate'][::4]]
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench') as client:
+        await median_ms(client, '/predict', application, 20)  # warm up
+        predict = await median_ms(client, '/predict', application, args.repeat)
+        surface = await median_ms(client, '/whatif', {'application': application, 'grid': grid,
+                                                      'boundary': False}, args.repeat)
+        boundary = await median_ms(client, '/whatif', {'application': application, 'grid': grid}, args.repeat)
+        response = await client.post('/whatif', json={'application': application, 'grid': grid})
+        calls = response.json()['boundary']['model_calls']
+        start = time.perf_counter()
+        for payload in singles:
+            (await client.post('/predict', json=payload)).raise_for_status()
+        per_point = (time.perf_counter() - start) / len(singles) * points * 1000
+
+    print(f"{'single /predict':<44} {predict:>9.2f} ms")
+    print(f"{f'/whatif, {points} points':<44} {surface:>9.2f} ms")
+    print(f"{f'/whatif, {points} points + boundary ({calls} calls)':<44} {boundary:>9.2f} ms")
+    print(f"{f'{points} x /predict (estimated from {len(singles)})':<44} {per_point:>9.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--points', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    os.environ.update({'RESPONSE_CACHE_SIZE': '0', 'LOG_LEVEL': 'WARNING'})
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Parity check: fast inference paths versus `pipeline.predict_proba`.
+
+Scores every row of `data/credit_risk_dataset.csv` (missing values included)
+through the pipeline, the fast path, the slim artifact in models/serving and
+the compiled trees, and exits non-zero if any probability differs. Also
+reports the p50/p99 latency of the model step for single-row requests.
+The same parity is enforced by tests/test_parity.py.
+
+Usage:
+    python -m benchmarks.check_parity
+"""
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import DATA_PATH
+from src.fast_inference import FastScorer
+from src.features import RAW_COLUMNS, engineer_features
+from src.main import MODEL_PATH, SERVING_DIR
+from src.tree_inference import CompiledTrees
+
+
+def main():
+    pipeline = joblib.load(MODEL_PATH)
+    scorer = FastScorer.from_pipeline(pipeline)
+    df = pd.read_csv(DATA_PATH)[RAW_COLUMNS]
+
+    trees = CompiledTrees.from_booster(scorer.booster, scorer.iteration_range)
+
+    def predict_trees(columns):
+        features = dict(columns)
+        features.update(engineer_features(columns))
+        n = len(columns['person_age'])
+        return trees.predict_proba(scorer.encode(features, n))
+
+    expected = pipeline.predict_proba(df)[:, 1]
+    columns = {c: df[c].to_numpy() for c in RAW_COLUMNS}
+    candidates = [('fast', scorer.predict_raw), ('slim', FastScorer.load(SERVING_DIR).predict_raw),
+                  ('trees', predict_trees)]
+    mismatches = 0
+    for name, predict in candidates:
+        actual = predict(columns)
+        diff = int(np.sum(expected != actual))
+        mismatches += diff
+        print(f"{name}: rows {len(df):,}  mismatched probabilities: {diff}  "
+              f"max abs diff: {np.nanmax(np.abs(expected - actual)):.3g}")
+
+    # Model step latency for single requests (engineer + encode + predict)
+    rows = [{c: np.array([v]) for c, v in r.items()} for r in df.head(2000).to_dict('records')]
+    for name, predict in [('fast', scorer.predict_raw), ('trees', predict_trees)]:
+        timings = []
+        for row in rows:
+            start = time.perf_counter()
+            predict(row)
+            timings.append(time.perf_counter() - start)
+        p50, p99 = np.percentile(timings, [50, 99]) * 1000
+        print(f"{name} single-row latency: p50 {p50:.3f} ms  p99 {p99:.3f} ms")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
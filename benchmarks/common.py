@@ -0,0 +1,33 @@
+"""Shared helpers for the benchmark scripts (run from the project root)."""
+import time
+from pathlib import Path
+
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_PATH = BASE_DIR / 'data' / 'credit_risk_dataset.csv'
+
+
+def load_applications(n, seed=42):
+    """
+    Sample `n` complete applications from the training CSV.
+
+    Rows are drawn with replacement so `n` can exceed the dataset size.
+
+    Returns:
+        DataFrame with only the `LoanApplication` columns
+    """
+    from src.features import RAW_COLUMNS
+
+    df = pd.read_csv(DATA_PATH).dropna(subset=RAW_COLUMNS)
+    return df[RAW_COLUMNS].sample(n, replace=True, random_state=seed).reset_index(drop=True)
+
+
+def best_of(fn, repeat=3):
+    """Run `fn` `repeat` times and return the fastest wall-clock time in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
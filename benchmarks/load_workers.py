@@ -0,0 +1,109 @@
+"""
+Per-worker memory and aggregate throughput of the preforked gunicorn server.
+
+For each worker count, starts `gunicorn src.main:app` (config from
+gunicorn.conf.py), drives `/predict` over HTTP at a fixed concurrency, and
+reads each worker's RSS and PSS from /proc/<pid>/smaps_rollup. PSS splits
+shared pages between the processes mapping them, so a PSS well below RSS
+means the copy-on-write model pages really are shared. Linux only.
+
+Usage:
+    python -m benchmarks.load_workers [--max-workers 4] [--requests 2000] [--concurrency 32]
+"""
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.common import BASE_DIR, load_applications
+
+
+def memory_kb(pid):
+    """RSS and PSS of one process, in kB."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                values[key] = int(rest.split()[0])
+    return values.get('Rss', 0), values.get('Pss', 0)
+
+
+def child_pids(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(p) for p in f.read().split()]
+
+
+def wait_ready(url, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"server at {url} did not come up")
+
+
+async def drive(url, payloads, concurrency):
+    queue = asyncio.Queue()
+    for p in payloads:
+        queue.put_nowait(p)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        async def worker():
+            while not queue.empty():
+                response = await client.post('/predict', json=queue.get_nowait())
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return len(payloads) / (time.perf_counter() - start)
+
+
+def run(n_workers, port, payloads, concurrency):
+    env = {**os.environ, 'WEB_CONCURRENCY': str(n_workers), 'PORT': str(port)}
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'src.main:app', '--bind', f'127.0.0.1:{port}'],
+        cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f'http://127.0.0.1:{port}'
+    try:
+        wait_ready(url + '/')
+        while len(child_pids(server.pid)) < n_workers:
+            time.sleep(0.1)
+        rps = asyncio.run(drive(url, payloads, concurrency))
+        master_rss, _ = memory_kb(server.pid)
+        workers = [memory_kb(pid) for pid in child_pids(server.pid)]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+    rss = sum(r for r, _ in workers) / len(workers) / 1024
+    pss = sum(p for _, p in workers) / len(workers) / 1024
+    return rps, master_rss / 1024, rss, pss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    payloads = load_applications(args.requests).to_dict('records')
+    print(f"{'workers':>7} {'rps':>8} {'master RSS MB':>14} {'worker RSS MB':>14} {'worker PSS MB':>14}")
+    for n in range(1, args.max_workers + 1):
+        rps, master, rss, pss = run(n, args.port, payloads, args.concurrency)
+        print(f"{n:>7} {rps:>8,.0f} {master:>14.1f} {rss:>14.1f} {pss:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
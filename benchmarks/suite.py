@@ -0,0 +1,298 @@
+"""
+Benchmark suite for the scoring API, with JSON results for run-to-run comparison.
+
+Parts (all offline and CPU-only; inputs sampled from data/credit_risk_dataset.csv):
+- micro:    feature engineering, predict_proba (sklearn pipeline, fast path
+            and compiled trees) and risk-factor rules at batch sizes 1 to 100k
+- load:     in-process ASGI load test of /predict and /Calculating_DTI at
+            fixed concurrency levels: p50/p95/p99 latency and RPS
+- artifact: import and load time, resident memory and size of the pickled pipeline and
+            the slim serving artifact, each in a fresh interpreter
+
+The response cache is disabled so every request is really scored.
+
+Usage:
+    python -m benchmarks.suite                          # all parts -> benchmarks/results/<time>.json
+    python -m benchmarks.suite --parts micro --quick
+    python -m benchmarks.suite --compare benchmarks/results/before.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from benchmarks.common import BASE_DIR, best_of, load_applications
+
+RESULTS_DIR = BASE_DIR / 'benchmarks' / 'results'
+BATCH_SIZES = [1, 10, 100, 1_000, 10_000, 100_000]
+QUICK_BATCH_SIZES = [1, 100, 10_000]
+CONCURRENCY = [1, 16, 64]
+ENDPOINTS = ['/predict', '/Calculating_DTI']
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def repeats_for(n):
+    # Enough repeats for a stable best-of at small sizes, few at large ones
+    return max(3, min(200, 200_000 // max(n, 1)))
+
+
+def run_micro(batch_sizes):
+    from src.features import RAW_COLUMNS, engineer_features
+    from src.main import models, rule_engine
+    from src.tree_inference import CompiledTrees
+
+    fast_scorer, pipeline = models.current.fast_scorer, models.current.pipeline
+    trees = CompiledTrees.from_booster(fast_scorer.booster, fast_scorer.iteration_range)
+    results = []
+    for n in batch_sizes:
+        df = load_applications(n)
+        columns = {c: df[c].to_numpy() for c in RAW_COLUMNS}
+        features = dict(columns)
+        features.update(engineer_features(columns))
+        raw = df[RAW_COLUMNS]
+        repeat = repeats_for(n)
+
+        timings = {
+            'engineer_features': best_of(lambda: engineer_features(columns), repeat),
+            'fast_predict_proba': best_of(lambda: fast_scorer.predict_proba(features, n), repeat),
+            'trees_predict_proba': best_of(lambda: trees.predict_proba(fast_scorer.encode(features, n)), repeat),
+            'rules': best_of(lambda: rule_engine.evaluate(features, n), max(3, repeat // 10)),
+        }
+        if pipeline is not None:
+            timings['pipeline_predict_proba'] = best_of(lambda: pipeline.predict_proba(raw), repeat)
+
+        row = {'batch': n}
+        for name, seconds in timings.items():
+            row[f'{name}_ms'] = seconds * 1000
+            row[f'{name}_rows_per_s'] = n / seconds
+        results.append(row)
+
+        print(f"  batch {n:>7}: " + ', '.join(f"{k} {v * 1000:.3f} ms" for k, v in timings.items()))
+    return results
+
+
+async def _load(endpoint, n_requests, concurrency):
+    import httpx
+
+    from src.main import app
+
+    payloads = load_applications(n_requests, seed=concurrency).to_dict('records')
+    latencies = []
+    next_index = 0
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench') as client:
+        # Warm up the route before timing
+        for payload in payloads[:20]:
+            (await client.post(endpoint, json=payload)).raise_for_status()
+
+        async def worker():
+            nonlocal next_index
+            while next_index < n_requests:
+                payload = payloads[next_index]
+                next_index += 1
+                start = time.perf_counter()
+                response = await client.post(endpoint, json=payload)
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'endpoint': endpoint,
+        'concurrency': concurrency,
+        'requests': n_requests,
+        'rps': n_requests / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def run_load(n_requests, concurrency_levels):
+    results = []
+    for endpoint in ENDPOINTS:
+        for concurrency in concurrency_levels:
+            r = asyncio.run(_load(endpoint, n_requests, concurrency))
+            results.append(r)
+            print(f"  {endpoint:<17} c={concurrency:<3} {r['rps']:>8,.0f} rps  "
+                  f"p50 {r['p50_ms']:.2f}  p95 {r['p95_ms']:.2f}  p99 {r['p99_ms']:.2f} ms")
+    return results
+
+
+ARTIFACT_CHILD = '''
+import json, time
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+
+start = time.perf_counter()
+{imports}
+imported = time.perf_counter()
+before = rss_mb()
+{load}
+loaded = time.perf_counter()
+print(json.dumps({{"import_s": imported - start, "load_s": loaded - imported,
+                  "rss_delta_mb": rss_mb() - before, "rss_mb": rss_mb()}}))
+'''
+
+ARTIFACTS = {
+    'pipeline': {
+        'imports': 'import joblib, sklearn, xgboost, pandas',
+        'load': "joblib.load('models/credit_risk_pipeline.pkl')",
+        'files': ['models/credit_risk_pipeline.pkl'],
+    },
+    'slim': {
+        'imports': 'import xgboost\nfrom src.fast_inference import FastScorer',
+        'load': "FastScorer.load('models/serving')",
+        'files': ['models/serving/booster.ubj', 'models/serving/preprocess.json'],
+    },
+}
+
+
+def run_artifact(runs):
+    results = []
+    for name, spec in ARTIFACTS.items():
+        samples = []
+        for _ in range(runs):
+            out = subprocess.run(
+                [sys.executable, '-W', 'ignore', '-c', ARTIFACT_CHILD.format(**spec)],
+                cwd=BASE_DIR, capture_output=True, text=True, check=True,
+            ).stdout.strip().splitlines()[-1]
+            samples.append(json.loads(out))
+        best = min(samples, key=lambda s: s['load_s'])
+        row = {
+            'artifact': name,
+            'size_kb': sum((BASE_DIR / f).stat().st_size for f in spec['files']) / 1024,
+            'import_ms': best['import_s'] * 1000,
+            'load_ms': best['load_s'] * 1000,
+            'rss_delta_mb': best['rss_delta_mb'],
+            'rss_mb': best['rss_mb'],
+        }
+        results.append(row)
+        print(f"  {name:<9} {row['size_kb']:>7.0f} KB  import {row['import_ms']:.0f} ms  load {row['load_ms']:.1f} ms  "
+              f"+{row['rss_delta_mb']:.1f} MB (process {row['rss_mb']:.0f} MB)")
+    return results
+
+
+def environment():
+    import numpy
+    import sklearn
+    import xgboost
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': numpy.__version__,
+        'scikit-learn': sklearn.__version__,
+        'xgboost': xgboost.__version__,
+    }
+
+
+# (part, key fields, metric, higher is better)
+COMPARED = [
+    ('micro', ('batch',), 'engineer_features_ms', False),
+    ('micro', ('batch',), 'fast_predict_proba_ms', False),
+    ('micro', ('batch',), 'trees_predict_proba_ms', False),
+    ('micro', ('batch',), 'pipeline_predict_proba_ms', False),
+    ('micro', ('batch',), 'rules_ms', False),
+    ('load', ('endpoint', 'concurrency'), 'rps', True),
+    ('load', ('endpoint', 'concurrency'), 'p99_ms', False),
+    ('artifact', ('artifact',), 'load_ms', False),
+    ('artifact', ('artifact',), 'rss_delta_mb', False),
+]
+
+
+def compare(baseline, current, tolerance=0.10):
+    """Print metric changes against a previous run; flags regressions beyond `tolerance`."""
+    print(f"\nComparison with {baseline['environment'].get('commit')} "
+          f"({baseline['environment'].get('timestamp')}):")
+    regressions = 0
+    for part, keys, metric, higher_better in COMPARED:
+        old_rows = {tuple(r[k] for k in keys): r for r in baseline.get(part, [])}
+        for row in current.get(part, []):
+            old = old_rows.get(tuple(row[k] for k in keys))
+            if old is None or metric not in old or metric not in row or not old[metric]:
+                continue
+            change = row[metric] / old[metric] - 1
+            worse = -change if higher_better else change
+            flag = '  REGRESSION' if worse > tolerance else ''
+            regressions += bool(flag)
+            label = ' '.join(str(row[k]) for k in keys)
+            print(f"  {part:<8} {label:<22} {metric:<26} {old[metric]:>10.3f} -> {row[metric]:>10.3f} "
+                  f"({change:+.1%}){flag}")
+    print(f"{regressions} regression(s) beyond {tolerance:.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--parts', nargs='+', choices=['micro', 'load', 'artifact'],
+                        default=['micro', 'load', 'artifact'])
+    parser.add_argument('--quick', action='store_true', help='Fewer batch sizes and requests')
+    parser.add_argument('--requests', type=int, default=None, help='Requests per load-test run')
+    parser.add_argument('--runs', type=int, default=3, help='Fresh interpreters per artifact')
+    parser.add_argument('--output', default=None, help='Results file (default: benchmarks/results/<time>.json)')
+    parser.add_argument('--compare', default=None, help='Previous results file to compare against')
+    args = parser.parse_args()
+
+    # Measure scoring, not cache hits or debug logging
+    os.environ['RESPONSE_CACHE_SIZE'] = '0'
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    results = {'environment': environment()}
+    with contextlib.redirect_stdout(io.StringIO()):
+        import src.main  # noqa: F401  (load the model before timing anything)
+    results['environment']['serving_artifact'] = src.main.SERVING_ARTIFACT
+    results['environment']['inference_backend'] = src.main.INFERENCE_BACKEND
+
+    if 'micro' in args.parts:
+        print("Microbenchmarks")
+        results['micro'] = run_micro(QUICK_BATCH_SIZES if args.quick else BATCH_SIZES)
+    if 'load' in args.parts:
+        print("ASGI load test")
+        n_requests = args.requests or (500 if args.quick else 3000)
+        results['load'] = run_load(n_requests, CONCURRENCY)
+    if 'artifact' in args.parts:
+        print("Model artifacts")
+        results['artifact'] = run_artifact(args.runs)
+
+    output = args.output
+    if output is None:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        output = RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        compare(baseline, results)
+
+
+if __name__ == '__main__':
+    main()
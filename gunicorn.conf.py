@@ -0,0 +1,39 @@
+"""
+Production server config: gunicorn master with preforked uvicorn workers.
+
+    gunicorn src.main:app
+
+The app (model, compiled tables, rule table) is imported once in the master
+(`preload_app`) and workers are forked from it, so they share the read-only
+model pages copy-on-write instead of each unpickling their own copy. Each
+worker then pins XGBoost to its share of the cores, for every model it
+holds (served, rollback history, shadow, challenger, later reloads), so N
+workers do not oversubscribe the CPU.
+
+Environment:
+    WEB_CONCURRENCY   number of workers (default: CPU count)
+    XGBOOST_NTHREAD   XGBoost threads per worker (default: CPUs / workers, at least 1)
+    PORT              listen port (default: 8000)
+"""
+import gc
+import os
+
+workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+preload_app = True
+timeout = 60
+
+
+def when_ready(server):
+    # Move everything allocated while loading the app out of the collector's
+    # reach, so GC passes in the workers don't touch (and copy) those pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from src.main import set_model_threads
+
+    nthread = int(os.getenv("XGBOOST_NTHREAD", max(1, (os.cpu_count() or 1) // workers)))
+    set_model_threads(nthread)
+    server.log.info("Worker %s: XGBoost nthread=%s", worker.pid, nthread)
@@ -1,14 +1,21 @@
+import asyncio
 import requests
 import os
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.tools import tool
 from dotenv import load_dotenv
 
+from src.scoring_client import make_async_client, make_client, normalize_application
+
 load_dotenv()
 
 # Get API URL from environment variable or use default
 API_BASE_URL = os.getenv("API_BASE_URL", "http://127.0.0.1:8000")
 
+# Pooled, retrying connection to the API (timeouts and retries: API_* in .env),
+# or the scoring core loaded in this process with SCORING_BACKEND=inprocess
+client = make_client(base_url=API_BASE_URL)
+
 llm = ChatGoogleGenerativeAI(
     model="gemini-flash-latest",
     temperature=0,
@@ -46,38 +53,259 @@ def calculate_credit_risk(
     Returns:
         Dictionary with probability, decision, and top risk factors
     """
-    url = f"{API_BASE_URL}/predict"
-    
-    payload = {
-        "person_age": person_age,
-        "person_income": person_income,
-        "person_home_ownership": person_home_ownership.upper(),
-        "person_emp_length": person_emp_length,
-        "loan_intent": loan_intent.upper().replace(" ", ""),
-        "loan_grade": loan_grade.upper(),
-        "loan_amnt": loan_amnt,
-        "loan_int_rate": loan_int_rate,
-        "cb_person_default_on_file": cb_person_default_on_file.upper(),
-        "cb_person_cred_hist_length": cb_person_cred_hist_length
-    }
-    
+    payload = normalize_application(locals())
+
     print(f"Calling API with payload: {payload}")
-    
+
     try:
-        response = requests.post(url, json=payload)
-        if response.status_code != 200:
-            return {"error": f"API returned status {response.status_code}: {response.text}"}
-        return response.json()
+        return _tool_result(client.score(payload))
     except requests.exceptions.ConnectionError:
         return {"error": f"Cannot connect to API. Make sure the FastAPI server is running on {API_BASE_URL}"}
     except Exception as e:
         return {"error": str(e)}
 
+
+def _tool_result(response):
+    if response.status_code != 200:
+        return {"error": f"API returned status {response.status_code}: {response.text}"}
+    return response.json()
+
+
+# httpx clients are bound to the event loop they were created in
+_async_client = None
+_async_loop = None
+
+
+def _get_async_client():
+    global _async_client, _async_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_loop is not loop:
+        _async_client = make_async_client(client, API_BASE_URL)
+        _async_loop = loop
+    return _async_client
+
+
+async def _acalculate_credit_risk(**application):
+    # Async variant used by `calculate_credit_risk.ainvoke`, so concurrent tool
+    # calls share one pooled connection set instead of blocking each other
+    payload = normalize_application(application)
+    try:
+        return _tool_result(await _get_async_client().score(payload))
+    except Exception as e:
+        if "connect" in type(e).__name__.lower():
+            return {"error": f"Cannot connect to API. Make sure the FastAPI server is running on {API_BASE_URL}"}
+        return {"error": str(e)}
+
+
+calculate_credit_risk.coroutine = _acalculate_credit_risk
+
 tools = [calculate_credit_risk]
+tools_by_name = {t.name: t for t in tools}
 
 # Create agent by binding tools to the LLM
 agent = llm.bind_tools(tools)
 
+
+def _batch_payloads(tool_calls):
+    """Indices and payloads of the credit-risk calls, or None if any cannot be normalized."""
+    indices = [i for i, call in enumerate(tool_calls) if call['name'] == calculate_credit_risk.name]
+    try:
+        return indices, [normalize_application(tool_calls[i]['args']) for i in indices]
+    except (KeyError, AttributeError, TypeError):
+        return indices, None
+
+
+def run_tool_calls(tool_calls):
+    """
+    Execute the LLM's tool calls.
+
+    Several credit-risk calls are scored with one `/predict/batch` request;
+    if that fails they are retried one by one, so a single bad application
+    only errors its own call.
+
+    Returns:
+        List of tool results, in `tool_calls` order
+    """
+    results = [None] * len(tool_calls)
+    indices, payloads = _batch_payloads(tool_calls)
+    if payloads and len(payloads) > 1:
+        try:
+            response = client.score_many(payloads)
+            if response.status_code == 200:
+                for i, result in zip(indices, response.json()):
+                    results[i] = result
+        except requests.exceptions.RequestException:
+            pass
+
+    for i, call in enumerate(tool_calls):
+        if results[i] is None:
+            results[i] = tools_by_name[call['name']].invoke(call['args'])
+    return results
+
+
+async def arun_tool_calls(tool_calls):
+    """Async `run_tool_calls`: one batch request, else all calls concurrently."""
+    results = [None] * len(tool_calls)
+    indices, payloads = _batch_payloads(tool_calls)
+    if payloads and len(payloads) > 1:
+        try:
+            response = await _get_async_client().score_many(payloads)
+            if response.status_code == 200:
+                for i, result in zip(indices, response.json()):
+                    results[i] = result
+        except Exception:
+            pass
+
+    pending = [i for i, r in enumerate(results) if r is None]
+    outcomes = await asyncio.gather(*(tools_by_name[tool_calls[i]['name']].ainvoke(tool_calls[i]['args'])
+                                      for i in pending))
+    for i, outcome in zip(pending, outcomes):
+        results[i] = outcome
+    return results
+
+
+def print_report(tool_result):
+    """Print the assessment report for one tool result."""
+    print(f"\n{'='*70}")
+    print(" "*20 + "CREDIT RISK ASSESSMENT REPORT")
+    print('='*70)
+    if 'error' in tool_result:
+        print(f"\n[ERROR] {tool_result['error']}")
+    else:
+        prob = tool_result.get('probability', 0)
+        decision = tool_result.get('decision', 'N/A')
+        risk = tool_result.get('risk_level', 'N/A')
+        factors = tool_result.get('risk_factors', [])
+        
+        # Calculate Credit Score (300-900 scale)
+        # Lower probability = Higher score
+        credit_score = int(900 - (prob * 600))
+        
+        # ===== SECTION 1: MODEL PREDICTIONS =====
+        print(f"\n{'─'*70}")
+        print("SECTION 1: MODEL PREDICTIONS")
+        print('─'*70)
+        
+        print(f"\n┌─ Probability of Default (PD)")
+        print(f"│  Value: {prob:.4f} (Range: 0.00 - 1.00)")
+        print(f"│  Percentage: {prob*100:.2f}%")
+        print(f"└─ Interpretation: Likelihood of loan default")
+        
+        print(f"\n┌─ Credit Score")
+        print(f"│  Score: {credit_score}/900")
+        print(f"│  Rating: {'Excellent' if credit_score >= 750 else 'Good' if credit_score >= 650 else 'Fair' if credit_score >= 550 else 'Poor'}")
+        print(f"└─ Note: Derived from PD (300-900 scale)")
+        
+        print(f"\n┌─ Decision Outcome")
+        print(f"│  Status: {decision.upper()}")
+        print(f"│  Action: {'Accept Application' if decision == 'Approved' else 'Reject Application' if decision == 'Rejected' else 'Manual Review Required'}")
+        print(f"└─ Risk Level: {risk}")
+        
+        # ===== SECTION 2: DECISION RATIONALE =====
+        print(f"\n{'─'*70}")
+        print("SECTION 2: DECISION RATIONALE")
+        print('─'*70)
+        
+        if factors:
+            print(f"\n┌─ Primary Decision Factors")
+            print(f"│")
+            
+            # Show all factors with their impact
+            for i, factor in enumerate(factors, 1):
+                impact = factor.get('impact', 'UNKNOWN')
+                feature = factor.get('feature', 'Unknown')
+                note = factor.get('note', '')
+                
+                if impact == 'HIGH':
+                    indicator = "[HIGH RISK]"
+                    symbol = "▲"
+                elif impact == 'MEDIUM':
+                    indicator = "[MEDIUM RISK]"
+                    symbol = "▲"
+                elif impact == 'POSITIVE':
+                    indicator = "[POSITIVE]"
+                    symbol = "▼"
+                else:
+                    indicator = f"[{impact}]"
+                    symbol = "■"
+                
+                print(f"│  {i}. {feature}")
+                print(f"│     Impact Level: {indicator}")
+                if note:
+                    print(f"│     Details: {note}")
+                print(f"│")
+            
+            print(f"└─ Total Factors Analyzed: {len(factors)}")
+            
+            print(f"\n┌─ Feature Importance Ranking")
+            print(f"│  (Factors with highest impact on credit decision)")
+            print(f"│")
+            
+            # List factors by importance
+            important_factors = [f for f in factors if f.get('impact') in ['HIGH', 'MEDIUM', 'POSITIVE']]
+            for idx, factor in enumerate(important_factors[:5], 1):  # Top 5
+                feature_name = factor.get('feature', 'Unknown')
+                impact_level = factor.get('impact', 'N/A')
+                print(f"│  Rank {idx}: {feature_name} - {impact_level} Impact")
+            print(f"└─")
+        
+        # ===== SECTION 3: RECOMMENDATIONS =====
+        print(f"\n{'─'*70}")
+        print("SECTION 3: RECOMMENDATIONS")
+        print('─'*70)
+        
+        if decision == "Rejected":
+            print("\n[APPLICATION REJECTED]")
+            print("\n┌─ Rejection Reason Codes:")
+            print("│")
+            
+            # Extract high-risk factors as reason codes
+            high_risk_factors = [f for f in factors if f.get('impact') in ['HIGH', 'MEDIUM']]
+            for idx, factor in enumerate(high_risk_factors, 1):
+                print(f"│  Code {idx}: {factor.get('feature')}")
+                print(f"│           {factor.get('note', 'Negative impact on creditworthiness')}")
+                print("│")
+            print("└─")
+            
+            print("\n┌─ Improvement Actions:")
+            print("│  → Increase annual income or reduce loan amount")
+            print("│  → Improve credit grade through timely bill payments")
+            print("│  → Build employment stability and credit history")
+            print("│  → Clear any outstanding defaults")
+            print("│  → Consider adding a co-applicant with strong credit")
+            print("└─")
+        elif decision == "Refer":
+            print("\n[MANUAL REVIEW REQUIRED]")
+            print("\n┌─ Referral Reasons:")
+            print("│  → Borderline credit profile requires human assessment")
+            print("│  → Mixed risk indicators detected")
+            print("│  → Additional documentation may be necessary")
+            print("│  → Secondary verification recommended")
+            print("└─")
+        else:
+            print("\n[APPLICATION APPROVED]")
+            
+            # Show positive factors
+            positive_factors = [f for f in factors if f.get('impact') == 'POSITIVE']
+            if positive_factors:
+                print("\n┌─ Application Strengths:")
+                print("│")
+                for idx, factor in enumerate(positive_factors, 1):
+                    print(f"│  ✓ {factor.get('feature')}")
+                print("└─")
+            
+            print("\n┌─ Credit Maintenance Guidelines:")
+            print("│  → Maintain regular payment schedule")
+            print("│  → Avoid multiple simultaneous loan applications")
+            print("│  → Keep debt-to-income ratio below 40%")
+            print("│  → Monitor credit report quarterly")
+            print("│  → Update employment and income information")
+            print("└─")
+    print('='*70)
+    print(" "*15 + "End of Credit Risk Assessment Report")
+    print('='*70)
+
+
 if __name__ == "__main__":
     # Low risk applicant - should be APPROVED
     test_query = (
@@ -93,151 +321,12 @@ if __name__ == "__main__":
     
     # Check if there are tool calls to execute
     if hasattr(response, 'tool_calls') and response.tool_calls:
-        print(f"\nAgent wants to call tool: {response.tool_calls[0]['name']}")
-        
-        # Execute the tool directly
-        tool_call = response.tool_calls[0]
-        print(f"\nTool arguments: {tool_call['args']}")
-        
-        tool_result = calculate_credit_risk.invoke(tool_call['args'])
-        
-        print(f"\n{'='*70}")
-        print(" "*20 + "CREDIT RISK ASSESSMENT REPORT")
-        print('='*70)
-        if 'error' in tool_result:
-            print(f"\n[ERROR] {tool_result['error']}")
-        else:
-            prob = tool_result.get('probability', 0)
-            decision = tool_result.get('decision', 'N/A')
-            risk = tool_result.get('risk_level', 'N/A')
-            factors = tool_result.get('risk_factors', [])
-            
-            # Calculate Credit Score (300-900 scale)
-            # Lower probability = Higher score
-            credit_score = int(900 - (prob * 600))
-            
-            # ===== SECTION 1: MODEL PREDICTIONS =====
-            print(f"\n{'─'*70}")
-            print("SECTION 1: MODEL PREDICTIONS")
-            print('─'*70)
-            
-            print(f"\n┌─ Probability of Default (PD)")
-            print(f"│  Value: {prob:.4f} (Range: 0.00 - 1.00)")
-            print(f"│  Percentage: {prob*100:.2f}%")
-            print(f"└─ Interpretation: Likelihood of loan default")
-            
-            print(f"\n┌─ Credit Score")
-            print(f"│  Score: {credit_score}/900")
-            print(f"│  Rating: {'Excellent' if credit_score >= 750 else 'Good' if credit_score >= 650 else 'Fair' if credit_score >= 550 else 'Poor'}")
-            print(f"└─ Note: Derived from PD (300-900 scale)")
-            
-            print(f"\n┌─ Decision Outcome")
-            print(f"│  Status: {decision.upper()}")
-            print(f"│  Action: {'Accept Application' if decision == 'Approved' else 'Reject Application' if decision == 'Rejected' else 'Manual Review Required'}")
-            print(f"└─ Risk Level: {risk}")
-            
-            # ===== SECTION 2: DECISION RATIONALE =====
-            print(f"\n{'─'*70}")
-            print("SECTION 2: DECISION RATIONALE")
-            print('─'*70)
-            
-            if factors:
-                print(f"\n┌─ Primary Decision Factors")
-                print(f"│")
-                
-                # Show all factors with their impact
-                for i, factor in enumerate(factors, 1):
-                    impact = factor.get('impact', 'UNKNOWN')
-                    feature = factor.get('feature', 'Unknown')
-                    note = factor.get('note', '')
-                    
-                    if impact == 'HIGH':
-                        indicator = "[HIGH RISK]"
-                        symbol = "▲"
-                    elif impact == 'MEDIUM':
-                        indicator = "[MEDIUM RISK]"
-                        symbol = "▲"
-                    elif impact == 'POSITIVE':
-                        indicator = "[POSITIVE]"
-                        symbol = "▼"
-                    else:
-                        indicator = f"[{impact}]"
-                        symbol = "■"
-                    
-                    print(f"│  {i}. {feature}")
-                    print(f"│     Impact Level: {indicator}")
-                    if note:
-                        print(f"│     Details: {note}")
-                    print(f"│")
-                
-                print(f"└─ Total Factors Analyzed: {len(factors)}")
-                
-                print(f"\n┌─ Feature Importance Ranking")
-                print(f"│  (Factors with highest impact on credit decision)")
-                print(f"│")
-                
-                # List factors by importance
-                important_factors = [f for f in factors if f.get('impact') in ['HIGH', 'MEDIUM', 'POSITIVE']]
-                for idx, factor in enumerate(important_factors[:5], 1):  # Top 5
-                    feature_name = factor.get('feature', 'Unknown')
-                    impact_level = factor.get('impact', 'N/A')
-                    print(f"│  Rank {idx}: {feature_name} - {impact_level} Impact")
-                print(f"└─")
-            
-            # ===== SECTION 3: RECOMMENDATIONS =====
-            print(f"\n{'─'*70}")
-            print("SECTION 3: RECOMMENDATIONS")
-            print('─'*70)
-            
-            if decision == "Rejected":
-                print("\n[APPLICATION REJECTED]")
-                print("\n┌─ Rejection Reason Codes:")
-                print("│")
-                
-                # Extract high-risk factors as reason codes
-                high_risk_factors = [f for f in factors if f.get('impact') in ['HIGH', 'MEDIUM']]
-                for idx, factor in enumerate(high_risk_factors, 1):
-                    print(f"│  Code {idx}: {factor.get('feature')}")
-                    print(f"│           {factor.get('note', 'Negative impact on creditworthiness')}")
-                    print("│")
-                print("└─")
-                
-                print("\n┌─ Improvement Actions:")
-                print("│  → Increase annual income or reduce loan amount")
-                print("│  → Improve credit grade through timely bill payments")
-                print("│  → Build employment stability and credit history")
-                print("│  → Clear any outstanding defaults")
-                print("│  → Consider adding a co-applicant with strong credit")
-                print("└─")
-            elif decision == "Refer":
-                print("\n[MANUAL REVIEW REQUIRED]")
-                print("\n┌─ Referral Reasons:")
-                print("│  → Borderline credit profile requires human assessment")
-                print("│  → Mixed risk indicators detected")
-                print("│  → Additional documentation may be necessary")
-                print("│  → Secondary verification recommended")
-                print("└─")
-            else:
-                print("\n[APPLICATION APPROVED]")
-                
-                # Show positive factors
-                positive_factors = [f for f in factors if f.get('impact') == 'POSITIVE']
-                if positive_factors:
-                    print("\n┌─ Application Strengths:")
-                    print("│")
-                    for idx, factor in enumerate(positive_factors, 1):
-                        print(f"│  ✓ {factor.get('feature')}")
-                    print("└─")
-                
-                print("\n┌─ Credit Maintenance Guidelines:")
-                print("│  → Maintain regular payment schedule")
-                print("│  → Avoid multiple simultaneous loan applications")
-                print("│  → Keep debt-to-income ratio below 40%")
-                print("│  → Monitor credit report quarterly")
-                print("│  → Update employment and income information")
-                print("└─")
-        print('='*70)
-        print(" "*15 + "End of Credit Risk Assessment Report")
-        print('='*70)
+        for tool_call in response.tool_calls:
+            print(f"\nAgent wants to call tool: {tool_call['name']}")
+            print(f"\nTool arguments: {tool_call['args']}")
+
+        # Several applicants are scored with one batch request
+        for tool_result in run_tool_calls(response.tool_calls):
+            print_report(tool_result)
     else:
         print(f"\nDirect AI Response: {response.content}")
\ No newline at end of file
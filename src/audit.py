@@ -0,0 +1,519 @@
+"""
+Audit trail of lending decisions, in an append-only SQLite database.
+
+Every decision served by /predict, /predict/batch and /Calculating_DTI is
+recorded with its raw inputs, derived features, probability, decision, model
+version and timestamp. Requests never touch the database: `AuditLog.record`
+puts the request on a bounded in-memory queue and a background thread
+derives the features and inserts whole batches in one transaction (SQLite in
+WAL mode, `synchronous=NORMAL`), so a request pays a queue put.
+
+The queue applies backpressure instead of dropping records: when it is full,
+`record` waits up to `block_timeout_ms` for the writer to catch up, slowing
+requests down. If the writer is stuck for longer, `record` raises
+`AuditUnavailable` (the API answers 503), so no decision is served without
+its record; with `required=False` the records are dropped, counted and
+logged instead. A batch that fails with an SQLite operational error (disk
+full, I/O error, database locked) is retried with backoff, never discarded:
+meanwhile the queue fills up and requests get backpressure, then 503s.
+
+One row per application:
+
+    decisions (id, ts, request_id, application_id, endpoint, model_version,
+               probability, decision, credit_score, cached,
+               <RAW_COLUMNS>, <DERIVED_COLUMNS>)
+
+`application_id` is the client's X-Application-ID header for single
+applications, otherwise a hash of the raw inputs, so every decision on a
+resubmitted application shares it. Indexes on (application_id, ts), ts and
+request_id keep reviews fast, and triggers reject UPDATE and DELETE. Gunicorn
+workers each run their own writer on the same file; SQLite serializes their
+transactions.
+
+Look up and replay decisions offline with:
+
+    python -m src.audit query logs/audit.db --application-id 3f9c...
+    python -m src.audit replay logs/audit.db --model models --since 2026-10-01
+"""
+import argparse
+import hashlib
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from src.background import BackgroundThread
+from src.features import RAW_COLUMNS, engineer_features
+from src.scoring import DECISION_THRESHOLD, credit_scores, decisions
+
+logger = logging.getLogger("credit_risk.audit")
+
+# Derived features as the model sees them (`loan_grade_score` is the numeric grade)
+DERIVED_COLUMNS = [
+    'dti_ratio', 'loan_percent_income', 'income_to_loan_ratio', 'credit_hist_to_age_ratio',
+    'employment_stability', 'loan_grade_score', 'income_credit_product', 'loan_burden',
+]
+TEXT_COLUMNS = {'person_home_ownership', 'loan_intent', 'loan_grade', 'cb_person_default_on_file'}
+INTEGER_COLUMNS = {'person_age', 'cb_person_cred_hist_length', 'loan_grade_score'}
+META_COLUMNS = ['ts', 'request_id', 'application_id', 'endpoint', 'model_version',
+                'probability', 'decision', 'credit_score', 'cached']
+COLUMNS = META_COLUMNS + RAW_COLUMNS + DERIVED_COLUMNS
+# The writer prepares and inserts this many rows at a time, then sleeps
+# briefly so that requests waiting for the GIL (or, on one CPU, for the
+# CPU) run in between; this keeps a batch from stalling requests for its
+# whole duration
+CHUNK_ROWS = 32
+YIELD_S = 0.0001
+# Backoff between attempts to write a failed batch
+RETRY_MIN_S = 0.1
+RETRY_MAX_S = 5.0
+
+
+def _column_type(name):
+    return 'TEXT' if name in TEXT_COLUMNS else 'INTEGER' if name in INTEGER_COLUMNS else 'REAL'
+
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS decisions (id INTEGER PRIMARY KEY, ts REAL NOT NULL, request_id TEXT NOT NULL, '
+    'application_id TEXT NOT NULL, endpoint TEXT NOT NULL, model_version TEXT NOT NULL, '
+    'probability REAL NOT NULL, decision TEXT NOT NULL, credit_score INTEGER NOT NULL, cached INTEGER NOT NULL, '
+    + ', '.join(f'{c} {_column_type(c)}' for c in RAW_COLUMNS + DERIVED_COLUMNS) + ')',
+    'CREATE INDEX IF NOT EXISTS decisions_application ON decisions (application_id, ts)',
+    'CREATE INDEX IF NOT EXISTS decisions_ts ON decisions (ts)',
+    'CREATE INDEX IF NOT EXISTS decisions_request ON decisions (request_id)',
+    "CREATE TRIGGER IF NOT EXISTS decisions_no_update BEFORE UPDATE ON decisions "
+    "BEGIN SELECT RAISE(ABORT, 'the audit log is append-only'); END",
+    "CREATE TRIGGER IF NOT EXISTS decisions_no_delete BEFORE DELETE ON decisions "
+    "BEGIN SELECT RAISE(ABORT, 'the audit log is append-only'); END",
+]
+INSERT = f"INSERT INTO decisions ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+
+def application_id(values):
+    """Stable ID of an application from its raw inputs, in `RAW_COLUMNS` order."""
+    return hashlib.blake2b('|'.join(map(str, values)).encode(), digest_size=8).hexdigest()
+
+
+class AuditUnavailable(RuntimeError):
+    """A decision could not be queued for the audit log in time (writer stuck or too slow)."""
+
+    def __init__(self, message, retry_after_s):
+        super().__init__(message)
+        self.retry_after_s = retry_after_s
+
+
+class AuditLog:
+    """
+    Batched, off-request-path writer of the decision audit log.
+
+    Args:
+        path: SQLite database file (created with its schema if missing)
+        max_queue: Queued requests before `record` applies backpressure
+        max_batch: Requests written together in one transaction
+        max_wait_ms: How long the writer collects requests into a batch
+        block_timeout_ms: How long a request waits for room in a full queue
+            before giving up
+        required: Raise `AuditUnavailable` when giving up, rather than
+            dropping the records
+    """
+
+    def __init__(self, path, max_queue=10000, max_batch=512, max_wait_ms=100.0, block_timeout_ms=1000.0,
+                 required=True):
+        self.path = Path(path)
+        self.required = required
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.block_timeout = block_timeout_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = BackgroundThread(self._run, 'audit')
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._full = threading.Event()
+        self._pending = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with sqlite3.connect(self.path, timeout=5.0) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            for statement in SCHEMA:
+                conn.execute(statement)
+        conn.close()
+
+        # Metrics
+        self.submitted = 0
+        self.blocked = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.written = 0
+        self.write_errors = 0
+        self.lost = 0
+        self.batches = 0
+        self.write_seconds = 0.0
+        self.max_write_ms = 0.0
+
+    def record(self, endpoint, request_id, applications, probabilities, model_version,
+               application_ids=None, cached=False, block=True):
+        """
+        Queue the decisions of one request.
+
+        Args:
+            endpoint: Path of the scoring endpoint
+            request_id: ID of the request, shared by all its rows
+            applications: List of `LoanApplication` models, or a mapping of
+                raw column -> array (not modified afterwards)
+            probabilities: Probability of default per application
+            model_version: Version that scored them, one string or one per application
+            application_ids: Optional ID per application; default `application_id`
+            cached: Whether the result came from the response cache
+            block: Wait for room when the queue is full (backpressure). With
+                False, returns False instead of waiting, so that an async
+                caller can wait in a thread instead of on the event loop
+
+        Returns:
+            False only when the queue is full and `block` is False
+
+        Raises:
+            AuditUnavailable: The queue stayed full for `block_timeout_ms`
+                (only when `required`)
+        """
+        self._thread.ensure_started()
+        item = (time.time(), endpoint, request_id, applications, probabilities, model_version,
+                application_ids, cached)
+        with self._lock:
+            self._pending += 1
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # Cut the writer's collection window short
+            self._full.set()
+            if not block:
+                self._done(1)
+                return False
+            self.blocked += 1
+            try:
+                self._queue.put(item, timeout=self.block_timeout)
+            except queue.Full:
+                self._done(1)
+                if self.required:
+                    self.rejected += 1
+                    raise AuditUnavailable(f"Audit log unavailable: queue full for {self.block_timeout * 1000:.0f} ms",
+                                           retry_after_s=max(1, round(self.block_timeout)))
+                self.dropped += _length(applications)
+                logger.error("Audit queue full for %.0f ms: dropped the records of request %s",
+                             self.block_timeout * 1000, request_id)
+                return True
+        self.submitted += 1
+        return True
+
+    def _done(self, count):
+        with self._lock:
+            self._pending -= count
+            if not self._pending:
+                self._idle.notify_all()
+
+    def flush(self, timeout=None):
+        """Wait until every queued request is written; False on timeout."""
+        with self._lock:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _run(self):
+        conn = self._connect()
+        while True:
+            items = [self._queue.get()]
+            # Sleep through the collection window rather than waking up for
+            # every queued request (each wake-up takes the GIL from a
+            # request), unless the queue fills up
+            self._full.wait(self.max_wait)
+            self._full.clear()
+            while len(items) < self.max_batch:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            attempt = 0
+            while True:
+                try:
+                    self._write(conn, items)
+                    break
+                except sqlite3.OperationalError:
+                    # The transaction was rolled back: retry the whole batch
+                    self.write_errors += 1
+                    logger.exception("Writing %d audit requests failed (attempt %d), retrying",
+                                     len(items), attempt + 1)
+                    time.sleep(min(RETRY_MAX_S, RETRY_MIN_S * 2 ** attempt))
+                    attempt += 1
+                    try:
+                        conn.close()
+                        conn = self._connect()
+                    except sqlite3.Error:
+                        pass
+                except Exception:
+                    # Not a storage problem: retrying would fail the same way
+                    self.lost += sum(_length(item[3]) for item in items)
+                    logger.exception("Audit records of %d requests could not be written", len(items))
+                    break
+            self._done(len(items))
+
+    def _write(self, conn, items):
+        # One transaction per batch, prepared in chunks (see CHUNK_ROWS)
+        start = time.perf_counter()
+        written = 0
+        with conn:
+            for chunk in _chunks(items, CHUNK_ROWS):
+                rows = _rows(chunk)
+                conn.executemany(INSERT, rows)
+                written += len(rows)
+                time.sleep(YIELD_S)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.batches += 1
+            self.written += written
+            self.write_seconds += elapsed
+            self.max_write_ms = max(self.max_write_ms, elapsed * 1000)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "path": str(self.path),
+                "submitted": self.submitted,
+                "queue_depth": self._queue.qsize(),
+                "blocked": self.blocked,
+                "dropped": self.dropped,
+                "rejected": self.rejected,
+                "write_errors": self.write_errors,
+                "lost": self.lost,
+                "batches": self.batches,
+                "written": self.written,
+                "write_ms_per_batch": self.write_seconds * 1000 / self.batches if self.batches else None,
+                "max_write_ms": self.max_write_ms,
+            }
+
+
+def _length(applications):
+    return len(next(iter(applications.values()))) if isinstance(applications, dict) else len(applications)
+
+
+def _chunks(items, size):
+    # Queued requests regrouped into chunks of at most `size` rows (large requests are sliced)
+    chunk, rows = [], 0
+    for item in items:
+        ts, endpoint, request_id, applications, probabilities, version, ids, cached = item
+        n = len(probabilities)
+        for i in range(0, n, size):
+            if rows and rows + min(size, n - i) > size:
+                yield chunk
+                chunk, rows = [], 0
+            if n <= size:
+                chunk.append(item)
+            else:
+                j = i + size
+                part = ({c: v[i:j] for c, v in applications.items()} if isinstance(applications, dict)
+                        else applications[i:j])
+                chunk.append((ts, endpoint, request_id, part, probabilities[i:j],
+                              version if isinstance(version, str) else version[i:j],
+                              ids[i:j] if ids else None, cached))
+            rows += min(size, n - i)
+    if chunk:
+        yield chunk
+
+
+def _rows(items):
+    # Insert tuples for a batch of queued requests; derived features, decisions
+    # and credit scores are computed for the whole batch in one pass
+    sources = []
+    probabilities, ids, meta = [], [], []
+    for ts, endpoint, request_id, applications, p, version, given_ids, cached in items:
+        if isinstance(applications, dict):
+            sources.append(applications)
+        elif sources and isinstance(sources[-1], list):
+            # Consecutive lists of `LoanApplication`s are read column-wise together
+            sources[-1] += applications
+        else:
+            sources.append(list(applications))
+        n = len(p)
+        probabilities += np.asarray(p, dtype=np.float64).tolist()
+        ids += given_ids or [None] * n
+        versions = [version] * n if isinstance(version, str) else version
+        meta += [(ts, request_id, endpoint, v, int(cached)) for v in versions]
+
+    columns = {}
+    for c in RAW_COLUMNS:
+        values = []
+        for source in sources:
+            values += (np.asarray(source[c]).tolist() if isinstance(source, dict)
+                       else [getattr(a, c) for a in source])
+        columns[c] = np.array(values)
+    derived = engineer_features(columns)
+    derived['loan_grade_score'] = derived['loan_grade']
+    inputs = zip(*(columns[c].tolist() for c in RAW_COLUMNS))
+    features = zip(*(derived[c].tolist() for c in DERIVED_COLUMNS))
+    labels = decisions(probabilities).tolist()
+    scores = credit_scores(probabilities).tolist()
+    return [(ts, request_id, given or application_id(values), endpoint, version, p, label, score, cached)
+            + values + derived_values
+            for (ts, request_id, endpoint, version, cached), given, p, label, score, values, derived_values
+            in zip(meta, ids, probabilities, labels, scores, inputs, features)]
+
+
+def _connect_readonly(path):
+    return sqlite3.connect(f'file:{Path(path).resolve()}?mode=ro', uri=True, timeout=5.0)
+
+
+def _where(application_id=None, request_id=None, since=None, until=None):
+    clauses, params = [], []
+    for clause, value in (('application_id = ?', application_id), ('request_id = ?', request_id),
+                          ('ts >= ?', since), ('ts < ?', until)):
+        if value is not None:
+            clauses.append(clause)
+            params.append(value)
+    return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+
+def query(path, application_id=None, request_id=None, since=None, until=None, limit=100):
+    """
+    Recorded decisions, newest first.
+
+    Args:
+        path: Audit database
+        application_id, request_id: Optional exact matches
+        since, until: Optional Unix timestamps, [since, until)
+        limit: Maximum number of decisions
+
+    Returns:
+        List of dicts with the metadata columns plus "inputs" and "features"
+    """
+    if not Path(path).is_file():
+        return []
+    where, params = _where(application_id, request_id, since, until)
+    conn = _connect_readonly(path)
+    try:
+        cursor = conn.execute(f"SELECT id, {', '.join(COLUMNS)} FROM decisions{where} "
+                              "ORDER BY ts DESC, id DESC LIMIT ?", params + [limit])
+        rows = cursor.fetchall()
+    finally:
+        conn.close()
+    n_meta = 1 + len(META_COLUMNS)
+    n_raw = n_meta + len(RAW_COLUMNS)
+    return [{
+        **dict(zip(['id'] + META_COLUMNS, row[:n_meta])),
+        "cached": bool(row[n_meta - 1]),
+        "inputs": dict(zip(RAW_COLUMNS, row[n_meta:n_raw])),
+        "features": dict(zip(DERIVED_COLUMNS, row[n_raw:])),
+    } for row in rows]
+
+
+def load_inputs(path, application_id=None, request_id=None, since=None, until=None):
+    """
+    Recorded inputs as model columns, for replaying decisions with another model.
+
+    Returns:
+        (columns, recorded): raw plus derived feature columns, and a dict of
+        the recorded "id", "model_version" and "probability" arrays
+    """
+    where, params = _where(application_id, request_id, since, until)
+    conn = _connect_readonly(path)
+    try:
+        rows = conn.execute(f"SELECT id, model_version, probability, {', '.join(RAW_COLUMNS)} "
+                            f"FROM decisions{where} ORDER BY id", params).fetchall()
+    finally:
+        conn.close()
+    values = list(zip(*rows)) if rows else [()] * (3 + len(RAW_COLUMNS))
+    columns = {c: np.array(v, dtype=str if c in TEXT_COLUMNS else np.int64 if c in INTEGER_COLUMNS else np.float64)
+               for c, v in zip(RAW_COLUMNS, values[3:])}
+    columns.update(engineer_features(columns))
+    recorded = {
+        "id": np.array(values[0], dtype=np.int64),
+        "model_version": np.array(values[1], dtype=object),
+        "probability": np.array(values[2], dtype=np.float64),
+    }
+    return columns, recorded
+
+
+def replay(columns, recorded, predict):
+    """
+    Compare recorded decisions with a model's decisions on the same inputs.
+
+    Args:
+        columns, recorded: From `load_inputs`
+        predict: Callable (columns, n) -> probabilities of default
+
+    Returns:
+        Summary per recorded model version
+    """
+    n = len(recorded["id"])
+    if not n:
+        return []
+    replayed = np.asarray(predict(columns, n), dtype=np.float64)
+    diff = replayed - recorded["probability"]
+    changed = (replayed > DECISION_THRESHOLD) != (recorded["probability"] > DECISION_THRESHOLD)
+    summary = []
+    for version in sorted(set(recorded["model_version"].tolist())):
+        rows = recorded["model_version"] == version
+        summary.append({
+            "model_version": version,
+            "rows": int(rows.sum()),
+            "changed_decisions": int(changed[rows].sum()),
+            "now_approved": int((changed & (replayed <= DECISION_THRESHOLD))[rows].sum()),
+            "now_rejected": int((changed & (replayed > DECISION_THRESHOLD))[rows].sum()),
+            "mean_diff": float(diff[rows].mean()),
+            "max_abs_diff": float(np.abs(diff[rows]).max()),
+        })
+    return summary
+
+
+def _timestamp(value):
+    # Unix seconds or an ISO date / datetime
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Look up or replay decisions in the audit log')
+    parser.add_argument('command', choices=['query', 'replay'])
+    parser.add_argument('db', type=Path)
+    parser.add_argument('--application-id')
+    parser.add_argument('--request-id')
+    parser.add_argument('--since', type=_timestamp, help='Unix time or ISO date')
+    parser.add_argument('--until', type=_timestamp, help='Unix time or ISO date')
+    parser.add_argument('--limit', type=int, default=20, help='query: decisions shown')
+    parser.add_argument('--model', type=Path, default=Path('models'), help='replay: model directory')
+    args = parser.parse_args()
+    filters = dict(application_id=args.application_id, request_id=args.request_id,
+                   since=args.since, until=args.until)
+
+    if args.command == 'query':
+        for r in query(args.db, limit=args.limit, **filters):
+            when = datetime.fromtimestamp(r['ts']).isoformat(timespec='milliseconds')
+            print(f"{when} {r['endpoint']} request {r['request_id']} application {r['application_id']}: "
+                  f"{r['decision']} (p={r['probability']:.4f}, model {r['model_version']}"
+                  f"{', cached' if r['cached'] else ''}) {r['inputs']}")
+        return
+
+    from src.model_store import ServedModel
+
+    artifact = 'slim' if (args.model / 'serving').is_dir() else 'pipeline'
+    served = ServedModel.load(args.model, args.model.name, artifact=artifact)
+    start = time.perf_counter()
+    columns, recorded = load_inputs(args.db, **filters)
+    summary = replay(columns, recorded, served.fast_scorer.predict_proba)
+    elapsed = time.perf_counter() - start
+    for s in summary:
+        print(f"recorded by {s['model_version']}: {s['rows']:,} decisions, {s['changed_decisions']} changed "
+              f"with {args.model} (+{s['now_approved']} approved / +{s['now_rejected']} rejected), "
+              f"mean diff {s['mean_diff']:+.4f}, max |diff| {s['max_abs_diff']:.4f}")
+    print(f"replayed {len(recorded['id']):,} decisions in {elapsed:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""
+Per-worker background threads for work kept off the request path.
+
+The shadow scorer, the drift monitor and the audit log writer each run one
+daemon thread. Gunicorn imports the app once and forks its workers from
+that process, and threads do not survive a fork: a thread started at import
+would run in the master only. `BackgroundThread` therefore starts on first
+use (from a request, so inside the worker) and is started again if it has
+died, so that each forked worker runs its own.
+"""
+import threading
+
+
+class BackgroundThread:
+    """
+    A daemon thread running `target`, started by `ensure_started`.
+
+    Args:
+        target: Callable run by the thread (usually a loop that never returns)
+        name: Thread name, as shown by the sampling profiler
+    """
+
+    def __init__(self, target, name):
+        self.target = target
+        self.name = name
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def ensure_started(self):
+        """Start the thread unless it is running; cheap enough to call on every request."""
+        if self.is_alive():
+            return
+        # Concurrent first requests must not start two threads
+        with self._lock:
+            if not self.is_alive():
+                self._thread = threading.Thread(target=self.target, name=self.name, daemon=True)
+                self._thread.start()
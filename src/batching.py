@@ -0,0 +1,105 @@
+"""
+Micro-batching for concurrent single-application requests.
+
+Concurrent `/predict` calls are queued for up to `max_wait_ms` or until
+`max_batch_size` applications are waiting, then scored with one model call on
+a worker thread. Each caller awaits its own future.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent items into batches for a vectorized scoring function.
+
+    Args:
+        score_fn: Callable taking a list of items and returning a list of
+            results in the same order
+        max_wait_ms: Longest time the first item of a batch waits for company
+        max_batch_size: Largest batch handed to `score_fn`
+    """
+
+    def __init__(self, score_fn, max_wait_ms=2.0, max_batch_size=64):
+        self.score_fn = score_fn
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._queue = None
+        self._worker = None
+        self._loop = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='microbatch')
+
+        # Metrics
+        self.batches = 0
+        self.items = 0
+        self.max_queue_depth = 0
+        self.batch_size_counts = {}
+
+    async def submit(self, item):
+        """Queue one item and wait for its result (exceptions are re-raised)."""
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+        future = loop.create_future()
+        await self._queue.put((item, future))
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            items = [item for item, _ in batch]
+            outcomes = await loop.run_in_executor(self._executor, self._score, items)
+
+            self.batches += 1
+            self.items += len(batch)
+            self.batch_size_counts[len(batch)] = self.batch_size_counts.get(len(batch), 0) + 1
+
+            for (_, future), (ok, value) in zip(batch, outcomes):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    def _score(self, items):
+        """Score a batch; if it fails, score items one by one to isolate the bad ones."""
+        try:
+            return [(True, result) for result in self.score_fn(items)]
+        except Exception:
+            outcomes = []
+            for item in items:
+                try:
+                    outcomes.append((True, self.score_fn([item])[0]))
+                except Exception as e:
+                    outcomes.append((False, e))
+            return outcomes
+
+    def stats(self):
+        """Queue and batch-size metrics."""
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "batch_size_counts": dict(sorted(self.batch_size_counts.items())),
+            "max_wait_ms": self.max_wait * 1000.0,
+            "max_batch_size": self.max_batch_size,
+        }
@@ -0,0 +1,185 @@
+"""
+Response cache for repeated `/predict` requests.
+
+Keys are a hash of the validated application (field values after pydantic
+type coercion, so `25` and `25.0` match), the request options and a
+fingerprint of the model artifact and rule table. Changing the model
+therefore never serves a stale response, and `invalidate()` also drops
+everything held locally.
+
+Entries live in an in-process LRU with a TTL. An optional shared backend
+(`SQLiteBackend`, a stand-in for e.g. Redis) is consulted on local misses, so
+gunicorn workers on one host can reuse each other's results.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def fingerprint(*paths):
+    """Short content hash of the given files (model artifact, rule table, ...)."""
+    digest = hashlib.blake2b(digest_size=8)
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of response dicts.
+
+    Args:
+        max_entries: Local capacity; least recently used entries are evicted
+        ttl_s: Seconds an entry stays valid
+        model_version: Fingerprint of the model and rules, mixed into every key
+        backend: Optional shared store with `get(key)` and `set(key, value, ttl_s)`
+    """
+
+    def __init__(self, max_entries=10000, ttl_s=300.0, model_version='', backend=None):
+        self.max_entries = max_entries
+        self.ttl = ttl_s
+        self.model_version = model_version
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def key(self, application, **options):
+        """Canonical key for a validated `LoanApplication` plus request options."""
+        payload = [self.model_version, application.model_dump(), options]
+        encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        return hashlib.blake2b(encoded.encode(), digest_size=16).hexdigest()
+
+    def get(self, key):
+        """Cached response for `key`, or None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+
+        if self.backend is not None:
+            value = self.backend.get(key)
+            if value is not None:
+                with self._lock:
+                    self.shared_hits += 1
+                    self._store(key, value, now)
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._store(key, value, time.monotonic())
+        if self.backend is not None:
+            self.backend.set(key, value, self.ttl)
+
+    def _store(self, key, value, now):
+        self._entries[key] = (now + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, model_version=None):
+        """Drop every local entry; with `model_version`, also re-key future lookups."""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+            if model_version is not None:
+                self.model_version = model_version
+
+    def stats(self):
+        """Hit/miss/eviction counters."""
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl,
+            "model_version": self.model_version,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "backend": type(self.backend).__name__ if self.backend is not None else None,
+        }
+
+
+class SQLiteBackend:
+    """
+    Shared cache in a local SQLite file (WAL mode), for workers on one host.
+
+    Values are stored as JSON. Expired rows are pruned, and the table trimmed
+    to `max_entries`, every `prune_every` writes.
+    """
+
+    def __init__(self, path, max_entries=100000, prune_every=512):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS response_cache '
+                         '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS response_cache_expires ON response_cache (expires)')
+
+    def _connect(self):
+        # sqlite3 connections are per thread, and must not cross a (gunicorn) fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        try:
+            row = self._connect().execute(
+                'SELECT value FROM response_cache WHERE key = ? AND expires > ?', (key, time.time())
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl_s):
+        try:
+            with self._connect() as conn:
+                conn.execute('INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?)',
+                             (key, json.dumps(value), time.time() + ttl_s))
+                self._writes += 1
+                if self._writes % self.prune_every == 0:
+                    self._prune(conn)
+        except sqlite3.OperationalError:
+            # A busy shared cache must never fail the request
+            pass
+
+    def _prune(self, conn):
+        conn.execute('DELETE FROM response_cache WHERE expires <= ?', (time.time(),))
+        conn.execute('DELETE FROM response_cache WHERE key IN (SELECT key FROM response_cache '
+                     'ORDER BY expires DESC LIMIT -1 OFFSET ?)', (self.max_entries,))
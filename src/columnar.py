@@ -0,0 +1,167 @@
+"""
+Arrow IPC (streaming format) batches for high-volume scoring.
+
+`/predict/batch` accepts and returns `application/vnd.apache.arrow.stream`
+next to JSON (see main.py). A request is a table with the `LoanApplication`
+columns (`REQUEST_COLUMNS`); the response is a table with one row per
+application, in input order.
+
+Decoding skips JSON parsing and per-row pydantic objects entirely. The
+message is read in place from the request body: numeric columns without
+nulls come out as NumPy views of the body's buffers (no copy when the
+client sent the schema's types in one record batch), and string columns are
+gathered from their (usually tiny) dictionaries.
+
+A client builds a request with `write_table` and reads a response with
+`read_table`:
+
+    body = write_table({name: df[name].to_numpy() for name, _ in REQUEST_COLUMNS})
+
+pyarrow is imported on the first Arrow request, so JSON-only workers do not
+pay for it at start-up.
+"""
+import numpy as np
+
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+
+# `LoanApplication` columns and their Arrow types
+REQUEST_COLUMNS = [
+    ('person_age', 'int64'),
+    ('person_income', 'float64'),
+    ('person_home_ownership', 'string'),
+    ('person_emp_length', 'float64'),
+    ('loan_intent', 'string'),
+    ('loan_grade', 'string'),
+    ('loan_amnt', 'float64'),
+    ('loan_int_rate', 'float64'),
+    ('cb_person_default_on_file', 'string'),
+    ('cb_person_cred_hist_length', 'int64'),
+]
+
+
+def is_arrow(media_type):
+    """Whether a Content-Type (or one entry of an Accept header) is the Arrow stream type."""
+    return bool(media_type) and media_type.split(';')[0].strip().lower() == ARROW_STREAM
+
+
+def accepts_arrow(accept):
+    """
+    Whether an Accept header prefers Arrow over JSON.
+
+    JSON stays the default: Arrow is chosen only when it is listed and not
+    ranked below JSON by q-value (`*/*` alone means JSON).
+    """
+    if not accept:
+        return False
+    quality = {}
+    for entry in accept.split(','):
+        media, *params = [part.strip() for part in entry.split(';')]
+        q = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        quality[media.lower()] = max(q, quality.get(media.lower(), 0.0))
+    arrow = quality.get(ARROW_STREAM, 0.0)
+    return arrow > 0 and arrow >= quality.get('application/json', 0.0)
+
+
+def read_columns(body):
+    """
+    Decode an Arrow IPC stream request into the columns fed to the model.
+
+    Returns:
+        (columns, n): mapping of `LoanApplication` column -> NumPy array, and
+        the number of rows. Extra columns are ignored
+
+    Raises:
+        ValueError: Not an Arrow stream, a missing column, nulls, no rows, or
+            values that do not fit the column's type (e.g. a fractional age)
+    """
+    import pyarrow as pa
+
+    try:
+        table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+    except (pa.ArrowInvalid, OSError) as e:
+        raise ValueError(f"Invalid Arrow IPC stream: {e}") from e
+    missing = [name for name, _ in REQUEST_COLUMNS if name not in table.column_names]
+    if missing:
+        raise ValueError(f"Missing columns: {missing}")
+    if table.num_rows == 0:
+        raise ValueError("No rows")
+
+    columns = {}
+    for name, type_name in REQUEST_COLUMNS:
+        column = table.column(name)
+        if column.null_count:
+            raise ValueError(f"Column {name} has {column.null_count} nulls")
+        try:
+            if type_name == 'string':
+                columns[name] = _strings(column)
+            else:
+                expected = getattr(pa, type_name)()
+                if column.type != expected:
+                    column = column.cast(expected)  # safe cast: raises instead of truncating
+                columns[name] = _numbers(column)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError) as e:
+            raise ValueError(f"Column {name}: {e}") from e
+    return columns, table.num_rows
+
+
+def _numbers(column):
+    if column.num_chunks == 1:
+        # A read-only view of the request body
+        return column.chunk(0).to_numpy(zero_copy_only=True)
+    return column.to_numpy()
+
+
+def _strings(column):
+    import pyarrow as pa
+
+    array = column.combine_chunks()
+    if not pa.types.is_dictionary(array.type):
+        array = array.dictionary_encode()
+    labels = array.dictionary.cast(pa.string()).to_pylist()
+    return np.asarray(labels, dtype=str)[array.indices.to_numpy()]
+
+
+def categorical(codes, labels):
+    """Dictionary-encoded Arrow column from integer codes into `labels` (no per-row strings)."""
+    import pyarrow as pa
+
+    return pa.DictionaryArray.from_arrays(pa.array(np.asarray(codes, dtype=np.int8)), pa.array(labels))
+
+
+def write_table(columns, metadata=None):
+    """
+    Encode columns as one Arrow IPC stream message.
+
+    Args:
+        columns: Mapping of column name -> NumPy array, list or Arrow array;
+            NumPy string arrays are dictionary-encoded
+        metadata: Optional str -> str schema metadata
+
+    Returns:
+        bytes
+    """
+    import pyarrow as pa
+
+    arrays = {}
+    for name, values in columns.items():
+        if isinstance(values, np.ndarray) and values.dtype.kind in 'UO':
+            values = pa.array(values).dictionary_encode()
+        arrays[name] = values if isinstance(values, pa.Array) else pa.array(values)
+    table = pa.table(arrays, metadata=metadata)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def read_table(body):
+    """Decode an Arrow IPC stream (e.g. a response) into a `pyarrow.Table`."""
+    import pyarrow as pa
+
+    return pa.ipc.open_stream(pa.py_buffer(body)).read_all()
@@ -0,0 +1,371 @@
+"""
+Online data-drift and score-distribution monitor for live traffic.
+
+Each model artifact carries a baseline (`drift_baseline.json`) computed from
+its training rows: for every monitored numeric feature and for the output
+probability, bin edges at the training deciles plus the training min and max
+(the MinMaxScaler range; for person_income that is the 99th-percentile
+outlier cap) with the share of rows per bin, reference quantiles, and the
+category shares of `loan_intent` and `person_home_ownership`.
+
+`DriftMonitor` keeps constant-memory state per feature:
+- counts over the baseline bins, with one bin below the training minimum and
+  one above the maximum
+- a quantile sketch (log-spaced buckets with 1% relative accuracy, as in
+  DDSketch)
+- category counts for the baseline categories plus one "other" bucket
+
+and reports the Population Stability Index of each against the baseline.
+Requests only append a reference to their feature arrays; a background
+thread updates the sketches for a few hundred requests at a time with
+vectorized NumPy, so the per-request cost is microseconds.
+
+Export the baseline of a model directory (see model_store.py) with:
+
+    python -m src.drift --export models
+"""
+import argparse
+import json
+import logging
+import math
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.background import BackgroundThread
+from src.features import feature_columns
+
+logger = logging.getLogger("credit_risk.drift")
+
+BASELINE_FILE = 'drift_baseline.json'
+NUMERIC_FEATURES = [
+    'person_age', 'person_income', 'person_emp_length', 'loan_amnt',
+    'loan_int_rate', 'loan_percent_income', 'cb_person_cred_hist_length',
+]
+CATEGORICAL_FEATURES = ['loan_intent', 'person_home_ownership']
+SCORE = 'probability'
+N_BINS = 10
+QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+OTHER = '__other__'
+
+# Usual PSI reading: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 significant
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+# Floor for empty bins, so one empty bin doesn't make the PSI infinite
+PSI_EPSILON = 1e-4
+# Fewer live rows than this give a PSI but no status
+MIN_ROWS = 100
+
+
+def bin_index(values, edges):
+    """
+    Bin of each value: 0 below edges[0], len(edges) above edges[-1], the
+    deciles in between (the maximum itself counts as in range).
+    """
+    index = np.searchsorted(edges, values, side='right')
+    index[values == edges[-1]] = len(edges) - 1
+    return index
+
+
+def psi(actual, expected):
+    """Population Stability Index of two count (or share) vectors."""
+    actual = np.asarray(actual, dtype=np.float64)
+    expected = np.asarray(expected, dtype=np.float64)
+    if actual.sum() == 0:
+        return None
+    a = np.maximum(actual / actual.sum(), PSI_EPSILON)
+    e = np.maximum(expected / expected.sum(), PSI_EPSILON)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def psi_status(value, rows):
+    if value is None or rows < MIN_ROWS:
+        return "insufficient_data"
+    if value > PSI_SIGNIFICANT:
+        return "significant"
+    if value > PSI_MODERATE:
+        return "moderate"
+    return "stable"
+
+
+def quantile_names():
+    return [f"p{round(q * 100):02d}" for q in QUANTILES]
+
+
+def _numeric_baseline(values):
+    values = values[~np.isnan(values)]
+    edges = np.unique(np.quantile(values, np.linspace(0, 1, N_BINS + 1)))
+    counts = np.bincount(bin_index(values, edges), minlength=len(edges) + 1)
+    return {
+        'edges': edges.tolist(),
+        'proportions': (counts / counts.sum()).tolist(),
+        'quantiles': dict(zip(quantile_names(), np.quantile(values, QUANTILES).tolist())),
+    }
+
+
+def build_baseline(x, probabilities):
+    """
+    Baseline from training rows.
+
+    Args:
+        x: DataFrame with the raw `LoanApplication` columns
+        probabilities: The model's probabilities for those rows
+    """
+    columns = feature_columns(x)
+    baseline = {
+        'rows': int(len(x)),
+        'created': time.time(),
+        'numeric': {c: _numeric_baseline(columns[c].astype(np.float64)) for c in NUMERIC_FEATURES},
+        'categorical': {},
+        SCORE: _numeric_baseline(np.asarray(probabilities, dtype=np.float64)),
+    }
+    for c in CATEGORICAL_FEATURES:
+        shares = x[c].value_counts(normalize=True).sort_index()
+        baseline['categorical'][c] = {'categories': shares.index.tolist(), 'proportions': shares.tolist() + [0.0]}
+    return baseline
+
+
+def save_baseline(baseline, directory):
+    with open(Path(directory) / BASELINE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=1)
+
+
+def load_baseline(directory):
+    """Baseline stored with a model directory, or None."""
+    path = Path(directory) / BASELINE_FILE
+    if not path.is_file():
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+class QuantileSketch:
+    """
+    Quantiles of a stream of non-negative values in fixed memory.
+
+    Values fall into log-spaced buckets, so any reported quantile is within
+    `relative_accuracy` of a true value of the stream (DDSketch). Values at
+    or below `min_value` share one bucket (reported as 0), values above
+    `max_value` are clamped to the last one.
+    """
+
+    def __init__(self, relative_accuracy=0.01, min_value=1e-6, max_value=1e9):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.offset = math.floor(math.log(min_value) / self.log_gamma)
+        n_buckets = math.ceil(math.log(max_value) / self.log_gamma) - self.offset + 1
+        self.counts = np.zeros(n_buckets, dtype=np.int64)
+
+    def add(self, values):
+        values = values[~np.isnan(values)]
+        index = np.ceil(np.log(np.maximum(values, self.min_value)) / self.log_gamma) - self.offset
+        index = np.clip(index, 0, len(self.counts) - 1).astype(np.intp)
+        index[values <= self.min_value] = 0
+        self.counts += np.bincount(index, minlength=len(self.counts))
+
+    def quantiles(self, qs):
+        total = self.counts.sum()
+        if total == 0:
+            return [None] * len(qs)
+        cumulative = np.cumsum(self.counts)
+        result = []
+        for q in qs:
+            i = int(np.searchsorted(cumulative, q * (total - 1), side='right'))
+            # Bucket i holds (gamma^(k-1), gamma^k]; report its midpoint
+            result.append(0.0 if i == 0 else 2 * self.gamma ** (i + self.offset) / (self.gamma + 1))
+        return result
+
+
+class _NumericState:
+    def __init__(self, baseline):
+        self.baseline = baseline
+        self.edges = np.asarray(baseline['edges'])
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.sketch = QuantileSketch()
+
+    def add(self, values):
+        values = values[~np.isnan(values)]
+        self.counts += np.bincount(bin_index(values, self.edges), minlength=len(self.counts))
+        self.sketch.add(values)
+
+    def summary(self):
+        rows = int(self.counts.sum())
+        value = psi(self.counts, self.baseline['proportions'])
+        return {
+            'rows': rows,
+            'psi': value,
+            'status': psi_status(value, rows),
+            'below_training_min': float(self.counts[0] / rows) if rows else None,
+            'above_training_max': float(self.counts[-1] / rows) if rows else None,
+            'quantiles': dict(zip(quantile_names(), self.sketch.quantiles(QUANTILES))),
+            'baseline_quantiles': self.baseline['quantiles'],
+        }
+
+
+class _CategoricalState:
+    def __init__(self, baseline):
+        self.baseline = baseline
+        self.categories = list(baseline['categories'])
+        self.index = {c: i for i, c in enumerate(self.categories)}
+        # Unknown categories share the last slot, so memory stays bounded
+        self.counts = np.zeros(len(self.categories) + 1, dtype=np.int64)
+
+    def add(self, values):
+        other = len(self.categories)
+        uniques, counts = np.unique(values, return_counts=True)
+        for value, count in zip(uniques.tolist(), counts.tolist()):
+            self.counts[self.index.get(value, other)] += count
+
+    def summary(self):
+        rows = int(self.counts.sum())
+        value = psi(self.counts, self.baseline['proportions'])
+        names = self.categories + [OTHER]
+        return {
+            'rows': rows,
+            'psi': value,
+            'status': psi_status(value, rows),
+            'shares': {n: float(c / rows) for n, c in zip(names, self.counts)} if rows else {},
+            'baseline_shares': dict(zip(names, self.baseline['proportions'])),
+        }
+
+
+class DriftMonitor:
+    """
+    Live input and score distributions versus a model's training baseline.
+
+    Args:
+        baseline: Dict from `build_baseline` / `load_baseline`; None disables
+            monitoring
+        version: Model version the baseline belongs to
+        flush_every: Requests buffered before the background thread updates
+            the sketches
+        max_pending: Buffered requests before new ones are shed (the
+            background thread is not keeping up)
+    """
+
+    def __init__(self, baseline, version=None, flush_every=256, max_pending=4096):
+        self.flush_every = flush_every
+        self.max_pending = max_pending
+        # _lock guards the buffer (held for microseconds by requests);
+        # _fold_lock the sketches and counters (held while folding)
+        self._lock = threading.Lock()
+        self._fold_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = BackgroundThread(self._run, 'drift')
+        self.reset(baseline, version)
+
+    def reset(self, baseline, version=None):
+        """Start over, e.g. with the baseline of a newly served model."""
+        with self._fold_lock, self._lock:
+            self.baseline = baseline
+            self.version = version
+            self.since = time.time()
+            self._pending = []
+            self.requests = 0
+            self.rows = 0
+            self.shed = 0
+            if baseline is None:
+                self._numeric, self._categorical, self._score = {}, {}, None
+                return
+            self._numeric = {c: _NumericState(b) for c, b in baseline['numeric'].items()}
+            self._categorical = {c: _CategoricalState(b) for c, b in baseline['categorical'].items()}
+            self._score = _NumericState(baseline[SCORE])
+
+    def observe(self, features, probabilities):
+        """Record one scored request (its arrays must not be modified afterwards)."""
+        if self.baseline is None:
+            return
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self.shed += 1
+                return
+            self._pending.append((features, probabilities))
+            if len(self._pending) < self.flush_every:
+                return
+        self._thread.ensure_started()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Drift monitor update failed")
+
+    def flush(self):
+        """Fold the buffered requests into the sketches."""
+        with self._fold_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending or self.baseline is None:
+                return
+            for name, state in self._numeric.items():
+                state.add(np.concatenate([f[name] for f, _ in pending]).astype(np.float64))
+            for name, state in self._categorical.items():
+                state.add(np.concatenate([f[name] for f, _ in pending]))
+            probabilities = np.concatenate([p for _, p in pending]).astype(np.float64)
+            self._score.add(probabilities)
+            self.requests += len(pending)
+            self.rows += len(probabilities)
+
+    def summary(self):
+        """PSI, status and quantiles per feature, per category column and for the score."""
+        self.flush()
+        if self.baseline is None:
+            return {"enabled": False, "model_version": self.version}
+        with self._fold_lock:
+            result = {
+                "enabled": True,
+                "model_version": self.version,
+                "since": self.since,
+                "requests": self.requests,
+                "rows": self.rows,
+                "shed": self.shed,
+                "baseline_rows": self.baseline['rows'],
+                "features": {c: s.summary() for c, s in self._numeric.items()},
+                "categories": {c: s.summary() for c, s in self._categorical.items()},
+                SCORE: self._score.summary(),
+            }
+        drifted = [name for group in (result["features"], result["categories"]) for name, s in group.items()
+                   if s["status"] in ("moderate", "significant")]
+        if result[SCORE]["status"] in ("moderate", "significant"):
+            drifted.append(SCORE)
+        result["drifted"] = drifted
+        return result
+
+    def gauges(self):
+        """Flat PSI values for /metrics."""
+        summary = self.summary()
+        if not summary["enabled"]:
+            return {}
+        values = {"rows": summary["rows"], "shed": summary["shed"], f"psi_{SCORE}": summary[SCORE]["psi"]}
+        for group in ("features", "categories"):
+            for name, s in summary[group].items():
+                values[f"psi_{name}"] = s["psi"]
+        return {k: v for k, v in values.items() if v is not None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the drift baseline of a model directory')
+    parser.add_argument('--export', type=Path, required=True, help='Model directory, e.g. models')
+    parser.add_argument('--data', type=Path, default=None, help='Training CSV (default: data/credit_risk_dataset.csv)')
+    args = parser.parse_args()
+
+    import joblib
+
+    from src.train import DATA_PATH, clean, load_dataset, split
+
+    pipeline = joblib.load(args.export / 'credit_risk_pipeline.pkl')
+    x_train = split(clean(load_dataset(args.data or DATA_PATH)))[0]
+    baseline = build_baseline(x_train, pipeline.predict_proba(x_train)[:, 1])
+    save_baseline(baseline, args.export)
+    print(f"Drift baseline of {len(x_train)} training rows written to {args.export / BASELINE_FILE}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""
+DataFrame-free inference for the fitted credit risk pipeline.
+
+`FastScorer` compiles the fitted ColumnTransformer (`trf1` OneHotEncoder and
+`trf2` MinMaxScaler) into plain NumPy lookup tables and scale/offset vectors
+once at load time. Requests are then encoded straight into a float32 matrix
+and passed to the booster's `inplace_predict`, skipping pandas and the
+sklearn transformer dispatch entirely.
+
+The compiled tables can also be exported as a slim serving artifact (the
+booster in XGBoost's native UBJSON format plus a small JSON of preprocessing
+parameters), which loads without joblib, sklearn or pandas:
+
+    python -m src.fast_inference --export models/serving
+"""
+import argparse
+import json
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from src.features import engineer_features
+
+
+class FastScorer:
+    """
+    Compiled encoder + booster for a fitted `credit_risk_pipeline.pkl`.
+
+    Produces the same probabilities as `pipeline.predict_proba`: values are
+    scaled in float64 exactly as MinMaxScaler does and only then cast to the
+    float32 the booster uses internally.
+    """
+
+    def __init__(self, categorical, numeric_columns, scale, offset, booster, iteration_range=(0, 0)):
+        # categorical: list of (column, {category: output index}) for trf1
+        self.categorical = categorical
+        self.numeric_columns = list(numeric_columns)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.offset = np.asarray(offset, dtype=np.float64)
+        self.booster = booster
+        self.iteration_range = tuple(iteration_range)
+        self.n_categorical = sum(len(table) for _, table in categorical)
+        self.n_features = self.n_categorical + len(self.numeric_columns)
+        self._local = threading.local()
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """Compile the fitted `columntransformer` and `xgbclassifier` steps."""
+        transform = pipeline.named_steps['columntransformer']
+        model = pipeline.steps[-1][1]
+
+        encoder = transform.named_transformers_['trf1']
+        scaler = transform.named_transformers_['trf2']
+        categorical_columns = dict((name, cols) for name, _, cols in transform.transformers_)['trf1']
+        numeric_columns = dict((name, cols) for name, _, cols in transform.transformers_)['trf2']
+
+        # One-hot layout: per column, every kept category gets one output slot
+        # in order; the dropped (first) category and unknowns encode as zeros
+        categorical = []
+        position = 0
+        for i, column in enumerate(categorical_columns):
+            drop = None if encoder.drop_idx_ is None else encoder.drop_idx_[i]
+            table = {}
+            for j, category in enumerate(encoder.categories_[i]):
+                if drop is not None and j == drop:
+                    continue
+                table[category] = position
+                position += 1
+            categorical.append((column, table))
+
+        try:
+            iteration_range = (0, model.best_iteration + 1)
+        except AttributeError:
+            iteration_range = (0, 0)
+
+        return cls(categorical, numeric_columns, scaler.scale_, scaler.min_,
+                   model.get_booster(), iteration_range)
+
+    def save(self, directory):
+        """Write the slim artifact: `booster.ubj` and `preprocess.json`."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        self.booster.save_model(str(directory / 'booster.ubj'))
+        params = {
+            "categorical": [[column, table] for column, table in self.categorical],
+            "numeric_columns": self.numeric_columns,
+            "scale": self.scale.tolist(),
+            "offset": self.offset.tolist(),
+            "iteration_range": list(self.iteration_range),
+        }
+        with open(directory / 'preprocess.json', 'w', encoding='utf-8') as f:
+            json.dump(params, f, indent=1)
+
+    @classmethod
+    def load(cls, directory, nthread=None):
+        """Load a slim artifact written by `save`."""
+        import xgboost
+
+        directory = Path(directory)
+        with open(directory / 'preprocess.json', encoding='utf-8') as f:
+            params = json.load(f)
+        booster = xgboost.Booster()
+        booster.load_model(str(directory / 'booster.ubj'))
+        if nthread is not None:
+            booster.set_param({'nthread': nthread})
+        categorical = [(column, table) for column, table in params['categorical']]
+        return cls(categorical, params['numeric_columns'], params['scale'], params['offset'],
+                   booster, params['iteration_range'])
+
+    def source_features(self):
+        """Original feature name for every encoded column (one-hot slots share one)."""
+        names = [None] * self.n_categorical
+        for column, table in self.categorical:
+            for slot in table.values():
+                names[slot] = column
+        return names + self.numeric_columns
+
+    def _buffer(self, n):
+        """Per-thread preallocated float32 matrix, grown on demand."""
+        buf = getattr(self._local, 'buf', None)
+        if buf is None or buf.shape[0] < n:
+            buf = np.empty((max(n, 1), self.n_features), dtype=np.float32)
+            self._local.buf = buf
+        return buf[:n]
+
+    def encode(self, features, n, out=None):
+        """
+        Encode raw + derived columns into the model's input matrix.
+
+        Args:
+            features: Mapping of column name -> array of length `n`
+            n: Number of rows
+            out: Optional float32 array of shape (n, n_features) to fill
+
+        Returns:
+            float32 array of shape (n, n_features)
+        """
+        if out is None:
+            out = np.empty((n, self.n_features), dtype=np.float32)
+
+        out[:, :self.n_categorical] = 0.0
+        rows = np.arange(n)
+        for column, table in self.categorical:
+            # Iterating a list of str is several times faster than a NumPy string array
+            slots = np.fromiter((table.get(v, -1) for v in np.asarray(features[column]).tolist()),
+                                dtype=np.int64, count=n)
+            hit = slots >= 0
+            out[rows[hit], slots[hit]] = 1.0
+
+        numeric = np.column_stack([np.asarray(features[c], dtype=np.float64) for c in self.numeric_columns])
+        numeric *= self.scale
+        numeric += self.offset
+        out[:, self.n_categorical:] = numeric
+        return out
+
+    def predict_encoded(self, X):
+        """Probability of default for an already encoded float32 matrix."""
+        return self.booster.inplace_predict(X, iteration_range=self.iteration_range,
+                                            validate_features=False)
+
+    def predict_proba(self, features, n):
+        """
+        Probability of default for `n` rows of raw + derived columns.
+
+        Returns:
+            float32 array of shape (n,)
+        """
+        return self.predict_encoded(self.encode(features, n, out=self._buffer(n)))
+
+    def predict_raw(self, columns):
+        """Probability of default straight from raw `LoanApplication` columns."""
+        n = len(columns['person_age'])
+        features = dict(columns)
+        features.update(engineer_features(columns))
+        return self.predict_proba(features, n)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the slim serving artifact from a pickled pipeline')
+    parser.add_argument('--pipeline', default=str(Path(__file__).resolve().parent.parent / 'models' / 'credit_risk_pipeline.pkl'))
+    parser.add_argument('--export', required=True, help='Output directory, e.g. models/serving')
+    args = parser.parse_args()
+
+    import joblib
+
+    FastScorer.from_pipeline(joblib.load(args.pipeline)).save(args.export)
+    print(f"Slim artifact written to {args.export}")
+
+
+if __name__ == '__main__':
+    main()
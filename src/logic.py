@@ -0,0 +1,23 @@
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+
+# Feature engineering lives in features.py (no sklearn import); re-exported here
+# because the pickled pipeline and the notebook import it from this module
+from src.features import GRADE_MAP, RAW_COLUMNS, build_features, engineer_features  # noqa: F401
+
+
+class InteractionFeatures(BaseEstimator, TransformerMixin):
+    """
+    Pipeline stage that turns raw applicant columns into model features.
+
+    Stateless: `fit` only records the input columns. Used as the first step of
+    `credit_risk_pipeline.pkl` so training and serving share one definition.
+    """
+
+    def fit(self, X, y=None):
+        self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self.n_features_in_ = len(self.feature_names_in_)
+        return self
+
+    def transform(self, X):
+        return build_features(X)
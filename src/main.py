@@ -1,36 +1,123 @@
-from fastapi import FastAPI as fa, HTTPException
+from fastapi import Depends, FastAPI as fa, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-import joblib
-import pandas as pd
-from pydantic import BaseModel
-import shap
-import traceback
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from starlette.concurrency import run_in_threadpool
+import numpy as np
+from pydantic import BaseModel, TypeAdapter, ValidationError
+import json
+import logging
 import os
+import time
+import uuid
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Dict, List, Literal, Optional, Tuple, Union
 
-# Pipeline dependencies
-from sklearn.pipeline import Pipeline
-from sklearn.compose import ColumnTransformer
-from sklearn.preprocessing import StandardScaler, OneHotEncoder, MinMaxScaler
-from sklearn.impute import SimpleImputer
-from xgboost import XGBClassifier
+from src.audit import AuditLog, AuditUnavailable, query as audit_query
+from src.batching import MicroBatcher
+from src.cache import ResponseCache, SQLiteBackend, fingerprint
+from src.columnar import ARROW_STREAM, accepts_arrow, categorical, is_arrow, read_columns, write_table
+from src.model_store import ModelManager, ServedModel
+from src.drift import DriftMonitor
+from src.features import RAW_COLUMNS, engineer_features
+from src.rules import DEFAULT_RULES_PATH, RuleEngine
+from src.scoring import DECISION_THRESHOLD, credit_scores
+from src.shadow import ChallengerRouter, ShadowScorer, summarize_log
+from src.telemetry import Metrics, SamplingProfiler, TimingMiddleware
+from src.whatif import AMOUNT_RANGE, analyze
+
+# LOG_LEVEL=DEBUG logs every request and result; debug lines cost nothing otherwise
+logger = logging.getLogger("credit_risk")
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(_handler)
+    logger.propagate = False
+
+# Per-stage latency histograms for /metrics, and a sampling profiler that
+# admins can switch on at runtime (see telemetry.py)
+metrics = Metrics(enabled=os.getenv("METRICS_ENABLED", "1") == "1")
+profiler = SamplingProfiler()
 
 # Get the base directory (project root)
 BASE_DIR = Path(__file__).resolve().parent.parent
-MODEL_PATH = BASE_DIR / 'models' / 'credit_risk_pipeline.pkl'
+MODELS_DIR = BASE_DIR / 'models'
+MODEL_PATH = MODELS_DIR / 'credit_risk_pipeline.pkl'
+SERVING_DIR = MODELS_DIR / 'serving'
+VERSIONS_DIR = Path(os.getenv("MODEL_VERSIONS_DIR", MODELS_DIR / 'versions'))
+
+# "pipeline" unpickles the full sklearn pipeline; "slim" loads only the booster
+# (UBJSON) and preprocessing parameters exported to SERVING_DIR, so the worker
+# never imports joblib, sklearn or pandas
+SERVING_ARTIFACT = os.getenv("SERVING_ARTIFACT", "pipeline")
+
+# "fast" encodes requests with NumPy tables compiled from the fitted
+# ColumnTransformer (see fast_inference.py); "pipeline" uses sklearn as is;
+# "trees" also replaces the booster call with the compiled tree arrays in
+# tree_inference.py (same probabilities, no per-request XGBoost overhead)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "fast")
+if INFERENCE_BACKEND == "pipeline" and SERVING_ARTIFACT == "slim":
+    INFERENCE_BACKEND = "fast"
+# Larger batches are faster through XGBoost's multithreaded predictor
+COMPILED_TREES_MAX_ROWS = int(os.getenv("COMPILED_TREES_MAX_ROWS", "64"))
+
+# Served model version: MODEL_VERSION picks one from models/versions at
+# start-up (default: the artifact in models/); admins can reload or roll back
+# at runtime, and MODEL_WATCH_INTERVAL_S > 0 polls models/versions for new
+# versions (see model_store.py)
+MODEL_VERSION = os.getenv("MODEL_VERSION")
+MODEL_WATCH_INTERVAL_S = float(os.getenv("MODEL_WATCH_INTERVAL_S", "0"))
+model_threads = None
+
 
-pipeline = joblib.load(MODEL_PATH)
+def load_model(directory, version):
+    """`ServedModel` for a model directory, built with this API's settings."""
+    served = ServedModel.load(
+        directory, version,
+        artifact=SERVING_ARTIFACT,
+        compile_trees=INFERENCE_BACKEND == "trees",
+        # Optional per-request SHAP explanations (?explain=shap), see explain.py;
+        # shap itself is imported on the first explained request
+        shap_cache_size=int(os.getenv("SHAP_CACHE_SIZE", "4096")),
+        shap_budget_ms=float(os.getenv("SHAP_BUDGET_MS", "250")),
+        # SHAP_BACKGROUND=1 explains against the reference background sample
+        # stored with the model (interventional SHAP, slower)
+        shap_background=os.getenv("SHAP_BACKGROUND", "0") == "1",
+    )
+    if model_threads is not None:
+        served.set_threads(model_threads)
+    return served
 
-# Get the model from pipeline - it might be named 'classifier' or be the last step
-try:
-    model = pipeline.named_steps['classifier']
-except KeyError:
-    # If 'classifier' doesn't exist, get the final step
-    model = pipeline.steps[-1][1]
 
-explainer = shap.TreeExplainer(model)
+def set_model_threads(nthread):
+    """
+    Pin XGBoost's thread count on every loaded model (used per worker by
+    gunicorn.conf.py): the served model and its rollback history, the shadow
+    and challenger models, and any model loaded or swapped in later.
+    """
+    global model_threads
+    model_threads = nthread
+    models.set_threads(nthread)
+    for served in (shadow.model, router.challenger):
+        if served is not None:
+            served.set_threads(nthread)
 
-app = fa(title='Credit Risk Scoring')
+
+@asynccontextmanager
+async def lifespan(app):
+    # In each worker (after gunicorn's fork): threads don't survive a fork
+    models.watch(MODEL_WATCH_INTERVAL_S)
+    yield
+    if audit is not None:
+        # Queued decisions are written before the worker exits
+        if not audit.flush(timeout=5.0):
+            logger.error("Audit log not flushed at shutdown: %d requests still queued", audit.stats()["queue_depth"])
+
+
+app = fa(title='Credit Risk Scoring', lifespan=lifespan)
+app.add_middleware(TimingMiddleware, metrics=metrics)
 
 # Add CORS middleware
 # Get allowed origins from environment variable or use defaults
@@ -61,338 +148,693 @@ class LoanApplication(BaseModel):
 def home():
     return {'message': "Credit Risk API is running"}
 
+def prepare_features(applications):
+    """
+    Raw plus derived feature columns for a batch of applications.
+
+    Returns:
+        Dictionary of column name -> NumPy array (one value per application)
+    """
+    with metrics.stage("features"):
+        return derive_features({c: np.array([getattr(a, c) for a in applications]) for c in RAW_COLUMNS})
+
+
+# Columns the derived features divide by
+DIVISOR_COLUMNS = ('person_income', 'loan_amnt', 'person_age')
+
+
+def derive_features(columns):
+    """Raw `LoanApplication` columns plus the derived features."""
+    for col in DIVISOR_COLUMNS:
+        if (columns[col] == 0).any():
+            raise ZeroDivisionError('float division by zero')
+
+    features = dict(columns)
+    features.update(engineer_features(columns))
+    return features
+
+
+def predict_probabilities(features, n, served):
+    """Probability of default for `n` prepared rows, via the configured backend."""
+    if INFERENCE_BACKEND == "pipeline":
+        import pandas as pd
+
+        with metrics.stage("encode"):
+            frame = pd.DataFrame(features)
+        with metrics.stage("predict"):
+            return served.model_steps.predict_proba(frame)[:, 1]
+
+    with metrics.stage("encode"):
+        X = served.fast_scorer.encode(features, n)
+    with metrics.stage("predict"):
+        if served.compiled_trees is not None and n <= COMPILED_TREES_MAX_ROWS:
+            return served.compiled_trees.predict_proba(X)
+        return served.fast_scorer.predict_encoded(X)
+
+
+def score_applications(applications, explain=False, served=None):
+    """
+    Score a batch of applications with a single model call (per model).
+
+    Args:
+        applications: List of `LoanApplication` models
+        explain: Attach per-feature SHAP contributions to every result
+        served: `ServedModel` to use. By default live traffic goes to the
+            current model, or to the challenger for the share routed to it,
+            and is also queued for the shadow model (see shadow.py)
+
+    Returns:
+        List of response dicts, in input order
+    """
+    if served is not None:
+        return score_with_model(applications, explain, served)
+
+    # Read once: a reload mid-request must not mix two models in one response
+    groups = router.route(applications, models.current)
+    if len(groups) == 1:
+        return score_with_model(applications, explain, groups[0][0], live=True)
+    results = [None] * len(applications)
+    for served, indices in groups:
+        scored = score_with_model([applications[i] for i in indices], explain, served, live=True)
+        for i, result in zip(indices, scored):
+            results[i] = result
+    return results
+
+
+def score_with_model(applications, explain, served, live=False):
+    """`score_applications` with one given model; `live` requests are also shadowed."""
+    return score_features(prepare_features(applications), len(applications), explain, served, live)
+
+
+def score_features(features, n, explain, served, live=False):
+    """`score_with_model` for `n` rows of prepared feature columns."""
+    probabilities = predict_probabilities(features, n, served)
+    with metrics.stage("rules"):
+        risk_factors = rule_engine.evaluate(features, n)
+
+    with metrics.stage("response"):
+        keys = ['dti_ratio', 'loan_grade_letter', 'person_income', 'person_emp_length']
+        rows = [dict(zip(keys, values)) for values in zip(*(features[k].tolist() for k in keys))]
+
+        results = []
+        for row, factors, probability in zip(rows, risk_factors, probabilities.tolist()):
+            status = "Rejected" if probability > DECISION_THRESHOLD else "Approved"
+
+            # Calculate credit score (inverse of probability)
+            credit_score = int(900 - (probability * 600))
+
+            results.append({
+                "probability": float(probability),
+                "decision": status,
+                "risk_level": "HIGH RISK" if probability > DECISION_THRESHOLD else "LOW RISK",
+                "risk_factors": factors,
+                "model_version": served.version,
+                "metadata": {
+                    "credit_score": credit_score,
+                    "dti_ratio": float(row['dti_ratio']),
+                    "loan_grade": row['loan_grade_letter'],
+                    "income": float(row['person_income']),
+                    "employment_years": float(row['person_emp_length'])
+                }
+            })
+
+    if explain:
+        with metrics.stage("explain"):
+            explanations = served.shap_explainer.explain(served.fast_scorer.encode(features, n))
+        for result, explanation in zip(results, explanations):
+            result["explanation"] = explanation or {"status": "over_budget"}
+    if live:
+        observe_live(features, probabilities, served)
+    return results
+
+
+def observe_live(features, probabilities, served):
+    # Live traffic also feeds the shadow model and the drift monitor
+    shadow.submit(features, probabilities, served.version)
+    if served is models.current:
+        drift.observe(features, probabilities)
+
+
+def observe_validation(request):
+    # Body read + pydantic validation: from the middleware's start to the handler
+    start = request.scope.get("state", {}).get("request_start")
+    if start is not None:
+        metrics.observe("validation", time.perf_counter() - start)
+
+
+def serialize(content, request_id=None):
+    with metrics.stage("serialize"):
+        response = JSONResponse(content)
+    if request_id is not None:
+        response.headers["X-Request-ID"] = request_id
+    return response
+
+
+def new_request_id(request):
+    # The client's X-Request-ID, or a new one; echoed back and stored in the audit log
+    return request.headers.get("x-request-id") or uuid.uuid4().hex
+
+
+def application_ids(request):
+    # X-Application-ID names a single application in the audit log (default: a hash of its inputs)
+    application_id = request.headers.get("x-application-id")
+    return [application_id] if application_id else None
+
+
+def audit_decisions(*args, **kwargs):
+    """Queue decisions for the audit log (see `AuditLog.record`); waits while its queue is full."""
+    if audit is not None:
+        with metrics.stage("audit"):
+            audit.record(*args, **kwargs)
+
+
+def audit_results(endpoint, request_id, applications, results):
+    """Queue `score_with_cache` results for the audit log (used by the in-process backend)."""
+    audit_decisions(endpoint, request_id, applications, [r["probability"] for r in results],
+                    [r["model_version"] for r in results])
+
+
+async def audit_decisions_async(*args, **kwargs):
+    # A full audit queue applies backpressure in a worker thread, not on the event loop
+    if audit is not None:
+        with metrics.stage("audit"):
+            queued = audit.record(*args, block=False, **kwargs)
+        if not queued:
+            await run_in_threadpool(audit_decisions, *args, **kwargs)
+
+
 @app.post("/Calculating_DTI")
-def predict_loan_status(data: LoanApplication):
-    input_dict = data.model_dump()
-    
-    # Calculate ALL interaction features
-    input_dict['dti_ratio'] = input_dict['loan_amnt'] / input_dict['person_income']
-    input_dict['loan_percent_income'] = (input_dict['loan_amnt'] / input_dict['person_income']) * 100
-    input_dict['income_to_loan_ratio'] = input_dict['person_income'] / input_dict['loan_amnt']
-    input_dict['credit_hist_to_age_ratio'] = input_dict['cb_person_cred_hist_length'] / input_dict['person_age']
-    input_dict['employment_stability'] = input_dict['person_emp_length'] / input_dict['person_age']
-    
-    # Convert loan_grade to numeric
-    grade_map = {'A': 1, 'B': 2, 'C': 3, 'D': 4, 'E': 5, 'F': 6, 'G': 7}
-    loan_grade_numeric = grade_map.get(input_dict['loan_grade'].upper(), 1)
-    input_dict['loan_grade'] = loan_grade_numeric
-    
-    # Calculate remaining interaction features
-    input_dict['income_credit_product'] = input_dict['person_income'] * (8 - loan_grade_numeric)
-    input_dict['loan_burden'] = (input_dict['loan_int_rate'] * input_dict['loan_amnt']) / input_dict['person_income']
-    
-    input_df = pd.DataFrame([input_dict])
-    probability = pipeline.predict_proba(input_df)[0][1]
-    status = "Rejected" if probability > 0.4 else "Approved"
-    return {
+def predict_loan_status(data: LoanApplication, request: Request):
+    observe_validation(request)
+    request_id = new_request_id(request)
+    served = models.current
+    probability = predict_probabilities(prepare_features([data]), 1, served)[0]
+    status = "Rejected" if probability > DECISION_THRESHOLD else "Approved"
+    audit_decisions("/Calculating_DTI", request_id, [data], [probability], served.version,
+                    application_ids=application_ids(request))
+    return serialize({
         "probability_of_default": float(probability),
-        "decision": status
-    }
+        "decision": status,
+        "model_version": served.version
+    }, request_id)
     
     
+# Risk-factor rules are data; point RISK_RULES_PATH at an edited copy to change them
+RISK_RULES_PATH = os.getenv("RISK_RULES_PATH", str(DEFAULT_RULES_PATH))
+rule_engine = RuleEngine.from_file(RISK_RULES_PATH)
+
+
+# Opt-in micro-batching of concurrent /predict calls (see batching.py)
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "0") == "1"
+batcher = MicroBatcher(
+    score_applications,
+    max_wait_ms=float(os.getenv("MICROBATCH_MAX_WAIT_MS", "2")),
+    max_batch_size=int(os.getenv("MICROBATCH_MAX_SIZE", "64")),
+) if MICROBATCH_ENABLED else None
+
+
+# Applications scored by every newly loaded model before it is swapped in:
+# loads lazily initialized state and fails the reload if the model is broken
+WARMUP_APPLICATIONS = [
+    LoanApplication(person_age=25, person_income=45000, person_home_ownership="RENT",
+                    person_emp_length=3, loan_intent="EDUCATION", loan_grade="B", loan_amnt=8000,
+                    loan_int_rate=11.5, cb_person_default_on_file="N", cb_person_cred_hist_length=3),
+    LoanApplication(person_age=41, person_income=120000, person_home_ownership="MORTGAGE",
+                    person_emp_length=12, loan_intent="HOMEIMPROVEMENT", loan_grade="A", loan_amnt=20000,
+                    loan_int_rate=7.2, cb_person_default_on_file="N", cb_person_cred_hist_length=15),
+    LoanApplication(person_age=30, person_income=28000, person_home_ownership="OWN",
+                    person_emp_length=1, loan_intent="MEDICAL", loan_grade="E", loan_amnt=15000,
+                    loan_int_rate=18.9, cb_person_default_on_file="Y", cb_person_cred_hist_length=6),
+]
+
+
+def warmup_model(served):
+    # Single rows and a batch, as served: both the compiled-trees and booster paths
+    results = [score_applications([a], served=served)[0] for a in WARMUP_APPLICATIONS]
+    results += score_applications(WARMUP_APPLICATIONS * 32, served=served)
+    for result in results:
+        if not 0.0 <= result["probability"] <= 1.0:
+            raise ValueError(f"Warm-up produced an invalid probability: {result['probability']}")
+
+
+def cache_version():
+    """Response cache key version: the models a response can come from, and the rules."""
+    version = fingerprint(*models.current.files, RISK_RULES_PATH)
+    if router.challenger is not None:
+        version += f"-{router.challenger.fingerprint}-{router.percent:g}"
+    return version
+
+
+def on_model_swap(served):
+    drift.reset(served.drift_baseline if DRIFT_MONITOR_ENABLED else None, served.version)
+    if response_cache is not None:
+        # Cached responses came from the previous model
+        response_cache.invalidate(model_version=cache_version())
+
+
+models = ModelManager(load_model, warmup_model, VERSIONS_DIR,
+                      history=int(os.getenv("MODEL_HISTORY", "2")), on_swap=on_model_swap)
+if MODEL_VERSION:
+    models.start(VERSIONS_DIR / MODEL_VERSION, MODEL_VERSION)
+else:
+    models.start(MODELS_DIR, "default")
+
+
+def load_candidate(version):
+    """Load and warm up a version from models/versions for shadow or challenger use."""
+    served = load_model(models.directory(version), version)
+    warmup_model(served)
+    return served
+
+
+# Shadow scoring of live traffic and A/B routing to a challenger (see
+# shadow.py); both can also be set at runtime via /admin/shadow and
+# /admin/challenger
+router = ChallengerRouter()
+shadow = ShadowScorer(
+    os.getenv("SHADOW_LOG_PATH", str(BASE_DIR / 'logs' / 'shadow.jsonl')),
+    max_queue=int(os.getenv("SHADOW_QUEUE_SIZE", "1000")),
+    max_batch=int(os.getenv("SHADOW_BATCH_SIZE", "64")),
+    max_wait_ms=float(os.getenv("SHADOW_MAX_WAIT_MS", "50")),
+)
+if os.getenv("SHADOW_MODEL_VERSION"):
+    shadow.set_model(load_candidate(os.getenv("SHADOW_MODEL_VERSION")))
+if os.getenv("CHALLENGER_MODEL_VERSION"):
+    router.set_challenger(load_candidate(os.getenv("CHALLENGER_MODEL_VERSION")),
+                          float(os.getenv("CHALLENGER_TRAFFIC_PCT", "10")))
+
+
+# Live input and score distributions versus the served model's training
+# baseline (see drift.py)
+DRIFT_MONITOR_ENABLED = os.getenv("DRIFT_MONITOR_ENABLED", "1") == "1"
+drift = DriftMonitor(models.current.drift_baseline if DRIFT_MONITOR_ENABLED else None,
+                     models.current.version, flush_every=int(os.getenv("DRIFT_FLUSH_EVERY", "256")))
+
+
+# Cache of /predict responses for resubmitted applications (see cache.py);
+# RESPONSE_CACHE_SIZE=0 disables it, RESPONSE_CACHE_SQLITE shares it between workers
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "10000"))
+RESPONSE_CACHE_SQLITE = os.getenv("RESPONSE_CACHE_SQLITE")
+response_cache = ResponseCache(
+    max_entries=RESPONSE_CACHE_SIZE,
+    ttl_s=float(os.getenv("RESPONSE_CACHE_TTL_S", "300")),
+    model_version=cache_version(),
+    backend=SQLiteBackend(RESPONSE_CACHE_SQLITE) if RESPONSE_CACHE_SQLITE else None,
+) if RESPONSE_CACHE_SIZE > 0 else None
+
+
+# Audit trail of every decision served by /predict, /predict/batch and
+# /Calculating_DTI, written to SQLite by a background thread (see audit.py)
+AUDIT_LOG_ENABLED = os.getenv("AUDIT_LOG_ENABLED", "1") == "1"
+audit = AuditLog(
+    os.getenv("AUDIT_LOG_PATH", str(BASE_DIR / 'logs' / 'audit.db')),
+    max_queue=int(os.getenv("AUDIT_QUEUE_SIZE", "10000")),
+    max_batch=int(os.getenv("AUDIT_BATCH_SIZE", "512")),
+    max_wait_ms=float(os.getenv("AUDIT_MAX_WAIT_MS", "100")),
+    block_timeout_ms=float(os.getenv("AUDIT_BLOCK_TIMEOUT_MS", "1000")),
+    # A decision that can't be recorded is not served: 503 with Retry-After
+    # (AUDIT_REQUIRED=0 serves it and counts the dropped records instead)
+    required=os.getenv("AUDIT_REQUIRED", "1") == "1",
+) if AUDIT_LOG_ENABLED else None
+
+
+@app.exception_handler(AuditUnavailable)
+async def audit_unavailable(request: Request, exc: AuditUnavailable):
+    return JSONResponse({"detail": str(exc)}, status_code=503, headers={"Retry-After": str(exc.retry_after_s)})
+
+
+def cacheable(result):
+    # An over-budget explanation may succeed next time, so don't pin it
+    return result.get("explanation", {}).get("status") != "over_budget"
+
+
+def score_with_cache(applications, explain=None):
+    """
+    `score_applications` behind the response cache: only the applications not
+    already cached are scored (as one batch). Also used by the agent's
+    in-process backend (see scoring_client.py).
+    """
+    if response_cache is None:
+        return score_applications(applications, explain == "shap")
+
+    keys = [response_cache.key(a, explain=explain) for a in applications]
+    results = [response_cache.get(k) for k in keys]
+    missing = [i for i, r in enumerate(results) if r is None]
+    if missing:
+        scored = score_applications([applications[i] for i in missing], explain == "shap")
+        for i, result in zip(missing, scored):
+            results[i] = result
+            if cacheable(result):
+                response_cache.put(keys[i], result)
+    return results
+
+
 @app.post("/predict")
-def predict(data: LoanApplication):
+async def predict(data: LoanApplication, request: Request, explain: Optional[Literal["shap"]] = None):
+    observe_validation(request)
+    request_id = new_request_id(request)
     try:
-        print(f"Received request: {data}")
-        input_dict = data.model_dump()
-        print(f"Input dict: {input_dict}")
-        
-        # ==========================================
-        # CALCULATE ALL INTERACTION FEATURES
-        # ==========================================
-        
-        # Basic derived features
-        input_dict['dti_ratio'] = input_dict['loan_amnt'] / input_dict['person_income']
-        input_dict['loan_percent_income'] = (input_dict['loan_amnt'] / input_dict['person_income']) * 100
-        
-        # New interaction features
-        input_dict['income_to_loan_ratio'] = input_dict['person_income'] / input_dict['loan_amnt']
-        input_dict['credit_hist_to_age_ratio'] = input_dict['cb_person_cred_hist_length'] / input_dict['person_age']
-        input_dict['employment_stability'] = input_dict['person_emp_length'] / input_dict['person_age']
-        
-        print(f"After basic calculations: dti={input_dict['dti_ratio']:.4f}, income_to_loan={input_dict['income_to_loan_ratio']:.4f}")
-        
-        # Convert loan_grade to numeric (A=1, B=2, ..., G=7)
-        grade_map = {'A': 1, 'B': 2, 'C': 3, 'D': 4, 'E': 5, 'F': 6, 'G': 7}
-        original_grade = input_dict['loan_grade']
-        loan_grade_numeric = grade_map.get(input_dict['loan_grade'].upper(), 1)
-        input_dict['loan_grade'] = loan_grade_numeric
-        
-        # Calculate grade-dependent interaction features
-        input_dict['income_credit_product'] = input_dict['person_income'] * (8 - loan_grade_numeric)
-        input_dict['loan_burden'] = (input_dict['loan_int_rate'] * input_dict['loan_amnt']) / input_dict['person_income']
-        
-        print(f"Interaction features: income_credit_product={input_dict['income_credit_product']:.2f}, loan_burden={input_dict['loan_burden']:.4f}")
-        
-        input_df = pd.DataFrame([input_dict])
-        
-        # Get probability
-        probability = pipeline.predict_proba(input_df)[0][1]
-        status = "Rejected" if probability > 0.4 else "Approved"
-        
-        # Calculate credit score (inverse of probability)
-        credit_score = int(900 - (probability * 600))
-        
-        # Enhanced risk factor identification with importance scores AND percentages
-        risk_factors = []
-        
-        # Calculate individual factor scores (0-100%)
-        # These percentages represent the "strength" of each factor
-        
-        # Default History Score (0-100%)
-        default_score = 0 if input_dict['cb_person_default_on_file'].upper() == 'Y' else 100
-        
-        # Credit Grade Score (A=100, B=85, C=70, D=55, E=40, F=25, G=10)
-        grade_score = max(0, 100 - ((input_dict['loan_grade'] - 1) * 15))
-        
-        # DTI Score (lower DTI = higher score)
-        dti_score = max(0, min(100, 100 - (input_dict['dti_ratio'] * 200)))
-        
-        # Employment Length Score
-        emp_score = min(100, (input_dict['person_emp_length'] / 10) * 100)
-        
-        # Credit History Length Score
-        credit_hist_score = min(100, (input_dict['cb_person_cred_hist_length'] / 15) * 100)
-        
-        # Income Score (normalized)
-        income_score = min(100, (input_dict['person_income'] / 150000) * 100)
-        
-        # Interest Rate Score (lower rate = higher score)
-        interest_score = max(0, 100 - ((input_dict['loan_int_rate'] - 5) * 5))
-        
-        # Age Score
-        age_score = min(100, ((input_dict['person_age'] - 18) / 42) * 100)
-        
-        # HIGH PRIORITY FACTORS (scores < 40)
-        if default_score < 40:
-            risk_factors.append({
-                "feature": "Previous Default History", 
-                "impact": "HIGH", 
-                "note": "Has previous defaults on file",
-                "importance": 95,
-                "percentage": int(default_score)
-            })
-        
-        if grade_score < 40:
-            risk_factors.append({
-                "feature": "Poor Credit Grade", 
-                "impact": "HIGH", 
-                "note": f"Grade {original_grade} indicates higher risk",
-                "importance": 90,
-                "percentage": int(grade_score)
-            })
-        
-        # MEDIUM PRIORITY FACTORS
-# MEDIUM PRIORITY FACTORS (scores 40-70)
-        if dti_score >= 40 and dti_score < 70:
-            risk_factors.append({
-                "feature": "Moderate Debt-to-Income Ratio", 
-                "impact": "MEDIUM", 
-                "note": f"DTI of {input_dict['dti_ratio']*100:.1f}% requires monitoring",
-                "importance": 75,
-                "percentage": int(dti_score)
-            })
-        elif dti_score < 40:
-            risk_factors.append({
-                "feature": "High Debt-to-Income Ratio", 
-                "impact": "HIGH", 
-                "note": f"DTI of {input_dict['dti_ratio']*100:.1f}% exceeds safe threshold",
-                "importance": 85,
-                "percentage": int(dti_score)
-            })
-        
-        if interest_score >= 40 and interest_score < 70:
-            risk_factors.append({
-                "feature": "Elevated Interest Rate", 
-                "impact": "MEDIUM", 
-                "note": f"Rate of {input_dict['loan_int_rate']}% indicates moderate risk",
-                "importance": 70,
-                "percentage": int(interest_score)
-            })
-        
-        if emp_score >= 40 and emp_score < 70:
-            risk_factors.append({
-                "feature": "Limited Employment History", 
-                "impact": "MEDIUM", 
-                "note": f"{input_dict['person_emp_length']} years of employment",
-                "importance": 68,
-                "percentage": int(emp_score)
-            })
-        
-        if credit_hist_score >= 40 and credit_hist_score < 70:
-            risk_factors.append({
-                "feature": "Developing Credit History", 
-                "impact": "MEDIUM", 
-                "note": f"{input_dict['cb_person_cred_hist_length']} years credit track record",
-                "importance": 65,
-                "percentage": int(credit_hist_score)
-            })
-        
-        # POSITIVE FACTORS (scores >= 70)
-        if default_score >= 70:
-            risk_factors.append({
-                "feature": "Clean Repayment History", 
-                "impact": "POSITIVE", 
-                "note": "No previous defaults recorded",
-                "importance": 88,
-                "percentage": int(default_score)
-            })
-        
-        if grade_score >= 70:
-            risk_factors.append({
-                "feature": "Strong Credit Grade", 
-                "impact": "POSITIVE", 
-                "note": f"Grade {original_grade} demonstrates creditworthiness",
-                "importance": 85,
-                "percentage": int(grade_score)
-            })
-        
-        if dti_score >= 70:
-            risk_factors.append({
-                "feature": "Healthy Debt-to-Income Ratio", 
-                "impact": "POSITIVE", 
-                "note": f"DTI of {input_dict['dti_ratio']*100:.1f}% shows good financial management",
-                "importance": 80,
-                "percentage": int(dti_score)
-            })
-        
-        if emp_score >= 70:
-            risk_factors.append({
-                "feature": "Strong Employment Stability",
-                "impact": "POSITIVE",
-                "note": f"{input_dict['person_emp_length']} years demonstrates job security",
-                "importance": 78,
-                "percentage": int(emp_score)
-            })
-        
-        if income_score >= 70:
-            risk_factors.append({
-                "feature": "Strong Income Level",
-                "impact": "POSITIVE",
-                "note": f"Annual income of ₹{input_dict['person_income']:,.0f} provides repayment capacity",
-                "importance": 82,
-                "percentage": int(income_score)
-            })
-        
-        if credit_hist_score >= 70:
-            risk_factors.append({
-                "feature": "Established Credit History",
-                "impact": "POSITIVE",
-                "note": f"{input_dict['cb_person_cred_hist_length']} years of credit experience",
-                "importance": 76,
-                "percentage": int(credit_hist_score)
-            })
-        
-        # ==========================================
-        # NEW INTERACTION FEATURE ANALYSIS
-        # ==========================================
-        
-        # Income-to-Loan Ratio Analysis
-        income_to_loan_score = min(100, (input_dict['income_to_loan_ratio'] / 10) * 100)
-        if income_to_loan_score >= 70:
-            risk_factors.append({
-                "feature": "Strong Affordability Ratio",
-                "impact": "POSITIVE",
-                "note": f"Income is {input_dict['income_to_loan_ratio']:.1f}x the loan amount",
-                "importance": 84,
-                "percentage": int(income_to_loan_score)
-            })
-        elif income_to_loan_score < 40:
-            risk_factors.append({
-                "feature": "Loan Affordability Concern",
-                "impact": "HIGH",
-                "note": f"Loan amount is {(1/input_dict['income_to_loan_ratio'])*100:.1f}% of annual income",
-                "importance": 87,
-                "percentage": int(income_to_loan_score)
-            })
-        
-        # Employment Stability Analysis
-        employment_stability_score = min(100, (input_dict['employment_stability'] / 0.5) * 100)
-        if employment_stability_score >= 70:
-            risk_factors.append({
-                "feature": "Excellent Career Stability",
-                "impact": "POSITIVE",
-                "note": f"Employment spans {input_dict['employment_stability']*100:.1f}% of working age",
-                "importance": 79,
-                "percentage": int(employment_stability_score)
-            })
-        elif employment_stability_score < 40:
-            risk_factors.append({
-                "feature": "Limited Career Stability",
-                "impact": "MEDIUM",
-                "note": f"Short employment history relative to age",
-                "importance": 72,
-                "percentage": int(employment_stability_score)
-            })
-        
-        # Loan Burden Analysis
-        loan_burden_score = max(0, 100 - (input_dict['loan_burden'] * 50))
-        if loan_burden_score < 40:
-            risk_factors.append({
-                "feature": "High Loan Burden",
-                "impact": "HIGH",
-                "note": f"Interest payments will significantly impact income",
-                "importance": 83,
-                "percentage": int(loan_burden_score)
-            })
-        elif loan_burden_score >= 70:
-            risk_factors.append({
-                "feature": "Manageable Loan Burden",
-                "impact": "POSITIVE",
-                "note": f"Interest payments are sustainable relative to income",
-                "importance": 77,
-                "percentage": int(loan_burden_score)
-            })
-        
-        # Credit History to Age Ratio
-        credit_maturity_score = min(100, (input_dict['credit_hist_to_age_ratio'] / 0.5) * 100)
-        if credit_maturity_score >= 70:
-            risk_factors.append({
-                "feature": "Mature Credit Profile",
-                "impact": "POSITIVE",
-                "note": f"Long credit history relative to age shows experience",
-                "importance": 74,
-                "percentage": int(credit_maturity_score)
-            })
-        elif credit_maturity_score < 40:
-            risk_factors.append({
-                "feature": "Young Credit Profile",
-                "impact": "MEDIUM",
-                "note": f"Limited credit history relative to age",
-                "importance": 69,
-                "percentage": int(credit_maturity_score)
-            })
-        
-        # Sort by importance and take top 5
-        risk_factors.sort(key=lambda x: x.get('importance', 0), reverse=True)
-        top_factors = risk_factors[:5]
-        
-        # Remove importance from output (used only for sorting)
-        for factor in top_factors:
-            factor.pop('importance', None)
-        
+        logger.debug("Received request: %s", data)
+        key = response_cache.key(data, explain=explain) if response_cache is not None else None
+        result = response_cache.get(key) if key is not None else None
+        if result is not None:
+            await audit_decisions_async("/predict", request_id, [data], [result["probability"]],
+                                        result["model_version"], application_ids=application_ids(request),
+                                        cached=True)
+            return serialize(result, request_id)
+
+        if batcher is not None and explain is None:
+            result = await batcher.submit(data)
+        else:
+            result = (await run_in_threadpool(score_applications, [data], explain == "shap"))[0]
+        if key is not None and cacheable(result):
+            response_cache.put(key, result)
+        await audit_decisions_async("/predict", request_id, [data], [result["probability"]],
+                                    result["model_version"], application_ids=application_ids(request))
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Credit Score = %s, PD = %.4f", result['metadata']['credit_score'], result['probability'])
+            logger.debug("Returning %d risk factors with percentages", len(result['risk_factors']))
+
+        return serialize(result, request_id)
+    except AuditUnavailable:
+        raise
+    except Exception as e:
+        logger.exception("Scoring failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+batch_adapter = TypeAdapter(List[LoanApplication])
+
+BATCH_REQUEST_BODY = {"requestBody": {"required": True, "content": {
+    "application/json": {"schema": {"type": "array", "items": {"$ref": "#/components/schemas/LoanApplication"}}},
+    ARROW_STREAM: {"schema": {"type": "string", "format": "binary"}},
+}}}
+
+@app.post("/predict/batch", openapi_extra=BATCH_REQUEST_BODY)
+async def predict_batch(request: Request, explain: Optional[Literal["shap"]] = None, risk_factors: bool = False):
+    # JSON by default. Arrow IPC streams (see columnar.py) are accepted with
+    # Content-Type and returned with Accept: application/vnd.apache.arrow.stream;
+    # Arrow batches are scored column-wise by the current model, without the
+    # response cache or challenger split. risk_factors adds a JSON column to
+    # Arrow responses (JSON responses always carry them).
+    arrow_in = is_arrow(request.headers.get("content-type"))
+    arrow_out = accepts_arrow(request.headers.get("accept"))
+    if explain is not None and (arrow_in or arrow_out):
+        raise HTTPException(status_code=422, detail="explain is only available for JSON requests and responses")
+
+    request_id = new_request_id(request)
+    body = await request.body()
+    with metrics.stage("validation"):
+        try:
+            if arrow_in:
+                columns, n = read_columns(body)
+            else:
+                data = batch_adapter.validate_json(body)
+        except ValidationError as e:
+            raise RequestValidationError([{**error, "loc": ("body", *error["loc"])} for error in e.errors()])
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+    try:
+        if not arrow_in and not arrow_out:
+            results = await run_in_threadpool(score_with_cache, data, explain)
+            await audit_decisions_async("/predict/batch", request_id, data, [r["probability"] for r in results],
+                                        [r["model_version"] for r in results])
+            return serialize(results, request_id)
+        if not arrow_in:
+            columns, n = {c: np.array([getattr(a, c) for a in data]) for c in RAW_COLUMNS}, len(data)
+        return await run_in_threadpool(score_columns, columns, n, arrow_out, risk_factors, request_id)
+    except AuditUnavailable:
+        raise
+    except Exception as e:
+        logger.exception("Batch scoring failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def score_columns(columns, n, arrow_out, with_factors, request_id):
+    """Score raw `LoanApplication` columns with the current model; JSON or Arrow response."""
+    served = models.current
+    with metrics.stage("features"):
+        features = derive_features(columns)
+    if not arrow_out:
+        results = score_features(features, n, False, served, live=True)
+        audit_decisions("/predict/batch", request_id, columns, [r["probability"] for r in results], served.version)
+        return serialize(results, request_id)
+
+    probabilities = predict_probabilities(features, n, served)
+    with metrics.stage("response"):
+        rejected = probabilities > DECISION_THRESHOLD
         result = {
-            "probability": float(probability),
-            "decision": status,
-            "risk_level": "HIGH RISK" if probability > 0.4 else "LOW RISK",
-            "risk_factors": top_factors,
-            "metadata": {
-                "credit_score": credit_score,
-                "dti_ratio": float(input_dict['dti_ratio']),
-                "loan_grade": original_grade,
-                "income": float(input_dict['person_income']),
-                "employment_years": float(input_dict['person_emp_length'])
-            }
+            "probability": probabilities,
+            "decision": categorical(rejected, ["Approved", "Rejected"]),
+            "risk_level": categorical(rejected, ["LOW RISK", "HIGH RISK"]),
+            "credit_score": credit_scores(probabilities).astype(np.int32),
+            "dti_ratio": features['dti_ratio'],
+            "loan_grade": features['loan_grade_letter'],
+            "income": np.asarray(features['person_income'], dtype=np.float64),
+            "employment_years": np.asarray(features['person_emp_length'], dtype=np.float64),
         }
-        
-        print(f"DEBUG: Credit Score = {credit_score}, PD = {probability:.4f}")
-        print(f"DEBUG: Returning {len(top_factors)} risk factors with percentages")
-        
-        return result
+    if with_factors:
+        with metrics.stage("rules"):
+            result["risk_factors"] = [json.dumps(f, ensure_ascii=False) for f in rule_engine.evaluate(features, n)]
+    observe_live(features, probabilities, served)
+    audit_decisions("/predict/batch", request_id, columns, probabilities, served.version)
+    with metrics.stage("serialize"):
+        content = write_table(result, metadata={"model_version": served.version})
+    return Response(content, media_type=ARROW_STREAM,
+                    headers={"X-Model-Version": served.version, "X-Request-ID": request_id})
+
+class WhatIfRequest(BaseModel):
+    application: LoanApplication
+    # Field -> values to try, e.g. {"loan_amnt": [5000, 10000], "loan_grade": ["A", "B"]}
+    grid: Dict[str, List[Union[float, str]]] = {}
+    # Also search the maximum approvable loan amount per combination of the other fields
+    boundary: bool = True
+    amount_range: Tuple[float, float] = AMOUNT_RANGE
+
+@app.post("/whatif")
+def whatif(data: WhatIfRequest, request: Request):
+    # Probability surface over every grid combination, scored as one batch by
+    # the current model (not routed to the challenger, shadowed or counted as
+    # live traffic for drift); see whatif.py
+    observe_validation(request)
+    served = models.current
+    try:
+        result = analyze(data.application.model_dump(), data.grid,
+                         lambda columns, n: predict_probabilities(columns, n, served),
+                         amount_range=data.amount_range, boundary=data.boundary)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return serialize({"model_version": served.version, **result})
+
+# Dataset context from the reference tables stored with the served model
+# (see reference.py); the training CSV is never read at serving time
+def _reference(served):
+    if served.reference is None:
+        raise HTTPException(status_code=404, detail=f"Model version {served.version} has no reference index")
+    return served.reference
+
+@app.post("/reference/context")
+def reference_context(data: List[LoanApplication]):
+    # Percentile ranks of each application, overall and within its grade x intent segment
+    served = models.current
+    reference = _reference(served)
+    try:
+        features = prepare_features(data)
+    except ZeroDivisionError:
+        zero = [c for c in DIVISOR_COLUMNS if any(getattr(a, c) == 0 for a in data)]
+        raise HTTPException(status_code=422, detail=f"{', '.join(zero)} must not be zero")
+    with metrics.stage("reference"):
+        context = reference.context(features, len(data))
+    return serialize({"model_version": served.version, "results": context})
+
+@app.get("/reference/percentile")
+def reference_percentile(feature: str, value: float, loan_grade: Optional[str] = None,
+                         loan_intent: Optional[str] = None):
+    served = models.current
+    reference = _reference(served)
+    if feature not in reference.features:
+        raise HTTPException(status_code=422, detail=f"feature must be one of {reference.features}")
+    result = {"model_version": served.version, "feature": feature, "value": value,
+              "percentile": float(reference.percentiles(feature, [value])[0])}
+    if loan_grade is not None and loan_intent is not None:
+        segment = reference.segment_ids([loan_grade], [loan_intent])
+        rank = reference.percentiles(feature, [value], segment)[0]
+        result["segment"] = reference.segment_summary(segment[0])
+        result["segment_percentile"] = None if np.isnan(rank) else float(rank)
+    return result
+
+@app.get("/reference/segments")
+def reference_segments():
+    served = models.current
+    return {"model_version": served.version, "segments": _reference(served).segment_table()}
+
+@app.get("/metrics/batching")
+def batching_metrics():
+    if batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **batcher.stats()}
+
+@app.get("/metrics/explain")
+def explain_metrics():
+    return models.current.shap_explainer.stats()
+
+@app.get("/metrics/drift")
+def drift_metrics():
+    return drift.summary()
+
+@app.get("/metrics/audit")
+def audit_metrics():
+    if audit is None:
+        return {"enabled": False}
+    return {"enabled": True, **audit.stats()}
+
+@app.get("/metrics/cache")
+def cache_metrics():
+    if response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **response_cache.stats()}
+
+def _stats_gauges(prefix, stats):
+    # Numeric fields of a component's stats() dict, exported as gauges
+    def collect():
+        return [(f"{prefix}_{name}", "gauge", f"{prefix} {name.replace('_', ' ')}", value)
+                for name, value in stats().items()
+                if isinstance(value, (int, float)) and not isinstance(value, bool)]
+    return collect
+
+
+if response_cache is not None:
+    metrics.add_collector(_stats_gauges("cache", response_cache.stats))
+if batcher is not None:
+    metrics.add_collector(_stats_gauges("batching", batcher.stats))
+metrics.add_collector(_stats_gauges("explain", lambda: models.current.shap_explainer.stats()))
+metrics.add_collector(_stats_gauges("model", models.stats))
+metrics.add_collector(_stats_gauges("shadow", shadow.stats))
+metrics.add_collector(_stats_gauges("drift", drift.gauges))
+if audit is not None:
+    metrics.add_collector(_stats_gauges("audit", audit.stats))
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+# Admin endpoints need the X-Admin-Token header to match ADMIN_TOKEN; they are
+# disabled when ADMIN_TOKEN is unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN not set)")
+    if x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@app.post("/admin/profiler/start", dependencies=[Depends(require_admin)])
+def start_profiler(interval_ms: float = 5.0):
+    profiler.start(interval_ms)
+    return profiler.stats()
+
+@app.post("/admin/profiler/stop", dependencies=[Depends(require_admin)])
+def stop_profiler():
+    profiler.stop()
+    return profiler.stats()
+
+@app.get("/admin/profiler", dependencies=[Depends(require_admin)])
+def profiler_samples(top: Optional[int] = None):
+    # Folded stacks, ready for flamegraph.pl or speedscope
+    return PlainTextResponse(profiler.folded(top))
+
+# Model versions: each worker reloads on its own, so with several gunicorn
+# workers use MODEL_WATCH_INTERVAL_S rather than these endpoints to reach all
+@app.get("/admin/model", dependencies=[Depends(require_admin)])
+def model_status():
+    return models.stats()
+
+@app.post("/admin/model/reload", dependencies=[Depends(require_admin)])
+def reload_model(version: Optional[str] = None, wait: bool = False):
+    # Default: the newest version in models/versions. Loading and warm-up run
+    # in the background (202) unless wait=true
+    try:
+        if version is not None:
+            models.directory(version)
+        if wait:
+            models.reload(version)
+            return models.stats()
+    except (ValueError, FileNotFoundError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=f"Reload failed: {e}")
+    if not models.reload_in_background(version):
+        raise HTTPException(status_code=409, detail="A reload is already in progress")
+    return JSONResponse(models.stats(), status_code=202)
+
+@app.post("/admin/model/rollback", dependencies=[Depends(require_admin)])
+def rollback_model():
+    try:
+        models.rollback()
+    except LookupError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return models.stats()
+
+# Recorded decisions, newest first; since/until are Unix timestamps. Rows
+# appear once the writer's batch is committed (AUDIT_MAX_WAIT_MS)
+@app.get("/admin/audit", dependencies=[Depends(require_admin)])
+def audit_decisions_lookup(application_id: Optional[str] = None, request_id: Optional[str] = None,
+                           since: Optional[float] = None, until: Optional[float] = None, limit: int = 100):
+    if audit is None:
+        raise HTTPException(status_code=404, detail="The audit log is disabled (AUDIT_LOG_ENABLED=0)")
+    if not 1 <= limit <= 1000:
+        raise HTTPException(status_code=422, detail="limit must be between 1 and 1000")
+    return audit_query(audit.path, application_id=application_id, request_id=request_id,
+                       since=since, until=until, limit=limit)
+
+# Shadow and challenger models: versions from models/versions, per worker
+def _candidate(version):
+    try:
+        return load_candidate(version)
+    except (ValueError, FileNotFoundError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/admin/shadow", dependencies=[Depends(require_admin)])
+def shadow_status():
+    # Live agreement and drift since the shadow model was set, plus the A/B split
+    return {"shadow": shadow.stats(), "challenger": router.stats()}
+
+@app.get("/admin/shadow/summary", dependencies=[Depends(require_admin)])
+def shadow_summary():
+    # Whole shadow log, per (served model, shadow model) pair
+    if not shadow.log_path.exists():
+        return []
+    return summarize_log(shadow.log_path)
+
+@app.post("/admin/shadow", dependencies=[Depends(require_admin)])
+def set_shadow(version: str):
+    shadow.set_model(_candidate(version))
+    return shadow.stats()
+
+@app.delete("/admin/shadow", dependencies=[Depends(require_admin)])
+def stop_shadow():
+    shadow.set_model(None)
+    return shadow.stats()
+
+@app.post("/admin/challenger", dependencies=[Depends(require_admin)])
+def set_challenger(version: str, percent: float = 10.0):
+    if not 0 <= percent <= 100:
+        raise HTTPException(status_code=422, detail="percent must be between 0 and 100")
+    router.set_challenger(_candidate(version), percent)
+    on_model_swap(models.current)
+    return router.stats()
+
+@app.delete("/admin/challenger", dependencies=[Depends(require_admin)])
+def stop_challenger():
+    router.set_challenger(None, 0)
+    on_model_swap(models.current)
+    return router.stats()
 
 if __name__ == "__main__":
     import uvicorn
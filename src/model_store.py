@@ -0,0 +1,317 @@
+"""
+Versioned model artifacts and zero-downtime reloads for the API.
+
+A model directory has the layout written by `src.train.save_version`:
+
+    <directory>/
+        credit_risk_pipeline.pkl   full sklearn pipeline
+        serving/                   slim artifact (booster.ubj + preprocess.json)
+        drift_baseline.json        training distributions for the drift monitor (optional)
+        reference/                 memory-mapped training statistics (optional, see reference.py)
+        metrics.json               written last, so its presence marks a complete version
+
+`models/` itself has the same layout (the "default" model); trained versions
+live in `models/versions/<version>/`.
+
+`ServedModel` holds everything scoring needs from one directory (pipeline or
+slim scorer, compiled trees, SHAP explainer, reference statistics). `ModelManager` owns the
+current one: a reload loads and warms up the new model on a background
+thread, then replaces `manager.current` with a single assignment. Requests
+read `manager.current` once and score entirely with that object, so
+in-flight requests finish on the model they started with and no request
+waits for a load. The models it replaced stay in memory for an instant
+rollback.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from src.cache import fingerprint
+from src.drift import load_baseline
+from src.explain import ShapExplainer
+from src.fast_inference import FastScorer
+from src.reference import load_reference
+from src.tree_inference import CompiledTrees
+
+logger = logging.getLogger("credit_risk.models")
+
+PIPELINE_FILE = 'credit_risk_pipeline.pkl'
+SERVING_SUBDIR = 'serving'
+COMPLETE_MARKER = 'metrics.json'
+
+
+class ServedModel:
+    """
+    One loaded model artifact and the scoring objects built from it.
+
+    Use `ServedModel.load`; attributes:
+        version: Version name ("default" for the artifact in models/)
+        fingerprint: Content hash of the artifact files
+        pipeline, model_steps: sklearn pipeline and its steps after the feature
+            stage (None for the slim artifact)
+        model: XGBClassifier (pipeline) or Booster (slim)
+        fast_scorer, compiled_trees, shap_explainer: see fast_inference.py,
+            tree_inference.py and explain.py
+        drift_baseline: Baseline for the drift monitor (see drift.py), or None
+        reference: `ReferenceIndex` of the training data (see reference.py), or None
+    """
+
+    def __init__(self, version, directory, files, pipeline, model, fast_scorer,
+                 compiled_trees=None, shap_explainer=None, drift_baseline=None, reference=None):
+        self.version = version
+        self.directory = Path(directory)
+        self.files = list(files)
+        self.fingerprint = fingerprint(*self.files)
+        self.pipeline = pipeline
+        self.model_steps = pipeline[1:] if pipeline is not None else None
+        self.model = model
+        self.fast_scorer = fast_scorer
+        self.compiled_trees = compiled_trees
+        self.shap_explainer = shap_explainer
+        self.drift_baseline = drift_baseline
+        self.reference = reference
+        self.loaded_at = time.time()
+
+    @classmethod
+    def load(cls, directory, version, artifact="pipeline", compile_trees=False,
+             shap_cache_size=4096, shap_budget_ms=250.0, shap_background=False):
+        """
+        Load a model directory.
+
+        Args:
+            artifact: "pipeline" unpickles the full sklearn pipeline; "slim"
+                loads only serving/ (no joblib, sklearn or pandas)
+            compile_trees: Also build `CompiledTrees` (INFERENCE_BACKEND=trees)
+            shap_background: Explain against the reference background sample
+                (interventional SHAP) instead of the trees' own cover statistics
+        """
+        directory = Path(directory)
+        if artifact == "slim":
+            pipeline = None
+            fast_scorer = FastScorer.load(directory / SERVING_SUBDIR)
+            model = fast_scorer.booster
+            files = [directory / SERVING_SUBDIR / 'booster.ubj', directory / SERVING_SUBDIR / 'preprocess.json']
+        else:
+            import joblib
+
+            pipeline = joblib.load(directory / PIPELINE_FILE)
+            # Get the model from pipeline - it might be named 'classifier' or be the last step
+            try:
+                model = pipeline.named_steps['classifier']
+            except KeyError:
+                model = pipeline.steps[-1][1]
+            fast_scorer = FastScorer.from_pipeline(pipeline)
+            files = [directory / PIPELINE_FILE]
+
+        compiled_trees = (CompiledTrees.from_booster(fast_scorer.booster, fast_scorer.iteration_range)
+                          if compile_trees else None)
+        reference = load_reference(directory)
+        background = reference.background if shap_background and reference is not None else None
+        shap_explainer = ShapExplainer(model, fast_scorer.source_features(), cache_size=shap_cache_size,
+                                       budget_ms=shap_budget_ms, background=background)
+        return cls(version, directory, files, pipeline, model, fast_scorer, compiled_trees, shap_explainer,
+                   load_baseline(directory), reference)
+
+    def set_threads(self, nthread):
+        """Pin XGBoost's thread count for this model."""
+        self.fast_scorer.booster.set_param({'nthread': nthread})
+        if self.pipeline is not None:
+            self.model.set_params(n_jobs=nthread)
+            self.model.get_booster().set_param({'nthread': nthread})
+
+    def info(self):
+        return {
+            "version": self.version,
+            "fingerprint": self.fingerprint,
+            "directory": str(self.directory),
+            "loaded_at": self.loaded_at,
+        }
+
+
+class ModelManager:
+    """
+    Current model plus background reload, rollback and directory watching.
+
+    Args:
+        load: Callable (directory, version) -> ServedModel
+        warmup: Callable (ServedModel) -> None; scores a few requests and
+            raises if the model is unusable (the swap is then abandoned)
+        versions_dir: Directory of versioned artifacts (models/versions)
+        history: Replaced models kept in memory for `rollback`
+        on_swap: Called with the new model right after every swap
+    """
+
+    def __init__(self, load, warmup, versions_dir, history=2, on_swap=None):
+        self.load = load
+        self.warmup = warmup
+        self.versions_dir = Path(versions_dir)
+        self.on_swap = on_swap
+        self.current = None
+        self._previous = deque(maxlen=history)
+        # XGBoost thread count pinned on every model swapped in (see set_threads)
+        self.nthread = None
+        # One reload or rollback at a time; scoring never takes this lock
+        self._lock = threading.Lock()
+        self._known = set()
+        self._watcher = None
+
+        # Metrics
+        self.reloads = 0
+        self.rollbacks = 0
+        self.failures = 0
+        self.reloading = None
+        self.last_error = None
+        self.last_reload_s = None
+
+    def versions(self):
+        """Complete versions in `versions_dir`, oldest first (by completion time)."""
+        if not self.versions_dir.is_dir():
+            return []
+        complete = []
+        for directory in self.versions_dir.iterdir():
+            marker = directory / COMPLETE_MARKER
+            if marker.is_file():
+                complete.append((marker.stat().st_mtime_ns, directory.name))
+        return [name for _, name in sorted(complete)]
+
+    def directory(self, version):
+        """Directory of a complete version (plain names only: no paths out of versions_dir)."""
+        if not version or Path(version).name != version or version in ('.', '..'):
+            raise ValueError(f"Invalid model version '{version}'")
+        directory = self.versions_dir / version
+        if not (directory / COMPLETE_MARKER).is_file():
+            raise FileNotFoundError(f"Model version '{version}' not found in {self.versions_dir}")
+        return directory
+
+    def start(self, directory, version):
+        """Load and warm up the first model (blocking, at start-up)."""
+        served = self.load(directory, version)
+        self.warmup(served)
+        self._pin(served)
+        self.current = served
+        self._known = set(self.versions())
+        return served
+
+    def set_threads(self, nthread):
+        """Pin XGBoost's thread count on the current and previous models and on every later swap."""
+        with self._lock:
+            self.nthread = nthread
+            for served in (self.current, *self._previous):
+                if served is not None:
+                    served.set_threads(nthread)
+
+    def _pin(self, served):
+        if self.nthread is not None:
+            served.set_threads(self.nthread)
+
+    def _swap(self, served):
+        self._pin(served)
+        self._previous.append(self.current)
+        # The assignment is the switch: requests that already read the old
+        # model finish with it, every later request gets the new one
+        self.current = served
+        if self.on_swap is not None:
+            self.on_swap(served)
+
+    def reload(self, version=None):
+        """
+        Load `version` (default: the newest complete one), warm it up and swap it in.
+
+        Blocks until done; the served model is untouched if anything fails.
+
+        Returns:
+            The new `ServedModel`, or the current one if it is already that version
+        """
+        with self._lock:
+            version = version or (self.versions() or [None])[-1]
+            if version is None:
+                raise FileNotFoundError(f"No model versions in {self.versions_dir}")
+            directory = self.directory(version)
+            if version == self.current.version:
+                return self.current
+            self.reloading = version
+            start = time.perf_counter()
+            try:
+                served = self.load(directory, version)
+                self.warmup(served)
+            except Exception as e:
+                self.failures += 1
+                self.last_error = f"{version}: {e}"
+                logger.exception("Reload of model version %s failed; still serving %s",
+                                 version, self.current.version)
+                raise
+            finally:
+                self.reloading = None
+            self._swap(served)
+            self.reloads += 1
+            self.last_reload_s = time.perf_counter() - start
+            self.last_error = None
+            logger.info("Now serving model version %s (loaded in %.2f s)", version, self.last_reload_s)
+            return served
+
+    def reload_in_background(self, version=None):
+        """Start `reload` on a daemon thread; False if a reload is already running."""
+        if self._lock.locked():
+            return False
+
+        def run():
+            try:
+                self.reload(version)
+            except Exception:
+                pass  # logged and recorded in last_error by reload()
+
+        threading.Thread(target=run, name='model-reload', daemon=True).start()
+        return True
+
+    def rollback(self):
+        """Swap back to the model served before the last swap (already loaded and warm)."""
+        with self._lock:
+            if not self._previous:
+                raise LookupError("No previous model to roll back to")
+            previous = self._previous.pop()
+            self._pin(previous)
+            replaced = self.current
+            self.current = previous
+            if self.on_swap is not None:
+                self.on_swap(previous)
+            self.rollbacks += 1
+            logger.info("Rolled back from model version %s to %s", replaced.version, previous.version)
+            return previous
+
+    def watch(self, interval_s):
+        """
+        Poll `versions_dir` every `interval_s` seconds and reload when a new
+        complete version appears. A rollback sticks until the next new version.
+        """
+        if self._watcher is not None or interval_s <= 0:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval_s)
+                try:
+                    found = self.versions()
+                    new = [v for v in found if v not in self._known]
+                    self._known.update(found)
+                    if new:
+                        self.reload(new[-1])
+                except Exception:
+                    logger.debug("Model directory poll failed", exc_info=True)
+
+        self._watcher = threading.Thread(target=run, name='model-watch', daemon=True)
+        self._watcher.start()
+
+    def stats(self):
+        return {
+            "current": self.current.info() if self.current is not None else None,
+            "previous": [m.version for m in self._previous],
+            "available": self.versions(),
+            "reloading": self.reloading,
+            "reloads": self.reloads,
+            "rollbacks": self.rollbacks,
+            "failures": self.failures,
+            "last_reload_s": self.last_reload_s,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,320 @@
+"""
+Reference statistics of the training data, shipped with the model artifact.
+
+Serving sometimes needs dataset context, for example "income in the 80th
+percentile for EDUCATION loans" or a SHAP background sample. Rather than
+reloading data/credit_risk_dataset.csv, training precomputes compact tables
+and stores them next to the pipeline:
+
+    <model directory>/reference/
+        quantiles.npy           (features, levels) quantiles of all training rows
+        segment_quantiles.npy   (segments, features, levels) per loan grade x intent
+        segments.npy            (segments, stats) rows, default rate, mean probability, approval rate
+        background.npy          (rows, encoded columns) SHAP background sample
+        index.json              feature, level, segment and stat names; written
+                                last, so its presence marks a complete index
+
+The arrays are opened with `np.load(mmap_mode='r')`: loading reads only the
+headers, pages are shared between gunicorn workers through the page cache,
+and a percentile lookup is a binary search (`bisect` for a few values,
+`np.searchsorted` for batches) over one row of a table.
+
+Export the index of an existing model directory with:
+
+    python -m src.reference --export models
+"""
+import argparse
+import bisect
+import json
+import math
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.drift import NUMERIC_FEATURES
+from src.features import GRADE_MAP, feature_columns
+from src.scoring import DECISION_THRESHOLD
+
+REFERENCE_SUBDIR = 'reference'
+INDEX_FILE = 'index.json'
+ARRAYS = ['quantiles', 'segment_quantiles', 'segments', 'background']
+
+# Quantile levels 0%, 0.5%, ..., 100%
+LEVELS = np.linspace(0.0, 1.0, 201)
+# Up to this many values are ranked with `bisect` in Python: for a single
+# application that is several times faster than a dozen small NumPy calls
+SCALAR_MAX_VALUES = 4
+GRADES = sorted(GRADE_MAP)
+SEGMENT_STATS = ['rows', 'default_rate', 'mean_probability', 'approval_rate']
+# Segments with fewer training rows get no quantiles (NaN) and no segment percentiles
+MIN_SEGMENT_ROWS = 30
+BACKGROUND_ROWS = 100
+
+
+def percentile_rank(table, values):
+    """
+    Percentile rank (0-100) of each value within a sorted quantile table.
+
+    A value between two table entries is interpolated between their levels;
+    a value equal to one or more entries (common for integer features) gets
+    the middle of their levels. NaN values and NaN tables give NaN.
+
+    Args:
+        table: Quantiles at `LEVELS`, ascending
+        values: Array of values to rank
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if np.isnan(table[0]):
+        return np.full(values.shape, np.nan)
+    if len(values) <= SCALAR_MAX_VALUES:
+        return np.array([_rank(table, v) for v in values.tolist()])
+    lo = np.searchsorted(table, values, side='left')
+    hi = np.searchsorted(table, values, side='right')
+    last = len(table) - 1
+
+    # Strictly between table[lo - 1] and table[lo]
+    below = np.clip(lo - 1, 0, last)
+    above = np.clip(lo, 0, last)
+    span = table[above] - table[below]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.where(span > 0, (values - table[below]) / span, 0.0)
+    rank = LEVELS[below] + fraction * (LEVELS[above] - LEVELS[below])
+
+    tied = lo < hi
+    rank = np.where(tied, (LEVELS[np.minimum(lo, last)] + LEVELS[np.maximum(hi - 1, 0)]) / 2, rank)
+    rank = np.where(hi == 0, 0.0, np.where(lo > last, 1.0, rank))
+    return np.where(np.isnan(values), np.nan, rank * 100)
+
+
+def _rank(table, value):
+    # `percentile_rank` for one value
+    if value != value:
+        return math.nan
+    lo = bisect.bisect_left(table, value)
+    hi = bisect.bisect_right(table, value, lo)
+    last = len(table) - 1
+    if hi == 0:
+        return 0.0
+    if lo > last:
+        return 100.0
+    if lo < hi:
+        return (LEVELS[lo] + LEVELS[hi - 1]) * 50
+    below, above = table[lo - 1], table[lo]
+    return (LEVELS[lo - 1] + (value - below) / (above - below) * (LEVELS[lo] - LEVELS[lo - 1])) * 100
+
+
+def build_reference(x, y, probabilities, background):
+    """
+    Reference tables from training rows.
+
+    Args:
+        x: DataFrame with the raw `LoanApplication` columns
+        y: Default labels for those rows
+        probabilities: The model's probabilities for those rows
+        background: Rows already encoded for the model (its input matrix),
+            used as the SHAP background sample
+
+    Returns:
+        Dictionary with "index" (JSON-safe) and one entry per array in `ARRAYS`
+    """
+    columns = feature_columns(x)
+    values = np.column_stack([columns[c].astype(np.float64) for c in NUMERIC_FEATURES])
+    y = np.asarray(y, dtype=np.float64)
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+
+    intents = sorted(x['loan_intent'].unique().tolist())
+    grade = np.searchsorted(GRADES, columns['loan_grade_letter'])
+    intent = np.searchsorted(intents, columns['loan_intent'])
+    segment = grade * len(intents) + intent
+
+    n_segments = len(GRADES) * len(intents)
+    segment_quantiles = np.full((n_segments, len(NUMERIC_FEATURES), len(LEVELS)), np.nan)
+    segments = np.zeros((n_segments, len(SEGMENT_STATS)))
+    for s in range(n_segments):
+        rows = segment == s
+        count = int(rows.sum())
+        if count:
+            segments[s] = [count, y[rows].mean(), probabilities[rows].mean(),
+                           (probabilities[rows] <= DECISION_THRESHOLD).mean()]
+        if count >= MIN_SEGMENT_ROWS:
+            segment_quantiles[s] = np.nanquantile(values[rows], LEVELS, axis=0).T
+
+    return {
+        'index': {
+            'rows': int(len(x)),
+            'created': time.time(),
+            'features': NUMERIC_FEATURES,
+            'levels': len(LEVELS),
+            'grades': GRADES,
+            'intents': intents,
+            'segment_stats': SEGMENT_STATS,
+            'min_segment_rows': MIN_SEGMENT_ROWS,
+        },
+        'quantiles': np.nanquantile(values, LEVELS, axis=0).T,
+        'segment_quantiles': segment_quantiles,
+        'segments': segments,
+        'background': np.asarray(background, dtype=np.float32),
+    }
+
+
+def save_reference(reference, directory):
+    """
+    Write the reference index under `directory`/reference.
+
+    Every file is written to a temporary name and renamed into place, so a
+    process that has the previous arrays memory-mapped keeps reading the old
+    (unlinked) files instead of a truncated one.
+    """
+    out = Path(directory) / REFERENCE_SUBDIR
+    out.mkdir(parents=True, exist_ok=True)
+    for name in ARRAYS:
+        tmp = out / f'{name}.tmp.npy'
+        np.save(tmp, np.ascontiguousarray(reference[name]))
+        os.replace(tmp, out / f'{name}.npy')
+    tmp = out / f'{INDEX_FILE}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(reference['index'], f, indent=1)
+    os.replace(tmp, out / INDEX_FILE)
+
+
+def load_reference(directory):
+    """`ReferenceIndex` stored with a model directory, or None."""
+    path = Path(directory) / REFERENCE_SUBDIR
+    if not (path / INDEX_FILE).is_file():
+        return None
+    return ReferenceIndex.load(path)
+
+
+class ReferenceIndex:
+    """
+    Percentile and segment lookups over the memory-mapped reference tables.
+
+    Use `ReferenceIndex.load` (or `load_reference` with a model directory).
+    """
+
+    def __init__(self, index, quantiles, segment_quantiles, segments, background):
+        self.index = index
+        self.features = list(index['features'])
+        self.intents = list(index['intents'])
+        self.quantiles = quantiles
+        self.segment_quantiles = segment_quantiles
+        self.segments = segments
+        self.background = background
+        self._feature_index = {name: i for i, name in enumerate(self.features)}
+        self._grade_index = {g: i for i, g in enumerate(index['grades'])}
+        self._intent_index = {name: i for i, name in enumerate(self.intents)}
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Open the tables in a reference directory (memory-mapped unless `mmap` is False)."""
+        path = Path(path)
+        with open(path / INDEX_FILE, encoding='utf-8') as f:
+            index = json.load(f)
+        mode = 'r' if mmap else None
+        # Plain ndarray views of the maps: np.memmap adds overhead to every slice
+        return cls(index, *(np.load(path / f'{name}.npy', mmap_mode=mode).view(np.ndarray) for name in ARRAYS))
+
+    def segment_ids(self, grades, intents):
+        """Segment of each (grade letter, intent) pair; -1 when either is unknown."""
+        ids = np.empty(len(grades), dtype=np.int64)
+        for i, (grade, intent) in enumerate(zip(grades, intents)):
+            g = self._grade_index.get(str(grade).upper())
+            k = self._intent_index.get(intent)
+            ids[i] = -1 if g is None or k is None else g * len(self.intents) + k
+        return ids
+
+    def percentiles(self, feature, values, segments=None):
+        """
+        Percentile ranks of `values` among the training rows.
+
+        Args:
+            feature: One of `features`
+            values: Array of values
+            segments: Optional segment id per value (see `segment_ids`); ranks
+                are then within each value's segment, NaN for unknown or
+                small segments
+
+        Raises:
+            KeyError: For a feature without a quantile table
+        """
+        f = self._feature_index[feature]
+        values = np.asarray(values, dtype=np.float64)
+        if segments is None:
+            return percentile_rank(self.quantiles[f], values)
+        ranks = np.full(values.shape, np.nan)
+        # One binary search per distinct segment, over that segment's table
+        for s in np.unique(segments):
+            if s >= 0:
+                rows = segments == s
+                ranks[rows] = percentile_rank(self.segment_quantiles[s, f], values[rows])
+        return ranks
+
+    def segment_summary(self, segment):
+        """Statistics of one segment id, or None for -1."""
+        if segment < 0:
+            return None
+        grade, intent = divmod(int(segment), len(self.intents))
+        stats = dict(zip(self.index['segment_stats'], self.segments[segment].tolist()))
+        stats['rows'] = int(stats['rows'])
+        return {'loan_grade': self.index['grades'][grade], 'loan_intent': self.intents[intent], **stats}
+
+    def segment_table(self):
+        """Summaries of all segments with training rows."""
+        return [self.segment_summary(s) for s in range(len(self.segments)) if self.segments[s, 0] > 0]
+
+    def context(self, features, n):
+        """
+        Dataset context for `n` prepared rows (see main.prepare_features).
+
+        Returns:
+            One dict per row: its segment summary and, per feature, the
+            percentile rank overall and within the segment
+        """
+        segments = self.segment_ids(features['loan_grade_letter'], features['loan_intent'])
+        overall = {name: _rounded(self.percentiles(name, features[name])) for name in self.features}
+        within = {name: _rounded(self.percentiles(name, features[name], segments)) for name in self.features}
+        summaries = {s: self.segment_summary(s) for s in set(segments.tolist())}
+        return [{
+            'segment': summaries[segments[i]],
+            'percentiles': {
+                name: {'overall': overall[name][i], 'segment': within[name][i]}
+                for name in self.features
+            },
+        } for i in range(n)]
+
+    def info(self):
+        return {
+            'rows': self.index['rows'],
+            'features': self.features,
+            'segments': int((self.segments[:, 0] > 0).sum()),
+            'background_rows': int(self.background.shape[0]),
+            'bytes': int(sum(getattr(self, name).nbytes for name in ARRAYS)),
+        }
+
+
+def _rounded(ranks):
+    # JSON-ready list: one decimal, None for NaN
+    return [None if r != r else r for r in np.round(ranks, 1).tolist()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the reference index of a model directory')
+    parser.add_argument('--export', type=Path, required=True, help='Model directory, e.g. models')
+    parser.add_argument('--data', type=Path, default=None, help='Training CSV (default: data/credit_risk_dataset.csv)')
+    args = parser.parse_args()
+
+    import joblib
+
+    from src.train import DATA_PATH, clean, load_dataset, sidecars, split
+
+    pipeline = joblib.load(args.export / 'credit_risk_pipeline.pkl')
+    x_train, _, y_train, _ = split(clean(load_dataset(args.data or DATA_PATH)))
+    reference = sidecars(pipeline, x_train, y_train)[1]
+    save_reference(reference, args.export)
+    print(f"Reference index of {len(x_train)} training rows written to {args.export / REFERENCE_SUBDIR}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Rule-based risk factors, evaluated from a declarative table.
+
+The table (`risk_rules.json` by default) defines:
+- scores: 0-100 strength scores computed from feature columns
+    flag:    `if_true` where the column equals `equals` (case-insensitive), else `if_false`
+    penalty: 100 - (column - offset) * slope
+    ratio:   (column / divisor) * 100
+  each optionally clipped to `min`/`max`
+- note_fields: extra values for note templates (column * multiply, or its inverse)
+- rules: a factor fires when its score is in [`at_least`, `below`); factors
+  are ranked by importance (ties keep table order) and the top `top_n` kept
+
+Every rule is evaluated over the whole batch with NumPy masks, so thresholds
+can be changed by editing the table, without touching code.
+"""
+import json
+import string
+from pathlib import Path
+
+import numpy as np
+
+# Rule table shipped with the code
+DEFAULT_RULES_PATH = Path(__file__).resolve().parent / 'risk_rules.json'
+
+
+class RuleEngine:
+    """Vectorized evaluator for a risk-factor rule table."""
+
+    def __init__(self, table):
+        self.table = table
+        self.scores = table['scores']
+        self.note_fields = table.get('note_fields', {})
+        self.rules = table['rules']
+        self.top_n = table.get('top_n', 5)
+        # Template fields each rule's note needs, so only those columns are converted
+        self.note_args = [
+            [field for _, field, _, _ in string.Formatter().parse(r['note']) if field]
+            for r in self.rules
+        ]
+
+        # Ranking key: importance first, then earlier rules win ties
+        n_rules = len(self.rules)
+        self.rank = np.array([r['importance'] * n_rules + (n_rules - 1 - i)
+                              for i, r in enumerate(self.rules)], dtype=np.int64)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def compute_scores(self, features):
+        """
+        Compute every score for a batch.
+
+        Args:
+            features: Mapping (or DataFrame) of raw and derived columns
+
+        Returns:
+            Dictionary of score name -> float64 array
+        """
+        scores = {}
+        for name, spec in self.scores.items():
+            kind = spec['kind']
+            if kind == 'flag':
+                column = np.char.upper(np.asarray(features[spec['column']]).astype(str))
+                values = np.where(column == spec['equals'], float(spec['if_true']), float(spec['if_false']))
+            else:
+                x = np.asarray(features[spec['column']], dtype=np.float64)
+                if kind == 'penalty':
+                    values = 100 - ((x - spec['offset']) * spec['slope'])
+                elif kind == 'ratio':
+                    values = (x / spec['divisor']) * 100
+                else:
+                    raise ValueError(f"Unknown score kind '{kind}' for {name}")
+            if 'max' in spec:
+                values = np.minimum(spec['max'], values)
+            if 'min' in spec:
+                values = np.maximum(spec['min'], values)
+            scores[name] = values
+        return scores
+
+    def _note_values(self, features):
+        values = {}
+        for name, spec in self.note_fields.items():
+            x = np.asarray(features[spec['column']], dtype=np.float64)
+            if spec.get('invert'):
+                x = 1 / x
+            values[name] = x * spec.get('multiply', 1)
+        return values
+
+    def evaluate(self, features, n):
+        """
+        Build the top risk factors for every row of a batch.
+
+        Args:
+            features: Mapping (or DataFrame) of raw and derived columns
+            n: Number of rows
+
+        Returns:
+            List (one per row) of factor dicts (feature, impact, note, percentage)
+        """
+        scores = self.compute_scores(features)
+
+        # keys[row, rule] = rank of the rule if it fires for the row, else -1
+        keys = np.full((n, len(self.rules)), -1, dtype=np.int64)
+        for j, rule in enumerate(self.rules):
+            score = scores[rule['score']]
+            mask = np.ones(n, dtype=bool)
+            if 'at_least' in rule:
+                mask &= score >= rule['at_least']
+            if 'below' in rule:
+                mask &= score < rule['below']
+            keys[mask, j] = self.rank[j]
+
+        top = min(self.top_n, len(self.rules))
+        if top < len(self.rules):
+            candidates = np.argpartition(-keys, top - 1, axis=1)[:, :top]
+        else:
+            candidates = np.tile(np.arange(len(self.rules)), (n, 1))
+        candidate_keys = np.take_along_axis(keys, candidates, axis=1)
+        order = np.argsort(-candidate_keys, axis=1, kind='stable')
+        selected = np.take_along_axis(candidates, order, axis=1)
+        fired = np.take_along_axis(candidate_keys, order, axis=1) >= 0
+
+        # Only the selected factors are materialized as dicts
+        percentages = {name: np.trunc(values) for name, values in scores.items()}
+        note_values = self._note_values(features)
+        template_columns = {}
+        for field in set().union(*self.note_args):
+            values = note_values[field] if field in note_values else features[field]
+            template_columns[field] = np.asarray(values).tolist()
+
+        results = []
+        for i in range(n):
+            factors = []
+            for j, hit in zip(selected[i].tolist(), fired[i].tolist()):
+                if not hit:
+                    break
+                rule = self.rules[j]
+                note = rule['note']
+                if self.note_args[j]:
+                    note = note.format(**{f: template_columns[f][i] for f in self.note_args[j]})
+                factors.append({
+                    "feature": rule['feature'],
+                    "impact": rule['impact'],
+                    "note": note,
+                    "percentage": int(percentages[rule['score']][i])
+                })
+            results.append(factors)
+        return results
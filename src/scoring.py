@@ -0,0 +1,17 @@
+"""
+Decision policy shared by the API and the offline scoring tools.
+"""
+import numpy as np
+
+# Applications with a default probability above this are rejected
+DECISION_THRESHOLD = 0.4
+
+
+def decisions(probabilities):
+    """'Rejected' / 'Approved' for each probability of default."""
+    return np.where(np.asarray(probabilities) > DECISION_THRESHOLD, "Rejected", "Approved")
+
+
+def credit_scores(probabilities):
+    """300-900 credit score (inverse of the probability of default), truncated like int()."""
+    return (900 - (np.asarray(probabilities, dtype=np.float64) * 600)).astype(np.int64)
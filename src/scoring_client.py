@@ -0,0 +1,269 @@
+"""
+Clients for the scoring API, used by the agent tool.
+
+- `ScoringClient`: a `requests.Session` with a connection pool, (connect, read)
+  timeouts and urllib3 retries with exponential backoff on connection errors
+  and 502/503/504.
+- `AsyncScoringClient`: the same over `httpx.AsyncClient`, for concurrent
+  tool calls.
+- `InProcessScoringClient`: imports the scoring core from `src/main.py` and
+  calls it directly, with no HTTP or JSON in between. Results and error
+  bodies match what the API returns, and decisions go to the same audit log.
+
+All can score many applications in one `/predict/batch` request. Scoring is a
+pure function of the payload, so retrying a POST is safe.
+
+`SCORING_BACKEND=inprocess` selects the in-process client in `make_client()`;
+if the model cannot be loaded locally it falls back to HTTP.
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+API_BASE_URL = os.getenv("API_BASE_URL", "http://127.0.0.1:8000")
+CONNECT_TIMEOUT_S = float(os.getenv("API_CONNECT_TIMEOUT_S", "3"))
+READ_TIMEOUT_S = float(os.getenv("API_READ_TIMEOUT_S", "30"))
+RETRIES = int(os.getenv("API_RETRIES", "3"))
+BACKOFF_S = float(os.getenv("API_BACKOFF_S", "0.2"))
+RETRY_STATUSES = (502, 503, 504)
+# "http" (default) or "inprocess"
+SCORING_BACKEND = os.getenv("SCORING_BACKEND", "http")
+
+logger = logging.getLogger("credit_risk.client")
+
+
+def normalize_application(args):
+    """API payload from tool arguments (upper-cased categoricals, no spaces in the intent)."""
+    return {
+        "person_age": args["person_age"],
+        "person_income": args["person_income"],
+        "person_home_ownership": args["person_home_ownership"].upper(),
+        "person_emp_length": args["person_emp_length"],
+        "loan_intent": args["loan_intent"].upper().replace(" ", ""),
+        "loan_grade": args["loan_grade"].upper(),
+        "loan_amnt": args["loan_amnt"],
+        "loan_int_rate": args["loan_int_rate"],
+        "cb_person_default_on_file": args["cb_person_default_on_file"].upper(),
+        "cb_person_cred_hist_length": args["cb_person_cred_hist_length"],
+    }
+
+
+class ScoringClient:
+    """
+    Pooled, retrying client for `/predict` and `/predict/batch`.
+
+    Args:
+        base_url: API root, e.g. http://127.0.0.1:8000
+        connect_timeout / read_timeout: Seconds, per attempt
+        retries: Extra attempts after a connection error or retryable status
+        backoff: Base of the exponential backoff between attempts (seconds)
+        pool_size: Connections kept open to the API
+    """
+
+    def __init__(self, base_url=API_BASE_URL, connect_timeout=CONNECT_TIMEOUT_S,
+                 read_timeout=READ_TIMEOUT_S, retries=RETRIES, backoff=BACKOFF_S, pool_size=10):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                      backoff_factor=backoff, status_forcelist=RETRY_STATUSES,
+                      allowed_methods=None, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _post(self, path, payload):
+        return self.session.post(f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+
+    def score(self, payload):
+        """Score one application; returns the `requests.Response`."""
+        return self._post('/predict', payload)
+
+    def score_many(self, payloads):
+        """Score several applications in one `/predict/batch` request."""
+        return self._post('/predict/batch', list(payloads))
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AsyncScoringClient:
+    """
+    Async counterpart of `ScoringClient` on `httpx.AsyncClient`.
+
+    httpx only retries failed connects, so retries on 502/503/504 and
+    transport errors (with the same exponential backoff) are done here.
+    """
+
+    def __init__(self, base_url=API_BASE_URL, connect_timeout=CONNECT_TIMEOUT_S,
+                 read_timeout=READ_TIMEOUT_S, retries=RETRIES, backoff=BACKOFF_S, pool_size=10):
+        import httpx
+
+        self._httpx = httpx
+        self.retries = retries
+        self.backoff = backoff
+        self.client = httpx.AsyncClient(
+            base_url=base_url.rstrip('/'),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    async def _post(self, path, payload):
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                response = await self.client.post(path, json=payload)
+            except self._httpx.TransportError:
+                if last:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or last:
+                    return response
+            await asyncio.sleep(self.backoff * (2 ** attempt))
+
+    async def score(self, payload):
+        return await self._post('/predict', payload)
+
+    async def score_many(self, payloads):
+        return await self._post('/predict/batch', list(payloads))
+
+    async def score_concurrently(self, payloads):
+        """One `/predict` call per application, all in flight at once."""
+        return await asyncio.gather(*(self.score(p) for p in payloads))
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+
+class LocalResponse:
+    """The parts of a `requests.Response` the agent reads, for in-process results."""
+
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self._content = content
+
+    def json(self):
+        return self._content
+
+    @property
+    def text(self):
+        # Same compact encoding as FastAPI's JSONResponse
+        return json.dumps(self._content, ensure_ascii=False, separators=(',', ':'))
+
+
+class InProcessScoringClient:
+    """
+    Scores with the API's own code in this process (model, features, rules, cache).
+
+    Importing `src.main` loads the model, so construction takes as long as an
+    API start-up.
+    """
+
+    def __init__(self):
+        from fastapi.encoders import jsonable_encoder
+        from pydantic import ValidationError
+
+        import src.main as core
+
+        self.core = core
+        self._encode = jsonable_encoder
+        self._validation_error = ValidationError
+
+    def _validate(self, payloads, batch):
+        applications, errors = [], []
+        for i, payload in enumerate(payloads):
+            try:
+                applications.append(self.core.LoanApplication.model_validate(payload))
+            except self._validation_error as e:
+                prefix = ('body', i) if batch else ('body',)
+                errors += [{**err, 'loc': (*prefix, *err['loc'])} for err in e.errors(include_url=False)]
+        if errors:
+            return None, LocalResponse(422, {"detail": self._encode(errors)})
+        return applications, None
+
+    def _score(self, payloads, batch):
+        applications, error = self._validate(payloads, batch)
+        if error is not None:
+            return error
+        try:
+            results = self.core.score_with_cache(applications)
+            # Audited like the API's own requests, under the endpoint it stands in for
+            self.core.audit_results("/predict/batch" if batch else "/predict", uuid.uuid4().hex,
+                                    applications, results)
+        except self.core.AuditUnavailable as e:
+            return LocalResponse(503, {"detail": str(e)})
+        except Exception as e:
+            return LocalResponse(500, {"detail": str(e)})
+        # The results can be the response cache's own dicts: hand out a copy,
+        # as decoding an HTTP response would
+        results = json.loads(json.dumps(results))
+        return LocalResponse(200, results if batch else results[0])
+
+    def score(self, payload):
+        return self._score([payload], batch=False)
+
+    def score_many(self, payloads):
+        return self._score(list(payloads), batch=True)
+
+    def close(self):
+        pass
+
+
+class AsyncInProcessScoringClient:
+    """Async wrapper running `InProcessScoringClient` calls on worker threads."""
+
+    def __init__(self, client):
+        self.sync = client
+
+    async def score(self, payload):
+        return await asyncio.to_thread(self.sync.score, payload)
+
+    async def score_many(self, payloads):
+        return await asyncio.to_thread(self.sync.score_many, payloads)
+
+    async def score_concurrently(self, payloads):
+        # Coalesced into one batch: in-process there is no connection to parallelize
+        response = await self.score_many(payloads)
+        if response.status_code != 200:
+            return await asyncio.gather(*(self.score(p) for p in payloads))
+        return [LocalResponse(200, r) for r in response.json()]
+
+    async def aclose(self):
+        pass
+
+
+def make_client(backend=SCORING_BACKEND, base_url=API_BASE_URL):
+    """Client for the configured backend; "inprocess" falls back to HTTP if the model can't load."""
+    if backend == "inprocess":
+        try:
+            return InProcessScoringClient()
+        except Exception:
+            logger.warning("In-process scoring unavailable, falling back to HTTP at %s", base_url, exc_info=True)
+    elif backend != "http":
+        raise ValueError(f"Unknown SCORING_BACKEND '{backend}' (expected 'http' or 'inprocess')")
+    return ScoringClient(base_url)
+
+
+def make_async_client(client, base_url=API_BASE_URL):
+    """Async counterpart of a client returned by `make_client()`."""
+    if isinstance(client, InProcessScoringClient):
+        return AsyncInProcessScoringClient(client)
+    return AsyncScoringClient(base_url)
@@ -0,0 +1,290 @@
+"""
+Shadow scoring and A/B routing of live traffic to candidate models.
+
+- `ShadowScorer`: after a request has been scored, its prepared features are
+  queued for a shadow model, which scores them on a background thread (in
+  batches). Decisions and probability differences against the served result
+  go to an append-only JSON-lines log and running statistics. The queue is
+  bounded: when the shadow model falls behind, new work is dropped and
+  counted instead of slowing requests down.
+- `ChallengerRouter`: sends a percentage of applications to a challenger
+  model. The split hashes the application itself, so a resubmitted
+  application always gets the same model (and the same cached response).
+
+Summarize a shadow log offline with:
+
+    python -m src.shadow logs/shadow.jsonl
+"""
+import argparse
+import hashlib
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+
+from src.background import BackgroundThread
+from src.scoring import DECISION_THRESHOLD
+
+logger = logging.getLogger("credit_risk.shadow")
+
+
+class ShadowScorer:
+    """
+    Off-request-path scoring of live traffic with a shadow model.
+
+    Args:
+        log_path: Append-only JSON-lines log, one record per scored application
+        max_queue: Queued requests before new ones are shed
+        max_batch: Requests scored together by the background thread
+        max_wait_ms: How long the background thread collects requests into a
+            batch; larger batches cost less CPU per row, so less is taken
+            from the requests being served
+        window: Recent absolute differences kept for the percentiles in `stats`
+    """
+
+    def __init__(self, log_path, max_queue=1000, max_batch=64, max_wait_ms=50.0, window=10000):
+        self.log_path = Path(log_path)
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.model = None
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = BackgroundThread(self._run, 'shadow')
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)
+
+        # Metrics
+        self.submitted = 0
+        self.shed = 0
+        self.scored = 0
+        self.agreed = 0
+        self.batches = 0
+        self.sum_diff = 0.0
+        self.sum_abs_diff = 0.0
+        self.max_abs_diff = 0.0
+        self.shadow_seconds = 0.0
+
+    def set_model(self, served):
+        """Start shadowing with `served` (a `ServedModel`), or stop with None."""
+        self.model = served
+        with self._lock:
+            self._recent.clear()
+            self.scored = self.agreed = 0
+            self.sum_diff = self.sum_abs_diff = self.max_abs_diff = 0.0
+
+    def submit(self, features, probabilities, version):
+        """
+        Queue one scored request for the shadow model; never blocks.
+
+        Args:
+            features: Prepared feature columns of the request (not modified afterwards)
+            probabilities: Probabilities returned to the client
+            version: Version of the model that produced them
+        """
+        if self.model is None:
+            return
+        self._thread.ensure_started()
+        with self._lock:
+            self.submitted += 1
+        try:
+            self._queue.put_nowait((features, probabilities, version, time.time()))
+        except queue.Full:
+            with self._lock:
+                self.shed += 1
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(items) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    items.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._score(items)
+            except Exception:
+                logger.exception("Shadow scoring failed")
+
+    def _score(self, items):
+        shadow = self.model
+        if shadow is None:
+            return
+        start = time.perf_counter()
+        features = {k: np.concatenate([f[k] for f, _, _, _ in items]) for k in items[0][0]}
+        n = sum(len(p) for _, p, _, _ in items)
+        shadow_p = shadow.fast_scorer.predict_proba(features, n).astype(np.float64)
+        served_p = np.concatenate([p for _, p, _, _ in items]).astype(np.float64)
+        self.shadow_seconds += time.perf_counter() - start
+
+        diff = shadow_p - served_p
+        agree = (shadow_p > DECISION_THRESHOLD) == (served_p > DECISION_THRESHOLD)
+        records = []
+        row = 0
+        for _, p, version, ts in items:
+            for i in range(row, row + len(p)):
+                records.append(json.dumps({
+                    "ts": round(ts, 3),
+                    "model": version,
+                    "shadow": shadow.version,
+                    "probability": served_p[i],
+                    "shadow_probability": shadow_p[i],
+                    "diff": diff[i],
+                    "decision": _decision(served_p[i]),
+                    "shadow_decision": _decision(shadow_p[i]),
+                    "agree": bool(agree[i]),
+                }))
+            row += len(p)
+
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(records) + '\n')
+
+        with self._lock:
+            self.batches += 1
+            self.scored += n
+            self.agreed += int(agree.sum())
+            self.sum_diff += float(diff.sum())
+            self.sum_abs_diff += float(np.abs(diff).sum())
+            self.max_abs_diff = max(self.max_abs_diff, float(np.abs(diff).max()))
+            self._recent.extend(np.abs(diff).tolist())
+
+    def stats(self):
+        """Agreement rate and probability drift since the shadow model was set."""
+        with self._lock:
+            recent = np.array(self._recent)
+            scored = self.scored
+            result = {
+                "model": self.model.version if self.model is not None else None,
+                "log_path": str(self.log_path),
+                "submitted": self.submitted,
+                "shed": self.shed,
+                "queue_depth": self._queue.qsize(),
+                "batches": self.batches,
+                "scored": scored,
+                "agreement_rate": self.agreed / scored if scored else None,
+                "mean_diff": self.sum_diff / scored if scored else None,
+                "mean_abs_diff": self.sum_abs_diff / scored if scored else None,
+                "max_abs_diff": self.max_abs_diff,
+                "shadow_ms_per_row": self.shadow_seconds * 1000 / scored if scored else None,
+            }
+        if len(recent):
+            p50, p95, p99 = np.percentile(recent, [50, 95, 99])
+            result.update({"abs_diff_p50": p50, "abs_diff_p95": p95, "abs_diff_p99": p99})
+        return result
+
+
+class ChallengerRouter:
+    """Route a fixed share of applications to a challenger model."""
+
+    def __init__(self):
+        self.challenger = None
+        self.percent = 0.0
+        self.counts = {}
+
+    def set_challenger(self, served, percent):
+        """Send `percent` (0-100) of applications to `served`; None stops the split."""
+        if not 0 <= percent <= 100:
+            raise ValueError("percent must be between 0 and 100")
+        self.challenger = served
+        self.percent = percent if served is not None else 0.0
+
+    @staticmethod
+    def bucket(application):
+        """Stable bucket in [0, 10000) from the application's content."""
+        digest = hashlib.blake2b(application.model_dump_json().encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'big') % 10000
+
+    def route(self, applications, primary):
+        """
+        Split a batch between the primary and the challenger.
+
+        Returns:
+            List of (model, indices) groups; indices is None when the group
+            is the whole batch
+        """
+        challenger, percent = self.challenger, self.percent
+        if challenger is None or percent <= 0:
+            groups = [(primary, None)]
+        else:
+            cutoff = percent * 100
+            to_challenger = [self.bucket(a) < cutoff for a in applications]
+            if all(to_challenger):
+                groups = [(challenger, None)]
+            elif not any(to_challenger):
+                groups = [(primary, None)]
+            else:
+                groups = [(primary, [i for i, c in enumerate(to_challenger) if not c]),
+                          (challenger, [i for i, c in enumerate(to_challenger) if c])]
+        for model, indices in groups:
+            self.counts[model.version] = self.counts.get(model.version, 0) + (
+                len(applications) if indices is None else len(indices))
+        return groups
+
+    def stats(self):
+        return {
+            "challenger": self.challenger.version if self.challenger is not None else None,
+            "percent": self.percent,
+            "routed": dict(self.counts),
+        }
+
+
+def _decision(probability):
+    return "Rejected" if probability > DECISION_THRESHOLD else "Approved"
+
+
+def summarize_log(path):
+    """
+    Agreement and probability drift per (served model, shadow model) pair,
+    over a whole shadow log.
+    """
+    pairs = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            pairs.setdefault((record['model'], record['shadow']), []).append(
+                (record['diff'], record['agree'], record['decision'], record['shadow_decision']))
+
+    summary = []
+    for (model, shadow), rows in pairs.items():
+        diff = np.array([r[0] for r in rows])
+        agree = np.array([r[1] for r in rows])
+        p50, p95, p99 = np.percentile(np.abs(diff), [50, 95, 99])
+        summary.append({
+            "model": model,
+            "shadow": shadow,
+            "rows": len(rows),
+            "agreement_rate": float(agree.mean()),
+            "approved_by_shadow_only": sum(r[2] == "Rejected" and r[3] == "Approved" for r in rows),
+            "rejected_by_shadow_only": sum(r[2] == "Approved" and r[3] == "Rejected" for r in rows),
+            "mean_diff": float(diff.mean()),
+            "mean_abs_diff": float(np.abs(diff).mean()),
+            "abs_diff_p50": float(p50),
+            "abs_diff_p95": float(p95),
+            "abs_diff_p99": float(p99),
+            "max_abs_diff": float(np.abs(diff).max()),
+        })
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarize a shadow scoring log')
+    parser.add_argument('log', type=Path)
+    args = parser.parse_args()
+    for s in summarize_log(args.log):
+        print(f"{s['model']} vs shadow {s['shadow']}: {s['rows']:,} rows, "
+              f"agreement {s['agreement_rate']:.2%} "
+              f"(+{s['approved_by_shadow_only']} approved / +{s['rejected_by_shadow_only']} rejected by shadow), "
+              f"mean diff {s['mean_diff']:+.4f}, |diff| p50 {s['abs_diff_p50']:.4f} "
+              f"p95 {s['abs_diff_p95']:.4f} max {s['max_abs_diff']:.4f}")
+
+
+if __name__ == '__main__':
+    main()
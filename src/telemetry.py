@@ -0,0 +1,259 @@
+"""
+Low-overhead request instrumentation.
+
+- `Metrics`: per-stage latency histograms and counters, rendered in the
+  Prometheus text format for `/metrics`. Observing a value is a bisect and
+  two increments under a lock, about a microsecond.
+- `TimingMiddleware`: plain ASGI middleware recording total request time and
+  a request counter per route and status.
+- `SamplingProfiler`: a background thread that samples the stacks of the
+  other threads at a fixed interval while switched on, and reports them as
+  folded stacks (the input format of flamegraph.pl / speedscope).
+"""
+import bisect
+import sys
+import threading
+import time
+from collections import Counter
+
+# Latency buckets in seconds, from 50 µs to 2.5 s
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus expects."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative, running = [], 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+        return cumulative, total, count
+
+
+class _StageTimer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    Registry of stage histograms and labelled counters.
+
+    Args:
+        prefix: Metric name prefix
+        enabled: When False, `stage()` and `observe()` are no-ops
+    """
+
+    def __init__(self, prefix='credit_risk', enabled=True):
+        self.prefix = prefix
+        self.enabled = enabled
+        self.stages = {}
+        self.counters = {}
+        self.collectors = []
+        self._lock = threading.Lock()
+
+    def _histogram(self, stage):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.stages.setdefault(stage, Histogram())
+        return histogram
+
+    def observe(self, stage, seconds):
+        if self.enabled:
+            self._histogram(stage).observe(seconds)
+
+    def stage(self, stage):
+        """Context manager timing one stage (`with metrics.stage('predict'): ...`)."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self._histogram(stage))
+
+    def inc(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def add_collector(self, fn):
+        """Register `fn() -> [(name, type, help, value), ...]`, read at scrape time."""
+        self.collectors.append(fn)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        name = f'{self.prefix}_stage_seconds'
+        lines += [f'# HELP {name} Time spent per request-handling stage.',
+                  f'# TYPE {name} histogram']
+        for stage, histogram in sorted(self.stages.items()):
+            cumulative, total, count = histogram.snapshot()
+            for bound, c in zip(histogram.buckets, cumulative):
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {c}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {cumulative[-1]}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+
+        with self._lock:
+            counters = sorted(self.counters.items())
+        seen = set()
+        for (counter, labels), value in counters:
+            full = f'{self.prefix}_{counter}_total'
+            if full not in seen:
+                lines.append(f'# TYPE {full} counter')
+                seen.add(full)
+            label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f'{full}{{{label_text}}} {value}' if label_text else f'{full} {value}')
+
+        for collector in self.collectors:
+            for metric, kind, help_text, value in collector():
+                full = f'{self.prefix}_{metric}'
+                lines += [f'# HELP {full} {help_text}', f'# TYPE {full} {kind}', f'{full} {value}']
+        return '\n'.join(lines) + '\n'
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware timing whole requests into `metrics`.
+
+    The start time is left in `scope["state"]["request_start"]` so handlers can
+    measure what happened before they ran (body read and validation).
+    """
+
+    def __init__(self, app, metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self.metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        scope.setdefault('state', {})['request_start'] = start
+        status = [500]
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get('route')
+            path = getattr(route, 'path', 'unmatched')
+            self.metrics.observe('request', time.perf_counter() - start)
+            self.metrics.inc('requests', path=path, status=status[0])
+
+
+# Innermost frames of threads that are parked, not working
+IDLE_FRAMES = {('threading.py', 'wait'), ('selectors.py', 'select'), ('queue.py', 'get')}
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that can be started and stopped at runtime.
+
+    While running, a daemon thread wakes every `interval_ms`, walks the stack
+    of every other (non-idle) thread and counts each stack. Cost is confined to that
+    thread's wakeups (about 1-2% of one core at 5 ms); nothing runs when the
+    profiler is off.
+    """
+
+    def __init__(self, max_depth=64):
+        self.max_depth = max_depth
+        self.samples = Counter()
+        self.interval = 0.005
+        self.started_at = None
+        self.duration = 0.0
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_ms=5.0):
+        """Clear previous samples and start sampling (no-op if already running)."""
+        if self.running:
+            return
+        self.samples = Counter()
+        self.interval = interval_ms / 1000.0
+        self.started_at = time.time()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self.running:
+            self._stop.set()
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        start = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                code = frame.f_code
+                if ident == own or (code.co_filename.rsplit('/', 1)[-1], code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({code.co_filename.rsplit("/", 1)[-1]}:{frame.f_lineno})')
+                    frame = frame.f_back
+                self.samples[';'.join(reversed(stack))] += 1
+        self.duration = time.perf_counter() - start
+
+    def folded(self, top=None):
+        """Samples as `frame;frame;frame count` lines, most frequent first."""
+        return '\n'.join(f'{stack} {count}' for stack, count in self.samples.most_common(top)) + '\n'
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000.0,
+            "started_at": self.started_at,
+            "samples": sum(self.samples.values()),
+            "distinct_stacks": len(self.samples),
+        }
@@ -0,0 +1,332 @@
+"""
+Reproducible training for the credit risk pipeline (replaces the notebook run).
+
+Runs the same steps as `preprocess.ipynb`: imputation, outlier filtering,
+interaction features, ColumnTransformer and XGBClassifier. It then writes a
+versioned artifact:
+
+    models/versions/<version>/
+        credit_risk_pipeline.pkl   full sklearn pipeline (raw columns in)
+        serving/                   slim artifact (booster.ubj + preprocess.json)
+        drift_baseline.json        training distributions for the API's drift monitor
+        reference/                 quantile tables, segment summaries and SHAP background (reference.py)
+        metrics.json               AUC, confusion matrix, report, timing profile
+
+The preprocessed train/test matrices and the raw training rows (for the
+sidecars) are cached under `.cache/train`, keyed on the dataset contents and
+the preprocessing settings and code, so a retrain that only changes model
+parameters never reads the CSV or runs the ColumnTransformer.
+
+Usage:
+    python -m src.train
+    python -m src.train --n-estimators 200 --promote
+    python -m src.train --params best_params.json   # output of src.tune
+"""
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import MinMaxScaler, OneHotEncoder
+from xgboost import XGBClassifier
+
+from src.drift import BASELINE_FILE, build_baseline, save_baseline
+from src.fast_inference import FastScorer
+from src.features import RAW_COLUMNS
+from src.logic import InteractionFeatures
+from src.reference import BACKGROUND_ROWS, build_reference, save_reference
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_PATH = BASE_DIR / 'data' / 'credit_risk_dataset.csv'
+MODELS_DIR = BASE_DIR / 'models'
+VERSIONS_DIR = MODELS_DIR / 'versions'
+CACHE_DIR = BASE_DIR / '.cache' / 'train'
+
+TARGET = 'loan_status'
+CATEGORICAL_FEATURES = ['person_home_ownership', 'loan_intent', 'cb_person_default_on_file']
+NUMERICAL_FEATURES = [
+    'person_age', 'person_income', 'person_emp_length', 'loan_amnt',
+    'loan_int_rate', 'loan_percent_income', 'cb_person_cred_hist_length',
+    'loan_grade', 'dti_ratio',
+    'income_to_loan_ratio', 'credit_hist_to_age_ratio',
+    'income_credit_product', 'employment_stability', 'loan_burden'
+]
+
+# Same model as the notebook; `hist` is XGBoost's fast histogram tree method
+MODEL_PARAMS = {
+    'n_estimators': 100,
+    'learning_rate': 0.1,
+    'max_depth': 5,
+    'scale_pos_weight': 3,
+    'random_state': 42,
+    'tree_method': 'hist',
+}
+TEST_SIZE = 0.2
+SPLIT_SEED = 42
+
+
+class Profile:
+    """Wall-clock time per named training stage."""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        yield
+        self.stages[name] = round(time.perf_counter() - start, 4)
+
+
+def load_dataset(path=DATA_PATH):
+    return pd.read_csv(path)
+
+
+def cleaning_stats(df):
+    """
+    The values `clean` derives from `df`: imputation fills and the income cap.
+
+    Returns:
+        Dict with the mean `person_emp_length`, the median `loan_int_rate`
+        per loan grade and the 99th-percentile income of the rows kept
+    """
+    stats = {
+        'emp_length_mean': float(df['person_emp_length'].mean()),
+        'int_rate_medians': df.groupby('loan_grade')['loan_int_rate'].median().dropna().to_dict(),
+    }
+    stats['income_cap'] = float(_valid_rows(_impute(df, stats))['person_income'].quantile(0.99))
+    return stats
+
+
+def _impute(df, stats):
+    df = df.copy()
+    df['person_emp_length'] = df['person_emp_length'].fillna(stats['emp_length_mean'])
+    df['loan_int_rate'] = df['loan_int_rate'].fillna(df['loan_grade'].map(stats['int_rate_medians']))
+    return df
+
+
+def _valid_rows(df):
+    df = df[df['person_age'] <= 100]
+    df = df[df['person_emp_length'] <= 60]
+    return df[df['person_emp_length'] < df['person_age']]
+
+
+def clean(df, stats=None, cap_income=True):
+    """
+    Imputation and outlier filtering, as in the notebook.
+
+    Args:
+        df: Raw rows with the `LoanApplication` columns
+        stats: `cleaning_stats` to apply (default: computed from `df`, as
+            for training); pass the training data's to clean new rows the
+            way the model's own training rows were
+        cap_income: Also drop rows above the income cap
+    """
+    stats = stats or cleaning_stats(df)
+    df = _valid_rows(_impute(df, stats))
+    if cap_income:
+        df = df[df['person_income'] <= stats['income_cap']]
+    return df
+
+
+def split(df):
+    """Raw applicant columns and target, split like the notebook."""
+    x = df[RAW_COLUMNS]
+    y = df[TARGET]
+    return train_test_split(x, y, test_size=TEST_SIZE, random_state=SPLIT_SEED, shuffle=True)
+
+
+def build_transform():
+    return ColumnTransformer(
+        transformers=[
+            ('trf1', OneHotEncoder(handle_unknown='ignore', drop='first'), CATEGORICAL_FEATURES),
+            ('trf2', MinMaxScaler(), NUMERICAL_FEATURES),
+        ],
+        remainder='drop'
+    )
+
+
+def cache_key(data_path):
+    """Hash of the dataset bytes and every setting and piece of code that affects preprocessing."""
+    digest = hashlib.sha256()
+    with open(data_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    settings = [TEST_SIZE, SPLIT_SEED, CATEGORICAL_FEATURES, NUMERICAL_FEATURES]
+    digest.update(json.dumps(settings).encode())
+    # The preprocessing code itself: an edit to the cleaning or split must not
+    # reuse matrices built by the old version
+    for step in (load_dataset, cleaning_stats, _impute, _valid_rows, clean, split, build_transform, preprocess):
+        digest.update(inspect.getsource(step).encode())
+    for module in ('features.py', 'logic.py'):
+        digest.update(Path(__file__).with_name(module).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def preprocess(data_path=DATA_PATH, use_cache=True, profile=None):
+    """
+    Cleaned, split and transformed data, from the on-disk cache when possible.
+
+    Returns:
+        (features, transform, X_train, X_test, y_train, y_test, x_train) where
+        the first two are the fitted pipeline stages and `x_train` the raw
+        training rows (for the drift baseline and reference sidecars)
+    """
+    profile = profile or Profile()
+    key = cache_key(data_path)
+    matrices = CACHE_DIR / f'{key}.npz'
+    stages = CACHE_DIR / f'{key}.joblib'
+
+    if use_cache and matrices.exists() and stages.exists():
+        with profile.stage('load_cache'):
+            arrays = np.load(matrices)
+            features, transform, x_train = joblib.load(stages)
+        return (features, transform, arrays['X_train'], arrays['X_test'],
+                arrays['y_train'], arrays['y_test'], x_train)
+
+    with profile.stage('load_data'):
+        df = load_dataset(data_path)
+    with profile.stage('clean'):
+        df = clean(df)
+    with profile.stage('split'):
+        x_train, x_test, y_train, y_test = split(df)
+    with profile.stage('transform'):
+        features = InteractionFeatures().fit(x_train)
+        transform = build_transform()
+        X_train = transform.fit_transform(features.transform(x_train))
+        X_test = transform.transform(features.transform(x_test))
+        y_train, y_test = y_train.to_numpy(), y_test.to_numpy()
+
+    if use_cache:
+        with profile.stage('save_cache'):
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            np.savez(matrices, X_train=X_train, X_test=X_test, y_train=y_train, y_test=y_test)
+            joblib.dump((features, transform, x_train), stages)
+    return features, transform, X_train, X_test, y_train, y_test, x_train
+
+
+def evaluate(model, X_test, y_test):
+    y_prob = model.predict_proba(X_test)[:, 1]
+    y_pred = (y_prob > 0.5).astype(int)
+    return {
+        'roc_auc': float(roc_auc_score(y_test, y_prob)),
+        'confusion_matrix': confusion_matrix(y_test, y_pred).tolist(),
+        'classification_report': classification_report(y_test, y_pred, output_dict=True),
+        'n_test': int(len(y_test)),
+    }
+
+
+def sidecars(pipe, x, y):
+    """
+    Drift baseline and reference index from raw training rows `x` with labels `y`.
+
+    Both are written next to the pipeline by `save_version`, so serving never
+    needs the training CSV.
+    """
+    probabilities = pipe.predict_proba(x)[:, 1]
+    background = pipe[:-1].transform(x.sample(min(BACKGROUND_ROWS, len(x)), random_state=SPLIT_SEED))
+    return build_baseline(x, probabilities), build_reference(x, y, probabilities, background)
+
+
+def save_version(pipe, metrics, version, promote=False, baseline=None, reference=None):
+    """
+    Write the versioned artifact and optionally make it the served model.
+
+    metrics.json is written last: the API treats its presence as the version
+    being complete (see model_store.py).
+    """
+    out = VERSIONS_DIR / version
+    out.mkdir(parents=True, exist_ok=False)
+    joblib.dump(pipe, out / 'credit_risk_pipeline.pkl')
+    FastScorer.from_pipeline(pipe).save(out / 'serving')
+    if baseline is not None:
+        save_baseline(baseline, out)
+    if reference is not None:
+        save_reference(reference, out)
+    with open(out / 'metrics.json', 'w', encoding='utf-8') as f:
+        json.dump(metrics, f, indent=2)
+
+    if promote:
+        shutil.copy2(out / 'credit_risk_pipeline.pkl', MODELS_DIR / 'credit_risk_pipeline.pkl')
+        shutil.copytree(out / 'serving', MODELS_DIR / 'serving', dirs_exist_ok=True)
+        if baseline is not None:
+            shutil.copy2(out / BASELINE_FILE, MODELS_DIR / BASELINE_FILE)
+        if reference is not None:
+            # Rewritten rather than copied: running workers may have it mapped
+            save_reference(reference, MODELS_DIR)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the credit risk pipeline')
+    parser.add_argument('--data', type=Path, default=DATA_PATH)
+    parser.add_argument('--version', default=None, help='Version name (default: UTC timestamp)')
+    parser.add_argument('--n-estimators', type=int, default=MODEL_PARAMS['n_estimators'])
+    parser.add_argument('--learning-rate', type=float, default=MODEL_PARAMS['learning_rate'])
+    parser.add_argument('--max-depth', type=int, default=MODEL_PARAMS['max_depth'])
+    parser.add_argument('--params', type=Path, default=None,
+                        help='JSON of model parameters (e.g. from src.tune); overrides the flags above')
+    parser.add_argument('--n-jobs', type=int, default=os.cpu_count() or 1, help='XGBoost threads')
+    parser.add_argument('--no-cache', action='store_true', help='Recompute the preprocessed matrices')
+    parser.add_argument('--promote', action='store_true',
+                        help='Also copy the artifact to models/credit_risk_pipeline.pkl and models/serving')
+    args = parser.parse_args()
+
+    profile = Profile()
+    total_start = time.perf_counter()
+
+    features, transform, X_train, X_test, y_train, y_test, x_train = preprocess(
+        args.data, use_cache=not args.no_cache, profile=profile)
+
+    params = {**MODEL_PARAMS, 'n_estimators': args.n_estimators,
+              'learning_rate': args.learning_rate, 'max_depth': args.max_depth,
+              'n_jobs': args.n_jobs}
+    if args.params:
+        with open(args.params, encoding='utf-8') as f:
+            tuned = json.load(f)
+        params.update(tuned.get('best', tuned))
+    model = XGBClassifier(**params)
+    with profile.stage('fit'):
+        model.fit(X_train, y_train)
+    with profile.stage('evaluate'):
+        metrics = evaluate(model, X_test, y_test)
+
+    version = args.version or datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+    metrics.update({
+        'version': version,
+        'params': params,
+        'n_train': int(len(y_train)),
+        'data': str(args.data),
+        'cache_key': cache_key(args.data),
+    })
+    pipe = make_pipeline(features, transform, model)
+    with profile.stage('sidecars'):
+        baseline, reference = sidecars(pipe, x_train, y_train)
+    # metrics.json is written last by save_version, so the profile it carries
+    # stops before the save itself (printed below)
+    metrics['profile_s'] = {**profile.stages, 'total': round(time.perf_counter() - total_start, 4)}
+    with profile.stage('save'):
+        out = save_version(pipe, metrics, version, promote=args.promote, baseline=baseline, reference=reference)
+
+    print(f"Version {version} written to {out}")
+    print(f"ROC-AUC: {metrics['roc_auc']:.4f}")
+    print(f"Confusion matrix: {metrics['confusion_matrix']}")
+    print("Profile (s): " + ", ".join(f"{k}={v}" for k, v in profile.stages.items())
+          + f", total={time.perf_counter() - total_start:.4f}")
+
+
+if __name__ == '__main__':
+    main()
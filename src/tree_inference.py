@@ -0,0 +1,184 @@
+"""
+Compiled tree ensemble: the XGBoost booster flattened into NumPy arrays.
+
+`CompiledTrees` reads the booster's JSON model once and lays every tree out
+as a perfect binary tree in heap order (the children of node i are 2i+1 and
+2i+2), padded to the depth of the deepest tree: split feature, threshold and
+default direction for the internal nodes, and the leaf values of the bottom
+level. A leaf above the bottom level is repeated under a dummy split, so
+every path is exactly `depth` steps long. Prediction walks all rows through
+all trees at once, one level per step, with no child-pointer lookups.
+
+The arithmetic follows XGBoost's CPU predictor: float32 features and
+thresholds, `x < threshold` goes left, missing values take the default
+direction, leaf values are added to the base margin tree by tree in float32,
+and the sigmoid is computed in float32. Probabilities therefore match
+`booster.inplace_predict` bit for bit (see benchmarks/check_parity.py),
+without a booster call per request.
+
+The walk is cheapest for small batches (single requests); for large batches
+XGBoost's multithreaded predictor is faster, see
+`COMPILED_TREES_MAX_ROWS` in main.py.
+"""
+import ctypes
+import ctypes.util
+import json
+
+import numpy as np
+
+# A perfect tree of depth d has 2**d leaves; deeper models stay on the booster
+MAX_DEPTH = 12
+
+
+class CompiledTrees:
+    """
+    Vectorized evaluator for a binary:logistic gradient-boosted tree model.
+
+    Args:
+        feature, threshold, default_left: (n_trees, 2**depth - 1) internal nodes, heap order
+        leaf_value: (n_trees, 2**depth) bottom-level leaf values
+        base_margin: Starting margin (logit of the model's base_score)
+    """
+
+    def __init__(self, feature, threshold, default_left, leaf_value, base_margin):
+        self.n_trees, n_internal = feature.shape
+        self.depth = int(np.log2(n_internal + 1))
+        self.n_internal = n_internal
+        self.feature = feature.ravel()
+        self.threshold = threshold.ravel()
+        self.default_left = default_left.ravel()
+        self.leaf_value = leaf_value.ravel()
+        trees = np.arange(self.n_trees, dtype=np.intp)[None, :]
+        self.node_offset = trees * n_internal
+        # Bottom-level positions run from n_internal to 2 * n_internal
+        self.leaf_offset = trees * (n_internal + 1) - n_internal
+        self.base_margin = np.float32(base_margin)
+
+    @classmethod
+    def from_booster(cls, booster, iteration_range=(0, 0)):
+        """Compile a trained `xgboost.Booster` (only trees within `iteration_range`)."""
+        model = json.loads(booster.save_raw(raw_format='json'))
+        learner = model['learner']
+        objective = learner['objective']['name']
+        if objective != 'binary:logistic':
+            raise ValueError(f"Compiled trees support binary:logistic only, not {objective}")
+
+        gbtree = learner['gradient_booster']['model']
+        trees = gbtree['trees']
+        if any(t['categories_nodes'] for t in trees):
+            raise ValueError("Compiled trees do not support categorical splits")
+        start, end = iteration_range
+        if end:
+            indptr = gbtree['iteration_indptr']
+            trees = trees[indptr[start]:indptr[end]]
+
+        depth = max(_tree_depth(t['left_children'], t['right_children']) for t in trees)
+        if depth > MAX_DEPTH:
+            raise ValueError(f"Trees of depth {depth} are too deep to compile (max {MAX_DEPTH})")
+        n_internal = 2 ** depth - 1
+        shape = (len(trees), n_internal)
+        feature = np.zeros(shape, dtype=np.int32)
+        # A dummy split sends every row left (x < inf, NaN by default)
+        threshold = np.full(shape, np.inf, dtype=np.float32)
+        default_left = np.ones(shape, dtype=bool)
+        leaf_value = np.zeros((len(trees), n_internal + 1), dtype=np.float32)
+
+        for i, tree in enumerate(trees):
+            left, right = tree['left_children'], tree['right_children']
+            # For leaves XGBoost stores the leaf value in split_conditions
+            cond = np.asarray(tree['split_conditions'], dtype=np.float32)
+            # (node in the XGBoost tree, position in the perfect tree), level by level
+            level = [(0, 0)]
+            for _ in range(depth):
+                below = []
+                for node, pos in level:
+                    if left[node] == -1:
+                        # Only the left subtree is reached under a dummy split
+                        below += [(node, 2 * pos + 1), (node, 2 * pos + 2)]
+                    else:
+                        feature[i, pos] = tree['split_indices'][node]
+                        threshold[i, pos] = cond[node]
+                        default_left[i, pos] = tree['default_left'][node]
+                        below += [(left[node], 2 * pos + 1), (right[node], 2 * pos + 2)]
+                level = below
+            for node, pos in level:
+                leaf_value[i, pos - n_internal] = cond[node]
+
+        # base_score is a probability, e.g. "[4.5787236E-1]" (XGBoost >= 3) or
+        # "4.5787236E-1"; XGBoost turns it into a margin as
+        # -log(1.0f / p - 1.0f), with float32 arithmetic and a correctly
+        # rounded log (NumPy's float32 log can be an ulp off, so use float64)
+        base_score = np.float32(learner['learner_model_param']['base_score'].strip('[]'))
+        base_margin = np.float32(-np.log(np.float64(np.float32(1.0) / base_score - np.float32(1.0))))
+        return cls(feature, threshold, default_left, leaf_value, base_margin)
+
+    def predict_margin(self, X):
+        """Raw margin (log-odds) for a float32 matrix of encoded rows."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n, n_features = X.shape
+        flat = X.ravel()
+        row_start = (np.arange(n, dtype=np.intp) * n_features)[:, None]
+        has_missing = np.isnan(flat).any()
+
+        pos = np.zeros((n, self.n_trees), dtype=np.intp)
+        for _ in range(self.depth):
+            node = pos + self.node_offset
+            x = flat[row_start + self.feature[node]]
+            go_right = ~(x < self.threshold[node])
+            if has_missing:
+                go_right &= ~(np.isnan(x) & self.default_left[node])
+            pos = 2 * pos + 1 + go_right
+
+        # Trees are added to the base margin one after another in float32, as
+        # XGBoost does; cumsum keeps that order (a plain sum would not)
+        leaves = np.empty((n, self.n_trees + 1), dtype=np.float32)
+        leaves[:, 0] = self.base_margin
+        leaves[:, 1:] = self.leaf_value[pos + self.leaf_offset]
+        return np.cumsum(leaves, axis=1, dtype=np.float32)[:, -1]
+
+    def predict_proba(self, X):
+        """Probability of the positive class, float32 of shape (n,)."""
+        margin = self.predict_margin(X)
+        # XGBoost: 1 / (expf(min(-x, 88.7)) + 1) in float32
+        e = _expf(np.minimum(-margin, np.float32(88.7)))
+        return np.float32(1.0) / (e + np.float32(1.0))
+
+
+def _tree_depth(left, right):
+    """Longest root-to-leaf path (in splits) of one tree."""
+    depth = [0] * len(left)
+    # Nodes are numbered so that children come after their parent
+    for node in range(len(left)):
+        if left[node] != -1:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+    return max(depth)
+
+
+def _load_libm_expf():
+    try:
+        expf = ctypes.CDLL(ctypes.util.find_library('m')).expf
+    except (OSError, TypeError, AttributeError):
+        return None
+    expf.restype = ctypes.c_float
+    expf.argtypes = [ctypes.c_float]
+    return expf
+
+
+_libm_expf = _load_libm_expf()
+
+
+def _expf(x):
+    """
+    float32 exp as XGBoost computes it (the C library's expf).
+
+    A float64 exp rounded to float32 is correct almost everywhere; libm's
+    expf may round the other way when the exact result lies close to halfway
+    between two float32 values, so those few elements are recomputed with it.
+    """
+    e64 = np.exp(x.astype(np.float64))
+    e = e64.astype(np.float32)
+    if _libm_expf is not None:
+        ulp = np.spacing(e).astype(np.float64)
+        for i in np.flatnonzero(np.abs(e64 - e) > 0.49 * ulp):
+            e[i] = _libm_expf(float(x[i]))
+    return e
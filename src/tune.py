@@ -0,0 +1,234 @@
+"""
+Hyperparameter search for the credit risk XGBoost model.
+
+Configurations from a grid are scored by stratified k-fold cross-validation
+on the training split (the test split from `src.train` is left untouched).
+Search uses successive halving: every configuration gets a small tree
+budget, the best third moves on with triple the budget, and so on. Each
+fit uses early stopping on its validation fold, so most stop well before the
+budget.
+
+(configuration, fold) fits run on a process pool. The fold matrices are
+built once (interaction features + ColumnTransformer fitted per fold),
+cached as .npy files under `.cache/train` and memory-mapped by the workers.
+
+Usage:
+    python -m src.tune
+    python -m src.tune --folds 3 --workers 4 --compare-serial
+    python -m src.tune --output best_params.json   # then: python -m src.train --params best_params.json
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+from xgboost import XGBClassifier
+
+from src.logic import InteractionFeatures
+from src.train import (CACHE_DIR, DATA_PATH, MODEL_PARAMS, build_transform, cache_key, clean,
+                       load_dataset, preprocess, split)
+
+PARAM_GRID = {
+    'max_depth': [3, 5, 7],
+    'learning_rate': [0.05, 0.1, 0.2],
+    'min_child_weight': [1, 5],
+    'subsample': [0.8, 1.0],
+}
+EARLY_STOPPING_ROUNDS = 20
+
+# Per-process fold matrices, set by _init_worker
+_folds = None
+
+
+def grid_configs(grid=PARAM_GRID):
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+
+def build_folds(data_path=DATA_PATH, k=5, use_cache=True):
+    """
+    Directory of per-fold .npy matrices for k-fold CV on the training split.
+
+    Each fold's feature stages are fitted on that fold's training rows only.
+    """
+    folds_dir = CACHE_DIR / f'folds-{cache_key(data_path)}-k{k}'
+    if use_cache and (folds_dir / 'done').exists():
+        return folds_dir
+
+    x_train, _, y_train, _ = split(clean(load_dataset(data_path)))
+    y = y_train.to_numpy()
+
+    tmp = folds_dir.with_name(folds_dir.name + '.tmp')
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    skf = StratifiedKFold(n_splits=k, shuffle=True, random_state=MODEL_PARAMS['random_state'])
+    for i, (train_idx, val_idx) in enumerate(skf.split(x_train, y)):
+        fold_train, fold_val = x_train.iloc[train_idx], x_train.iloc[val_idx]
+        features = InteractionFeatures().fit(fold_train)
+        transform = build_transform()
+        np.save(tmp / f'{i}_X_train.npy', transform.fit_transform(features.transform(fold_train)))
+        np.save(tmp / f'{i}_X_val.npy', transform.transform(features.transform(fold_val)))
+        np.save(tmp / f'{i}_y_train.npy', y[train_idx])
+        np.save(tmp / f'{i}_y_val.npy', y[val_idx])
+    (tmp / 'done').touch()
+
+    shutil.rmtree(folds_dir, ignore_errors=True)
+    os.replace(tmp, folds_dir)
+    return folds_dir
+
+
+def load_folds(folds_dir, k):
+    return [
+        {name: np.load(folds_dir / f'{i}_{name}.npy', mmap_mode='r')
+         for name in ('X_train', 'X_val', 'y_train', 'y_val')}
+        for i in range(k)
+    ]
+
+
+def _init_worker(folds_dir, k):
+    global _folds
+    _folds = load_folds(folds_dir, k)
+
+
+def fit_fold(config, fold, budget, nthread, early_stopping=True):
+    """
+    Fit one configuration on one fold.
+
+    Returns:
+        (validation AUC, trees used)
+    """
+    data = _folds[fold]
+    params = {**MODEL_PARAMS, **config, 'n_estimators': budget, 'n_jobs': nthread}
+    if early_stopping:
+        params.update(early_stopping_rounds=EARLY_STOPPING_ROUNDS, eval_metric='auc')
+    model = XGBClassifier(**params)
+    model.fit(data['X_train'], data['y_train'],
+              eval_set=[(data['X_val'], data['y_val'])] if early_stopping else None,
+              verbose=False)
+
+    if early_stopping:
+        return float(model.best_score), int(model.best_iteration) + 1
+    auc = roc_auc_score(data['y_val'], model.predict_proba(data['X_val'])[:, 1])
+    return float(auc), budget
+
+
+def successive_halving(pool, configs, k, nthread, min_budget, max_budget, eta=3):
+    """
+    Successive halving over `configs`, each rung scored by k-fold CV.
+
+    Returns:
+        List of rung summaries; the last rung's best entry is the winner
+    """
+    survivors = list(range(len(configs)))
+    budget = min_budget
+    rungs = []
+    while True:
+        jobs = {(c, f): pool.submit(fit_fold, configs[c], f, budget, nthread)
+                for c in survivors for f in range(k)}
+        results = []
+        for c in survivors:
+            scores = [jobs[(c, f)].result() for f in range(k)]
+            results.append({
+                'config': configs[c],
+                'index': c,
+                'cv_auc': float(np.mean([s for s, _ in scores])),
+                'cv_auc_std': float(np.std([s for s, _ in scores])),
+                'trees': int(round(np.mean([t for _, t in scores]))),
+            })
+        results.sort(key=lambda r: -r['cv_auc'])
+        rungs.append({'budget': budget, 'results': results})
+
+        if len(results) == 1 or budget >= max_budget:
+            return rungs
+        keep = max(1, math.ceil(len(results) / eta))
+        survivors = [r['index'] for r in results[:keep]]
+        budget = min(max_budget, budget * eta)
+
+
+def serial_grid(configs, k, max_budget, nthread):
+    """Every configuration, full budget, no early stopping, one fit at a time."""
+    results = []
+    for c, config in enumerate(configs):
+        scores = [fit_fold(config, f, max_budget, nthread, early_stopping=False)[0] for f in range(k)]
+        results.append({'config': config, 'index': c, 'cv_auc': float(np.mean(scores))})
+    results.sort(key=lambda r: -r['cv_auc'])
+    return results
+
+
+def holdout_auc(config, trees, data_path):
+    """AUC on the `src.train` test split for a configuration refit on the full training split."""
+    _, _, X_train, X_test, y_train, y_test, _ = preprocess(data_path)
+    model = XGBClassifier(**{**MODEL_PARAMS, **config, 'n_estimators': trees})
+    model.fit(X_train, y_train)
+    return float(roc_auc_score(y_test, model.predict_proba(X_test)[:, 1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cross-validated hyperparameter search')
+    parser.add_argument('--data', type=Path, default=DATA_PATH)
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--min-budget', type=int, default=50, help='Trees per fit in the first rung')
+    parser.add_argument('--max-budget', type=int, default=450, help='Trees per fit in the last rung')
+    parser.add_argument('--eta', type=int, default=3, help='Keep 1/eta of configs per rung')
+    parser.add_argument('--compare-serial', action='store_true',
+                        help='Also time a serial full-budget grid search for comparison')
+    parser.add_argument('--output', type=Path, default=None, help='Write the best parameters as JSON')
+    args = parser.parse_args()
+
+    configs = grid_configs()
+    nthread = max(1, (os.cpu_count() or 1) // args.workers)
+
+    start = time.perf_counter()
+    folds_dir = build_folds(args.data, args.folds)
+    print(f"Fold matrices ready in {time.perf_counter() - start:.2f}s ({folds_dir})")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(folds_dir, args.folds)) as pool:
+        rungs = successive_halving(pool, configs, args.folds, nthread,
+                                   args.min_budget, args.max_budget, args.eta)
+    search_time = time.perf_counter() - start
+
+    for rung in rungs:
+        best = rung['results'][0]
+        print(f"Rung budget={rung['budget']:>4}: {len(rung['results']):>3} configs, "
+              f"best CV AUC {best['cv_auc']:.4f} ({best['trees']} trees) {best['config']}")
+    best = rungs[-1]['results'][0]
+    print(f"Search: {len(configs)} configs x {args.folds} folds in {search_time:.2f}s "
+          f"({args.workers} workers)")
+
+    test_auc = holdout_auc(best['config'], best['trees'], args.data)
+    print(f"Best: CV AUC {best['cv_auc']:.4f} +/- {best['cv_auc_std']:.4f}, "
+          f"holdout AUC {test_auc:.4f}, {best['trees']} trees, {best['config']}")
+
+    summary = {'best': {**best['config'], 'n_estimators': best['trees']},
+               'cv_auc': best['cv_auc'], 'holdout_auc': test_auc,
+               'search_s': round(search_time, 3), 'folds': args.folds, 'workers': args.workers}
+
+    if args.compare_serial:
+        _init_worker(folds_dir, args.folds)
+        start = time.perf_counter()
+        serial = serial_grid(configs, args.folds, args.max_budget, os.cpu_count() or 1)
+        serial_time = time.perf_counter() - start
+        print(f"Serial grid: {serial_time:.2f}s, best CV AUC {serial[0]['cv_auc']:.4f} {serial[0]['config']}")
+        print(f"Speedup: {serial_time / search_time:.1f}x")
+        summary.update(serial_s=round(serial_time, 3), serial_best_cv_auc=serial[0]['cv_auc'],
+                       speedup=round(serial_time / search_time, 2))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
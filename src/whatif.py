@@ -0,0 +1,213 @@
+"""
+What-if analysis: score many perturbations of one application in one pass.
+
+A request is one application plus a grid of values for some of its fields,
+e.g. {"loan_amnt": [5000, 10000, 15000], "loan_grade": ["A", "B", "C"]}.
+Every combination becomes one row of a column-wise batch (the cartesian
+product built with index arithmetic, no per-row Python objects). The derived
+interaction features are recomputed for the whole batch by
+`engineer_features`, and the batch is scored with one model call.
+
+With `loan_amnt` as the boundary field, the maximum approvable amount is also
+found for every combination of the other grid fields. All combinations are
+searched together by vectorized bisection, generalized to `SECTIONS`
+sections: each step scores `SECTIONS - 1` evenly spaced amounts per
+still-open combination in a single call and keeps the section where the
+decision flips, so 5 calls cover 500-35,000 to the nearest unit (plain
+bisection would take 17 smaller ones, and the per-call overhead dominates).
+The search assumes the probability of default rises with the amount; on a
+non-monotone stretch it returns one of the crossings, not necessarily the
+highest.
+"""
+import math
+
+import numpy as np
+
+from src.features import RAW_COLUMNS, engineer_features
+from src.scoring import DECISION_THRESHOLD
+
+NUMERIC_FIELDS = [
+    'person_age', 'person_income', 'person_emp_length', 'loan_amnt',
+    'loan_int_rate', 'cb_person_cred_hist_length',
+]
+CATEGORICAL_FIELDS = ['person_home_ownership', 'loan_intent', 'loan_grade', 'cb_person_default_on_file']
+# Divisors in the interaction features; zero would divide by zero
+POSITIVE_FIELDS = ['person_age', 'person_income', 'loan_amnt']
+# Loan amount range of the training data: default bounds of the boundary search
+AMOUNT_RANGE = (500.0, 35000.0)
+AMOUNT_TOLERANCE = 1.0
+# Upper bound of a requested search range (keeps the bisection to ~25 calls)
+MAX_AMOUNT = 1e7
+# Amounts scored per open combination and search step, plus one
+SECTIONS = 16
+MAX_POINTS = 10000
+
+
+def validate_grid(grid, max_points=MAX_POINTS):
+    """
+    Check grid fields and values.
+
+    Raises:
+        ValueError: Unknown field, empty or wrongly typed values, a zero or
+            negative divisor, or more than `max_points` combinations
+    """
+    points = 1
+    for field, values in grid.items():
+        if field not in NUMERIC_FIELDS and field not in CATEGORICAL_FIELDS:
+            raise ValueError(f"Unknown grid field '{field}'; use one of {NUMERIC_FIELDS + CATEGORICAL_FIELDS}")
+        if not values:
+            raise ValueError(f"Grid field '{field}' has no values")
+        if field in NUMERIC_FIELDS:
+            if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+                raise ValueError(f"Grid field '{field}' needs numeric values")
+            if field in POSITIVE_FIELDS and min(values) <= 0:
+                raise ValueError(f"Grid field '{field}' needs values above zero")
+        elif not all(isinstance(v, str) for v in values):
+            raise ValueError(f"Grid field '{field}' needs string values")
+        points *= len(values)
+    if points > max_points:
+        raise ValueError(f"Grid has {points} points; at most {max_points} are allowed")
+    return points
+
+
+def expand_grid(application, grid):
+    """
+    Column-wise batch of every grid combination of one application.
+
+    Args:
+        application: Mapping of raw `LoanApplication` fields
+        grid: Mapping of field -> list of values (order kept)
+
+    Returns:
+        (columns, shape): raw plus derived feature columns with one row per
+        combination, in C order over the grid fields; and the grid shape
+    """
+    raw, shape = _raw_grid(application, grid)
+    columns = dict(raw)
+    columns.update(engineer_features(raw))
+    return columns, shape
+
+
+def _raw_grid(application, grid):
+    shape = tuple(len(values) for values in grid.values())
+    n = math.prod(shape)
+    index = np.indices(shape).reshape(len(shape), n)
+    fields = list(grid)
+    raw = {}
+    for c in RAW_COLUMNS:
+        if c in grid:
+            raw[c] = np.asarray(grid[c])[index[fields.index(c)]]
+        else:
+            raw[c] = np.repeat(np.asarray([application[c]]), n)
+    return raw, shape
+
+
+def max_approvable_amount(application, grid, predict, amount_range=AMOUNT_RANGE,
+                          threshold=DECISION_THRESHOLD, tolerance=AMOUNT_TOLERANCE):
+    """
+    Largest approvable loan amount for every combination of `grid` (without loan_amnt).
+
+    Args:
+        predict: Callable (columns, n) -> probabilities of default
+        amount_range: (low, high) bounds of the search
+
+    Returns:
+        (amounts, calls): amounts shaped like the grid, multiples of
+        `tolerance`; `high` where even `high` is approved and NaN where even
+        `low` is rejected. `calls` is the number of model calls made
+    """
+    # Search over whole steps of `tolerance`, so the result is exactly the
+    # largest approved step rather than a point within a step of it
+    low = math.ceil(amount_range[0] / tolerance)
+    high = math.floor(amount_range[1] / tolerance)
+    grid = {k: v for k, v in grid.items() if k != 'loan_amnt'}
+    # Rows 0..m-1 at the low end, m..2m-1 at the high end: one call for both
+    columns, shape = expand_grid(application, {'loan_amnt': [low * tolerance, high * tolerance], **grid})
+    m = math.prod(shape[1:])
+    approved = predict(columns, 2 * m) <= threshold
+    approved_low, approved_high = approved[:m], approved[m:]
+
+    # engineer_features replaces loan_grade with its score: keep the raw columns
+    base, _ = _raw_grid(application, grid)
+    lo = np.full(m, low, dtype=np.int64)
+    hi = np.full(m, high, dtype=np.int64)
+    # Open combinations: approved at low, rejected at high
+    active = np.flatnonzero(approved_low & ~approved_high)
+    calls = 1
+    steps = np.arange(1, SECTIONS)
+    while len(active):
+        # Invariant: lo is approved and hi rejected; the candidates lie in [lo, hi)
+        lo_a, hi_a = lo[active], hi[active]
+        candidates = lo_a[:, None] + (hi_a - lo_a)[:, None] * steps // SECTIONS
+        rows = {c: np.repeat(values[active], len(steps)) for c, values in base.items()}
+        rows['loan_amnt'] = candidates.ravel() * tolerance
+        rows.update(engineer_features(rows))
+        rejected = (predict(rows, candidates.size) > threshold).reshape(candidates.shape)
+        calls += 1
+
+        # Keep the section just before the first rejected candidate
+        found = rejected.any(axis=1)
+        first = rejected.argmax(axis=1)
+        previous = candidates[np.arange(len(active)), np.maximum(first - 1, 0)]
+        hi[active] = np.where(found, candidates[np.arange(len(active)), first], hi_a)
+        lo[active] = np.where(found, np.where(first > 0, previous, lo_a), candidates[:, -1])
+        active = active[hi[active] - lo[active] > 1]
+
+    amounts = np.where(approved_high, high, np.where(approved_low, lo, np.nan)) * tolerance
+    return amounts.reshape(shape[1:]), calls
+
+
+def analyze(application, grid, predict, amount_range=AMOUNT_RANGE, threshold=DECISION_THRESHOLD,
+            boundary=True):
+    """
+    Probability surface over `grid` and, optionally, the approvable-amount boundary.
+
+    Args:
+        application: Mapping of raw `LoanApplication` fields
+        grid: Mapping of field -> list of values; see `validate_grid`
+        predict: Callable (columns, n) -> probabilities of default
+        boundary: Also search the maximum approvable amount per combination
+            of the non-amount grid fields
+
+    Returns:
+        JSON-ready dict; nested lists follow the order of the grid fields
+    """
+    validate_grid(grid)
+    for field in POSITIVE_FIELDS:
+        if field not in grid and application[field] <= 0:
+            raise ValueError(f"{field} needs a value above zero")
+    columns, shape = expand_grid(application, grid)
+    n = math.prod(shape)
+    probabilities = np.asarray(predict(columns, n), dtype=np.float64)
+    approved = probabilities <= threshold
+
+    result = {
+        "threshold": threshold,
+        "fields": list(grid),
+        "axes": grid,
+        "points": n,
+        "probabilities": probabilities.reshape(shape).tolist(),
+        "approved_share": float(approved.mean()),
+    }
+    if boundary:
+        low, high = amount_range
+        if not 0 < low < high:
+            raise ValueError("amount_range needs 0 < low < high")
+        if high > MAX_AMOUNT:
+            raise ValueError(f"amount_range is limited to {MAX_AMOUNT:g}")
+        amounts, calls = max_approvable_amount(application, grid, predict, amount_range, threshold)
+        other = [f for f in grid if f != 'loan_amnt']
+        result["boundary"] = {
+            "field": "loan_amnt",
+            "fields": other,
+            "range": [low, high],
+            "max_approvable": _nan_to_none(amounts.tolist() if other else float(amounts)),
+            "model_calls": calls,
+        }
+    return result
+
+
+def _nan_to_none(values):
+    if isinstance(values, list):
+        return [_nan_to_none(v) for v in values]
+    return None if values != values else values
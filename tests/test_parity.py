@@ -0,0 +1,61 @@
+"""
+The fast inference paths must score exactly like `pipeline.predict_proba`.
+
+Every row of `data/credit_risk_dataset.csv` (missing values included) goes
+through the full sklearn pipeline and through each path the API and the bulk
+scorer can serve with; any difference, however small, fails. See also
+`python -m benchmarks.check_parity`, which adds latency figures.
+"""
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.fast_inference import FastScorer
+from src.features import RAW_COLUMNS, engineer_features
+from src.tree_inference import CompiledTrees
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_PATH = BASE_DIR / 'data' / 'credit_risk_dataset.csv'
+MODEL_PATH = BASE_DIR / 'models' / 'credit_risk_pipeline.pkl'
+SERVING_DIR = BASE_DIR / 'models' / 'serving'
+
+
+@pytest.fixture(scope='module')
+def pipeline():
+    return joblib.load(MODEL_PATH)
+
+
+@pytest.fixture(scope='module')
+def dataset():
+    return pd.read_csv(DATA_PATH)[RAW_COLUMNS]
+
+
+@pytest.fixture(scope='module')
+def features(dataset):
+    columns = {c: dataset[c].to_numpy() for c in RAW_COLUMNS}
+    columns.update(engineer_features(columns))
+    return columns
+
+
+@pytest.fixture(scope='module')
+def expected(pipeline, dataset):
+    return pipeline.predict_proba(dataset)[:, 1]
+
+
+def test_fast_scorer_matches_pipeline(pipeline, features, expected):
+    scorer = FastScorer.from_pipeline(pipeline)
+    np.testing.assert_array_equal(scorer.predict_proba(features, len(expected)), expected)
+
+
+def test_slim_artifact_matches_pipeline(features, expected):
+    scorer = FastScorer.load(SERVING_DIR)
+    np.testing.assert_array_equal(scorer.predict_proba(features, len(expected)), expected)
+
+
+def test_compiled_trees_match_pipeline(pipeline, features, expected):
+    scorer = FastScorer.from_pipeline(pipeline)
+    trees = CompiledTrees.from_booster(scorer.booster, scorer.iteration_range)
+    np.testing.assert_array_equal(trees.predict_proba(scorer.encode(features, len(expected))), expected)
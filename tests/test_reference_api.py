@@ -0,0 +1,29 @@
+"""`/reference/context` answers 422, not 500, for applications it can't derive features for."""
+import pytest
+from fastapi.testclient import TestClient
+
+import src.main as api
+
+APPLICATION = {
+    "person_age": 25, "person_income": 45000, "person_home_ownership": "RENT", "person_emp_length": 3,
+    "loan_intent": "EDUCATION", "loan_grade": "B", "loan_amnt": 8000, "loan_int_rate": 11.5,
+    "cb_person_default_on_file": "N", "cb_person_cred_hist_length": 4,
+}
+
+
+@pytest.fixture(scope='module')
+def client():
+    return TestClient(api.app)
+
+
+def test_context(client):
+    response = client.post('/reference/context', json=[APPLICATION])
+    assert response.status_code == 200
+    assert len(response.json()["results"]) == 1
+
+
+@pytest.mark.parametrize('field', api.DIVISOR_COLUMNS)
+def test_zero_divisor_is_rejected(client, field):
+    response = client.post('/reference/context', json=[APPLICATION, {**APPLICATION, field: 0}])
+    assert response.status_code == 422
+    assert response.json() == {"detail": f"{field} must not be zero"}
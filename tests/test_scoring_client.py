@@ -0,0 +1,207 @@
+"""
+Retries, backoff and timeouts of the HTTP scoring clients.
+
+Both clients talk to a stand-in API on a local port that answers each
+attempt from a script: a status code, "drop" (close the connection without
+answering) or "slow" (answer after the client's read timeout).
+"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+import requests
+
+from src.scoring_client import AsyncScoringClient, ScoringClient
+
+BACKOFF = 0.05
+READ_TIMEOUT = 0.2
+SLOW_S = 0.6
+APPLICATION = {"person_age": 30, "person_income": 50000}
+
+
+class StandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), Handler)
+        self.script = []
+        self.attempts = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.attempts.append((self.path, time.perf_counter()))
+        action = self.server.script.pop(0) if self.server.script else 200
+        if action == 'drop':
+            self.close_connection = True
+            return
+        if action == 'slow':
+            time.sleep(SLOW_S)
+            action = 200
+        body = json.dumps({"attempt": len(self.server.attempts)}).encode()
+        try:
+            self.send_response(action)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            pass  # the client gave up waiting
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = StandIn()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def gaps(server):
+    times = [t for _, t in server.attempts]
+    return [b - a for a, b in zip(times, times[1:])]
+
+
+def sync_client(server, retries=3):
+    return ScoringClient(server.url, connect_timeout=1.0, read_timeout=READ_TIMEOUT,
+                         retries=retries, backoff=BACKOFF)
+
+
+def async_score(server, payload, retries=3, many=False):
+    async def run():
+        async with AsyncScoringClient(server.url, connect_timeout=1.0, read_timeout=READ_TIMEOUT,
+                                      retries=retries, backoff=BACKOFF) as client:
+            return await (client.score_many(payload) if many else client.score(payload))
+    return asyncio.run(run())
+
+
+# ScoringClient (urllib3 Retry): no sleep before the first retry, then
+# backoff * 2 ** (consecutive errors - 1)
+
+def test_sync_retries_503_then_succeeds(server):
+    server.script = [503, 503, 200]
+    with sync_client(server) as client:
+        response = client.score(APPLICATION)
+    assert response.status_code == 200
+    assert response.json() == {"attempt": 3}
+    assert [p for p, _ in server.attempts] == ['/predict'] * 3
+    assert gaps(server)[1] >= 2 * BACKOFF
+
+
+def test_sync_returns_last_503_when_retries_run_out(server):
+    server.script = [503] * 10
+    with sync_client(server, retries=2) as client:
+        response = client.score_many([APPLICATION, APPLICATION])
+    assert response.status_code == 503
+    assert len(server.attempts) == 3
+    assert server.attempts[0][0] == '/predict/batch'
+
+
+def test_sync_does_not_retry_other_errors(server):
+    server.script = [500, 200]
+    with sync_client(server) as client:
+        assert client.score(APPLICATION).status_code == 500
+    assert len(server.attempts) == 1
+
+
+def test_sync_retries_dropped_connection(server):
+    server.script = ['drop', 'drop', 200]
+    with sync_client(server) as client:
+        response = client.score(APPLICATION)
+    assert response.status_code == 200
+    assert len(server.attempts) == 3
+    assert gaps(server)[1] >= 2 * BACKOFF
+
+
+def test_sync_raises_when_connection_keeps_dropping(server):
+    server.script = ['drop'] * 10
+    with sync_client(server, retries=2) as client, pytest.raises(requests.ConnectionError):
+        client.score(APPLICATION)
+    assert len(server.attempts) == 3
+
+
+def test_sync_retries_after_read_timeout(server):
+    server.script = ['slow', 200]
+    start = time.perf_counter()
+    with sync_client(server) as client:
+        response = client.score(APPLICATION)
+    assert response.status_code == 200
+    assert len(server.attempts) == 2
+    # The first attempt was abandoned at the read timeout, not waited out
+    assert READ_TIMEOUT <= time.perf_counter() - start < SLOW_S
+
+
+def test_sync_raises_when_every_attempt_times_out(server):
+    server.script = ['slow'] * 10
+    with sync_client(server, retries=1) as client, pytest.raises(requests.ConnectionError):
+        client.score(APPLICATION)
+    assert len(server.attempts) == 2
+
+
+# AsyncScoringClient (own loop): backoff * 2 ** attempt before every retry
+
+def test_async_retries_503_with_backoff(server):
+    server.script = [503, 503, 200]
+    response = async_score(server, APPLICATION)
+    assert response.status_code == 200
+    assert response.json() == {"attempt": 3}
+    first, second = gaps(server)
+    assert first >= BACKOFF
+    assert second >= 2 * BACKOFF
+
+
+def test_async_returns_last_503_when_retries_run_out(server):
+    server.script = [503] * 10
+    response = async_score(server, [APPLICATION], retries=2, many=True)
+    assert response.status_code == 503
+    assert len(server.attempts) == 3
+    assert server.attempts[0][0] == '/predict/batch'
+
+
+def test_async_does_not_retry_other_errors(server):
+    server.script = [422, 200]
+    assert async_score(server, APPLICATION).status_code == 422
+    assert len(server.attempts) == 1
+
+
+def test_async_retries_dropped_connection(server):
+    server.script = ['drop', 200]
+    assert async_score(server, APPLICATION).status_code == 200
+    assert len(server.attempts) == 2
+    assert gaps(server)[0] >= BACKOFF
+
+
+def test_async_raises_when_connection_keeps_dropping(server):
+    server.script = ['drop'] * 10
+    with pytest.raises(httpx.TransportError):
+        async_score(server, APPLICATION, retries=2)
+    assert len(server.attempts) == 3
+
+
+def test_async_retries_after_read_timeout(server):
+    server.script = ['slow', 200]
+    start = time.perf_counter()
+    assert async_score(server, APPLICATION).status_code == 200
+    assert len(server.attempts) == 2
+    assert READ_TIMEOUT <= time.perf_counter() - start < SLOW_S
+
+
+def test_async_raises_when_every_attempt_times_out(server):
+    server.script = ['slow'] * 10
+    with pytest.raises(httpx.ReadTimeout):
+        async_score(server, APPLICATION, retries=1)
+    assert len(server.attempts) == 2